@@ -0,0 +1,372 @@
+"""
+Per-dataset allele count summaries.
+
+A count store holds, for every variant seen in a dataset, additive counts
+per population: AC, AN and the hom-ref / het / hom-alt genotype counts.
+Counts over disjoint sample sets simply add, so summaries of new sample
+batches are merged into a dataset's store without touching the samples
+already counted, and any number of summaries can be merged in any grouping
+(the merge is associative and commutative).
+
+Layout, one directory per dataset under settings.allele_counts_dir:
+
+    CURRENT            name of the live version directory
+    .lock              held while the store is being updated
+    <version>/
+        meta.json          samples, populations, chromosomes, sources
+        chrom.npy          int16 (variants,) index into meta["chromosomes"]
+        pos.npy            int32 (variants,)
+        allele_key.npy     uint64 (variants,) hash of REF and ALT
+        ref_offsets.npy, ref_data.npy, alt_offsets.npy, alt_data.npy
+        counts.npy         int32 (variants, populations, 5) COUNT_FIELDS
+
+Variants are sorted by (chrom, pos, allele_key) and unique. A variant absent
+from a batch counts as uncalled for that batch's samples (AN += 0). Updates
+write a new version and switch CURRENT atomically, so readers never see a
+half-written store.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from genotype_store import GenotypeStore, StoreError
+
+FORMAT_VERSION = 1
+META_NAME = "meta.json"
+CURRENT_NAME = "CURRENT"
+LOCK_NAME = ".lock"
+ALL_SAMPLES = "ALL"
+
+COUNT_FIELDS = ("ac", "an", "hom_ref", "het", "hom_alt")
+AC, AN, HOM_REF, HET, HOM_ALT = range(len(COUNT_FIELDS))
+
+# Odd 64-bit multipliers for the allele hash (arithmetic wraps modulo 2^64)
+HASH_BASE = np.uint64(0x100000001B3)
+HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+# Input rows per chunk when adding counts into a merged store
+MERGE_CHUNK_ROWS = 1 << 16
+
+
+@dataclass
+class AlleleCountStore:
+    """Memory-mapped allele count summary; duck-types GenotypeStore's variant columns."""
+
+    path: Optional[Path]
+    meta: Dict[str, Any]
+    chrom: np.ndarray
+    pos: np.ndarray
+    allele_key: np.ndarray
+    ref_offsets: np.ndarray
+    ref_data: np.ndarray
+    alt_offsets: np.ndarray
+    alt_data: np.ndarray
+    counts: np.ndarray  # int32 (variants, populations, COUNT_FIELDS)
+
+    @property
+    def samples(self) -> List[str]:
+        return self.meta["samples"]
+
+    @property
+    def chromosomes(self) -> List[str]:
+        return self.meta["chromosomes"]
+
+    @property
+    def columns(self) -> List[str]:
+        """Population of each counts column; ALL (every sample) comes first."""
+        return self.meta["columns"]
+
+    @property
+    def populations(self) -> Dict[str, List[str]]:
+        """Population name -> member samples (ALL excluded)."""
+        return self.meta["populations"]
+
+    @property
+    def sources(self) -> List[Dict[str, Any]]:
+        return self.meta["sources"]
+
+    @property
+    def n_variants(self) -> int:
+        return len(self.pos)
+
+    @property
+    def n_samples(self) -> int:
+        return len(self.samples)
+
+    @property
+    def ploidy(self) -> int:
+        return self.meta["ploidy"]
+
+    def chrom_range(self, chrom: str) -> slice:
+        """Row range of a chromosome (variants are sorted by chromosome)."""
+        if chrom not in self.chromosomes:
+            return slice(0, 0)
+        index = self.chromosomes.index(chrom)
+        return slice(int(np.searchsorted(self.chrom, index, side="left")),
+                     int(np.searchsorted(self.chrom, index, side="right")))
+
+    def column(self, population: str) -> int:
+        return self.columns.index(population)
+
+    def ref(self, row: int) -> str:
+        return bytes(self.ref_data[self.ref_offsets[row]:self.ref_offsets[row + 1]]).decode()
+
+    def alt(self, row: int) -> str:
+        return bytes(self.alt_data[self.alt_offsets[row]:self.alt_offsets[row + 1]]).decode()
+
+    def locus(self, row: int) -> Dict[str, Any]:
+        return {
+            "chrom": self.chromosomes[int(self.chrom[row])],
+            "pos": int(self.pos[row]),
+            "ref": self.ref(row),
+            "alt": self.alt(row),
+        }
+
+
+def allele_hash(ref_offsets: np.ndarray, ref_data: np.ndarray,
+                alt_offsets: np.ndarray, alt_data: np.ndarray) -> np.ndarray:
+    """64-bit key of each variant's (REF, ALT) pair, computed without a Python loop."""
+
+    def strings(offsets: np.ndarray, data: np.ndarray) -> np.ndarray:
+        offsets = np.asarray(offsets, dtype=np.int64)
+        lengths = np.diff(offsets)
+        if len(data) == 0:
+            return lengths.astype(np.uint64)
+        local = np.arange(len(data)) - np.repeat(offsets[:-1], lengths)
+        powers = np.cumprod(np.full(int(lengths.max()), HASH_BASE, dtype=np.uint64))
+        terms = (np.asarray(data, dtype=np.uint64) + np.uint64(1)) * powers[local]
+        # reduceat needs in-range indices: pad, then zero the empty strings
+        sums = np.add.reduceat(np.append(terms, np.uint64(0)), offsets[:-1])
+        return np.where(lengths > 0, sums, np.uint64(0)) + lengths.astype(np.uint64)
+
+    return strings(ref_offsets, ref_data) * HASH_MIX + strings(alt_offsets, alt_data)
+
+
+def gather_strings(offsets: np.ndarray, data: np.ndarray, rows: np.ndarray):
+    """Offsets and data of the strings at rows, in that order."""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    index = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(int(new_offsets[-1]))
+    return new_offsets, np.asarray(data)[index]
+
+
+def _concat_strings(parts: Sequence[AlleleCountStore], name: str):
+    offsets, data, base = [np.zeros(1, dtype=np.int64)], [], 0
+    for part in parts:
+        part_offsets = np.asarray(getattr(part, f"{name}_offsets"), dtype=np.int64)
+        offsets.append(part_offsets[1:] + base)
+        data.append(np.asarray(getattr(part, f"{name}_data")))
+        base += int(part_offsets[-1])
+    return np.concatenate(offsets), np.concatenate(data) if data else np.zeros(0, dtype=np.uint8)
+
+
+def _save_array(out_dir: Path, name: str, array: np.ndarray) -> np.ndarray:
+    np.save(out_dir / f"{name}.npy", array)
+    return np.load(out_dir / f"{name}.npy", mmap_mode="r")
+
+
+def create_part(out_dir: Path, store: GenotypeStore, populations: Dict[str, List[str]],
+                source: str) -> AlleleCountStore:
+    """
+    An unmerged summary of one genotype store, with zeroed counts to be filled
+    in by the caller. Its variants are the store's, in store order.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    columns = [ALL_SAMPLES] + sorted(populations)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "samples": list(store.samples),
+        "ploidy": store.ploidy,
+        "chromosomes": list(store.chromosomes),
+        "columns": columns,
+        "populations": {pop: sorted(members) for pop, members in populations.items()},
+        "sources": [{"store": source, "samples": store.n_samples, "variants": store.n_variants}],
+    }
+    counts = np.lib.format.open_memmap(out_dir / "counts.npy", mode="w+", dtype=np.int32,
+                                       shape=(store.n_variants, len(columns), len(COUNT_FIELDS)))
+    return AlleleCountStore(
+        path=out_dir,
+        meta=meta,
+        chrom=store.chrom,
+        pos=store.pos,
+        allele_key=allele_hash(store.ref_offsets, store.ref_data, store.alt_offsets, store.alt_data),
+        ref_offsets=store.ref_offsets,
+        ref_data=store.ref_data,
+        alt_offsets=store.alt_offsets,
+        alt_data=store.alt_data,
+        counts=counts,
+    )
+
+
+def merge_meta(parts: Sequence[AlleleCountStore]) -> Dict[str, Any]:
+    """Combined metadata; samples must not be counted twice."""
+    ploidies = {part.ploidy for part in parts}
+    if len(ploidies) > 1:
+        raise ValueError(f"Cannot merge counts of different ploidy: {sorted(ploidies)}")
+    samples: List[str] = []
+    seen = set()
+    for part in parts:
+        overlap = seen.intersection(part.samples)
+        if overlap:
+            raise ValueError(f"Samples already counted: {', '.join(sorted(overlap)[:5])}")
+        seen.update(part.samples)
+        samples.extend(part.samples)
+
+    chromosomes: List[str] = []
+    populations: Dict[str, List[str]] = {}
+    for part in parts:
+        chromosomes.extend(chrom for chrom in part.chromosomes if chrom not in chromosomes)
+        for pop, members in part.populations.items():
+            populations.setdefault(pop, []).extend(members)
+    return {
+        "format_version": FORMAT_VERSION,
+        "samples": samples,
+        "ploidy": ploidies.pop(),
+        "chromosomes": chromosomes,
+        "columns": [ALL_SAMPLES] + sorted(populations),
+        "populations": {pop: sorted(members) for pop, members in sorted(populations.items())},
+        "sources": [source for part in parts for source in part.sources],
+    }
+
+
+def merge_counts(parts: Sequence[AlleleCountStore], out_dir: Path) -> AlleleCountStore:
+    """
+    Merge any number of summaries (merged or not) into a new sorted, unique
+    summary at out_dir. Costs O(variants) in keys plus one sequential pass
+    over each part's counts; the number of samples behind them does not matter.
+    """
+    if not parts:
+        raise ValueError("Nothing to merge")
+    meta = merge_meta(parts)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Variant keys over all parts, chromosome indices remapped to the merged list
+    chrom = np.concatenate([
+        np.asarray([meta["chromosomes"].index(name) for name in part.chromosomes], dtype=np.int16)[
+            np.asarray(part.chrom)]
+        for part in parts
+    ])
+    pos = np.concatenate([np.asarray(part.pos) for part in parts])
+    allele_key = np.concatenate([np.asarray(part.allele_key) for part in parts])
+    order = np.lexsort((allele_key, pos, chrom))
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = ((np.diff(chrom[order]) != 0) | (np.diff(pos[order]) != 0)
+                  | (np.diff(allele_key[order]) != 0))
+    # Output row of every input row, and the input row representing each output row
+    target = np.empty(len(order), dtype=np.int64)
+    target[order] = np.cumsum(starts) - 1
+    first = order[starts]
+    n_variants = len(first)
+
+    for name in ("ref", "alt"):
+        offsets, data = gather_strings(*_concat_strings(parts, name), first)
+        _save_array(out_dir, f"{name}_offsets", offsets)
+        _save_array(out_dir, f"{name}_data", data)
+
+    counts = np.lib.format.open_memmap(out_dir / "counts.npy", mode="w+", dtype=np.int32,
+                                       shape=(n_variants, len(meta["columns"]), len(COUNT_FIELDS)))
+    offset = 0
+    for part in parts:
+        columns = np.array([meta["columns"].index(name) for name in part.columns])
+        for start in range(0, part.n_variants, MERGE_CHUNK_ROWS):
+            stop = min(start + MERGE_CHUNK_ROWS, part.n_variants)
+            rows = target[offset + start:offset + stop]
+            np.add.at(counts, (rows[:, None], columns[None, :]), np.asarray(part.counts[start:stop]))
+        offset += part.n_variants
+    counts.flush()
+    del counts
+
+    _save_array(out_dir, "chrom", chrom[first])
+    _save_array(out_dir, "pos", pos[first])
+    _save_array(out_dir, "allele_key", allele_key[first])
+    (out_dir / META_NAME).write_text(json.dumps(meta))
+    return load_version(out_dir)
+
+
+def load_version(path: Path) -> AlleleCountStore:
+    meta_path = path / META_NAME
+    if not meta_path.exists():
+        raise StoreError(f"No allele count store at {path}")
+    meta = json.loads(meta_path.read_text())
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise StoreError(f"Unsupported allele count store version: {meta.get('format_version')}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(path / f"{name}.npy", mmap_mode="r")
+
+    return AlleleCountStore(
+        path=path,
+        meta=meta,
+        chrom=load("chrom"),
+        pos=load("pos"),
+        allele_key=load("allele_key"),
+        ref_offsets=load("ref_offsets"),
+        ref_data=load("ref_data"),
+        alt_offsets=load("alt_offsets"),
+        alt_data=load("alt_data"),
+        counts=load("counts"),
+    )
+
+
+def current_version(path: Union[str, Path]) -> Optional[str]:
+    """Name of the live version of a count store, or None if it has none yet."""
+    current = Path(path) / CURRENT_NAME
+    if not current.exists():
+        return None
+    return current.read_text().strip()
+
+
+def open_count_store(path: Union[str, Path]) -> Optional[AlleleCountStore]:
+    """The live version of a dataset's count store, or None if it has none yet."""
+    version = current_version(path)
+    if version is None:
+        return None
+    return load_version(Path(path) / version)
+
+
+def new_version_dir(path: Union[str, Path]) -> Path:
+    return Path(path) / f"v-{uuid.uuid4().hex}"
+
+
+def publish(path: Union[str, Path], version: AlleleCountStore) -> None:
+    """Make a version live and remove the versions it replaces."""
+    path = Path(path)
+    tmp = path / f"{CURRENT_NAME}.{uuid.uuid4().hex}"
+    tmp.write_text(version.path.name)
+    os.replace(tmp, path / CURRENT_NAME)
+    discard_unpublished(path)
+
+
+def discard_unpublished(path: Union[str, Path]) -> None:
+    """Remove every directory except the live version (old versions, parts, failed merges)."""
+    path = Path(path)
+    current = path / CURRENT_NAME
+    live = current.read_text().strip() if current.exists() else None
+    for entry in path.iterdir():
+        if entry.is_dir() and entry.name != live:
+            # Open readers keep their memory maps of removed files on POSIX
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+@contextmanager
+def locked(path: Union[str, Path]) -> Iterator[None]:
+    """Exclusive update lock on a dataset's count store (across processes)."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / LOCK_NAME, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
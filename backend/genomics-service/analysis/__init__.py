@@ -0,0 +1,175 @@
+"""
+Analysis engines for the genomics service.
+Each engine takes (store, parameters, context) and returns a JSON-serializable
+results dict; bulky per-variant outputs are written as .npy artifacts.
+Engines in COUNT_ANALYSES can run on the dataset's allele count store instead
+of its genotypes ({"source": "counts"}).
+
+Results are memoized (see memoization): bump an engine's ENGINE_VERSIONS entry
+whenever a change alters what it computes, so stale results stop being reused.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+from allele_count_store import current_version, open_count_store
+from config import settings
+from database import Dataset, update_analysis
+from genotype_store import GenotypeStore, open_store
+from memoization import HEARTBEATS_PER_TIMEOUT, evict_results, result_key
+from metrics import ANALYSES_RUNNING, ANALYSIS_SECONDS, RESULTS_EVICTED
+from .allele_counts import counts_path, run_allele_counts
+from .allele_frequency import run_allele_frequency
+from .common import AnalysisContext, resolve_populations
+from .gwas import run_gwas
+from .hwe import run_hwe
+from .ld import run_ld
+from .pca import run_pca
+from .popgen import run_diversity, run_fst, run_popgen
+
+logger = logging.getLogger(__name__)
+
+Engine = Callable[[GenotypeStore, Dict[str, Any], AnalysisContext], Dict[str, Any]]
+
+ANALYSES: Dict[str, Engine] = {
+    "allele_counts": run_allele_counts,
+    "allele_frequency": run_allele_frequency,
+    "diversity": run_diversity,
+    "fst": run_fst,
+    "gwas": run_gwas,
+    "hwe": run_hwe,
+    "ld": run_ld,
+    "pca": run_pca,
+    "popgen": run_popgen,
+}
+
+# Analyses that only need per-population counts
+COUNT_ANALYSES = {"allele_frequency", "hwe", "fst", "diversity", "popgen"}
+
+ENGINE_VERSIONS: Dict[str, int] = {
+    "allele_frequency": 1,
+    "diversity": 1,
+    "fst": 1,
+    "gwas": 1,
+    "hwe": 1,
+    "ld": 1,
+    "pca": 1,
+    "popgen": 1,
+}
+
+# Analyses running in this process; their artifacts are never evicted
+_running: Set[str] = set()
+_running_lock = threading.Lock()
+
+# Write progress to the analysis record at most every 5%
+PROGRESS_STEP = 5
+
+
+def analysis_key(dataset: Dataset, analysis_type: str, parameters: Dict[str, Any]) -> Optional[str]:
+    """
+    Memoization key of an analysis, or None if it must always run
+    (allele_counts updates the count store rather than computing a result).
+    """
+    if analysis_type not in ENGINE_VERSIONS:
+        return None
+    # Genotype stores are named by the content hash of their source VCF
+    content = dataset.store_path.name
+    if parameters.get("source") == "counts":
+        version = current_version(counts_path(open_store(dataset.store_path)))
+        content = f"{content}/counts/{version}"
+    populations = None if parameters.get("populations") else dataset.populations
+    return result_key(content, analysis_type, parameters, ENGINE_VERSIONS[analysis_type], populations)
+
+
+def _heartbeat(analysis_id: str, done: threading.Event) -> None:
+    interval = settings.memo_running_timeout / HEARTBEATS_PER_TIMEOUT
+    while not done.wait(interval):
+        try:
+            update_analysis(analysis_id)
+        except Exception as e:
+            logger.error(f"Analysis {analysis_id} heartbeat failed: {e}")
+
+
+def run_analysis(analysis_id: str, dataset: Dataset, analysis_type: str, parameters: Dict[str, Any]) -> None:
+    """Run an analysis to completion and record its outcome. Blocking."""
+    started = time.monotonic()
+    last_progress = [0]
+
+    def report(fraction: float) -> None:
+        percent = int(fraction * 100)
+        if percent - last_progress[0] >= PROGRESS_STEP:
+            last_progress[0] = percent
+            update_analysis(analysis_id, progress=percent)
+
+    ANALYSES_RUNNING.inc()
+    with _running_lock:
+        _running.add(analysis_id)
+    # Keeps the record fresh between progress steps so identical requests keep joining it
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(analysis_id, done), name=f"heartbeat-{analysis_id}", daemon=True)
+    heartbeat.start()
+    status = "failed"
+    try:
+        status = _run_analysis(analysis_id, dataset, analysis_type, parameters, started, report)
+    finally:
+        done.set()
+        heartbeat.join()
+        ANALYSES_RUNNING.dec()
+        ANALYSIS_SECONDS.labels(analysis_type, status).observe(time.monotonic() - started)
+        with _running_lock:
+            _running.discard(analysis_id)
+            running = set(_running)
+        RESULTS_EVICTED.inc(len(evict_results(protect=running)))
+
+
+def _run_analysis(analysis_id: str, dataset: Dataset, analysis_type: str, parameters: Dict[str, Any],
+                  started: float, report: Callable[[float], None]) -> str:
+    """Run the engine and record its outcome; returns the final status."""
+    try:
+        store = open_store(dataset.store_path)
+        mapping = parameters.get("populations") or dataset.populations
+        if parameters.get("source") == "counts":
+            if analysis_type not in COUNT_ANALYSES:
+                raise ValueError(f"{analysis_type} needs genotypes; it cannot run on allele counts")
+            store = open_count_store(counts_path(store))
+            if store is None:
+                raise ValueError("Dataset has no allele counts yet: run the allele_counts analysis first")
+            # Populations are fixed when samples are counted
+            mapping = store.populations
+        context = AnalysisContext(
+            analysis_id=analysis_id,
+            artifact_dir=Path(settings.results_dir) / analysis_id,
+            block_bytes=int(parameters.get("block_bytes", settings.analysis_block_bytes)),
+            populations=resolve_populations(store.samples, mapping),
+            progress=report,
+            threads=settings.analysis_threads or os.cpu_count() or 1,
+            population_mapping=mapping,
+        )
+        results = ANALYSES[analysis_type](store, parameters, context)
+    except Exception as e:
+        logger.exception(f"Analysis {analysis_id} ({analysis_type}) failed")
+        update_analysis(
+            analysis_id,
+            status="failed",
+            error_message=str(e),
+            completed_at=datetime.now(timezone.utc),
+        )
+        return "failed"
+
+    elapsed = time.monotonic() - started
+    results["computation_seconds"] = round(elapsed, 3)
+    update_analysis(
+        analysis_id,
+        status="completed",
+        progress=100,
+        results=results,
+        completed_at=datetime.now(timezone.utc),
+        computation_time=int(round(elapsed)),
+    )
+    logger.info(f"Analysis {analysis_id} ({analysis_type}) completed in {elapsed:.2f}s")
+    return "completed"
@@ -0,0 +1,111 @@
+"""
+Allele count summary engine.
+
+Builds or extends the dataset's allele count store (see allele_count_store):
+the dataset's own genotype store and every store listed in `stores` (names
+of other converted VCFs under processed_dir, e.g. this week's new samples)
+that is not counted yet is summarized in one pass over its own samples only.
+New stores are summarized in parallel and merged with the existing counts in
+one associative merge, so an update costs time proportional to the new
+samples, not the cohort. Stores already counted are skipped.
+
+allele_frequency, hwe, fst, diversity and popgen read the count store
+instead of the genotypes when run with {"source": "counts"}.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from allele_count_store import (
+    AlleleCountStore, create_part, discard_unpublished, locked, merge_counts, new_version_dir, open_count_store,
+    publish,
+)
+from config import settings
+from genotype_store import GenotypeStore, open_store
+from .common import AnalysisContext, allele_counts, genotype_counts, resolve_populations, select_samples
+
+
+def counts_path(store: GenotypeStore) -> Path:
+    """Count store of the dataset whose genotype store this is."""
+    return Path(settings.allele_counts_dir) / store.path.name
+
+
+def summarize_store(store: GenotypeStore, mapping: Dict[str, Any], out_dir: Path,
+                    context: AnalysisContext) -> AlleleCountStore:
+    """Per-population AC/AN and genotype counts of one genotype store."""
+    populations = resolve_populations(store.samples, mapping)
+    members = {
+        pop: [store.samples[i] for i in indices]
+        for pop, indices in populations.items() if indices is not None
+    }
+    part = create_part(out_dir, store, members, store.path.name)
+    columns = [populations[pop] for pop in part.columns]
+    for start, stop, block in context.iter_blocks(store):
+        for column, indices in enumerate(columns):
+            selected = select_samples(block, indices)
+            ac, an = allele_counts(selected)
+            part.counts[start:stop, column] = np.stack([ac, an, *genotype_counts(selected)], axis=1)
+    part.counts.flush()
+    return part
+
+
+def run_allele_counts(store: GenotypeStore, parameters: Dict[str, Any], context: AnalysisContext) -> Dict[str, Any]:
+    """Merge not yet counted genotype stores into the dataset's allele count store."""
+    names = parameters.get("stores") or []
+    if not isinstance(names, list):
+        raise ValueError("stores must be a list of genotype store names")
+    path = counts_path(store)
+
+    with locked(path):
+        existing = open_count_store(path)
+        counted = {source["store"] for source in existing.sources} if existing is not None else set()
+        pending: List[GenotypeStore] = [] if store.path.name in counted else [store]
+        for name in names:
+            name = Path(str(name)).name
+            if name not in counted and name not in [pending_store.path.name for pending_store in pending]:
+                pending.append(open_store(Path(settings.processed_dir) / name))
+
+        added: List[Dict[str, Any]] = []
+        current = existing
+        try:
+            if pending:
+                # Summaries run in parallel; progress is reported per finished store
+                worker = replace(context, progress=None)
+                total = sum(s.n_variants * s.n_samples for s in pending) or 1
+                done = 0
+                parts: List[AlleleCountStore] = []
+                with ThreadPoolExecutor(max_workers=max(1, context.threads)) as pool:
+                    futures: List[Tuple[GenotypeStore, Any]] = [
+                        (s, pool.submit(summarize_store, s, context.population_mapping,
+                                        path / f"part-{s.path.name}", worker))
+                        for s in pending
+                    ]
+                    for pending_store, future in futures:
+                        parts.append(future.result())
+                        done += pending_store.n_variants * pending_store.n_samples
+                        if context.progress is not None:
+                            # Summaries are the bulk of the work; the merge is the rest
+                            context.progress(0.9 * done / total)
+
+                current = merge_counts(([existing] if existing is not None else []) + parts, new_version_dir(path))
+                publish(path, current)
+                added = [part.sources[0] for part in parts]
+        finally:
+            discard_unpublished(path)
+
+    if current is None:
+        raise ValueError("No genotype stores to count")
+    return {
+        "n_variants": current.n_variants,
+        "n_samples": current.n_samples,
+        "populations": {
+            pop: len(current.populations.get(pop, current.samples)) for pop in current.columns
+        },
+        "sources": len(current.sources),
+        "added": added,
+        "count_store": str(path),
+    }
@@ -0,0 +1,56 @@
+"""
+Allele frequency engine.
+Counts alternate alleles (AC) and called alleles (AN) per variant and population
+over blocks of the genotype matrix, or reads them from the dataset's allele
+count store.
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+
+from .common import AnalysisContext, VariantSource, histogram, iter_allele_counts, to_json_number
+
+MAF_BINS = np.linspace(0.0, 0.5, 11)
+
+
+def run_allele_frequency(store: VariantSource, parameters: Dict[str, Any], context: AnalysisContext) -> Dict[str, Any]:
+    """Per-variant AC/AN/AF for every population; summary statistics go into the results."""
+    n_variants = store.n_variants
+    counts = {
+        pop: (context.artifact(f"ac_{pop}", np.int32, (n_variants,)),
+              context.artifact(f"an_{pop}", np.int32, (n_variants,)))
+        for pop in context.populations
+    }
+
+    for start, stop, block_counts in iter_allele_counts(store, context):
+        for pop, (ac, an) in block_counts.items():
+            counts[pop][0][start:stop] = ac
+            counts[pop][1][start:stop] = an
+
+    populations = {}
+    for pop, (ac, an) in counts.items():
+        with np.errstate(invalid="ignore", divide="ignore"):
+            af = np.where(an > 0, ac / an, np.nan)
+        af_out = context.artifact(f"af_{pop}", np.float32, (n_variants,))
+        af_out[:] = af
+        for array in (ac, an, af_out):
+            array.flush()
+
+        maf = np.minimum(af, 1.0 - af)
+        called = an > 0
+        populations[pop] = {
+            "sample_count": store.n_samples if context.populations[pop] is None else len(context.populations[pop]),
+            "variants_called": int(called.sum()),
+            "polymorphic": int(((ac > 0) & (ac < an)).sum()),
+            "singletons": int((ac == 1).sum()),
+            "mean_af": to_json_number(np.nanmean(af)) if called.any() else None,
+            "maf_histogram": histogram(maf, MAF_BINS),
+            "artifacts": {
+                "ac": context.artifact_path(f"ac_{pop}"),
+                "an": context.artifact_path(f"an_{pop}"),
+                "af": context.artifact_path(f"af_{pop}"),
+            },
+        }
+
+    return {"n_variants": n_variants, "populations": populations}
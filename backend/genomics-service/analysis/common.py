@@ -0,0 +1,228 @@
+"""
+Shared building blocks for the analysis engines: block iteration over the
+genotype matrix, population sample indices, vectorized genotype counting
+and artifact output.
+"""
+
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from allele_count_store import AC, AN, COUNT_FIELDS, HET, HOM_ALT, HOM_REF, AlleleCountStore
+from genotype_store import GenotypeStore
+
+# Key for the whole cohort in per-population results
+ALL_SAMPLES = "ALL"
+
+# Engines that only need per-population counts accept either source
+VariantSource = Union[GenotypeStore, AlleleCountStore]
+
+
+@dataclass
+class AnalysisContext:
+    """Everything an engine needs besides the store and its parameters."""
+
+    analysis_id: str
+    artifact_dir: Path
+    block_bytes: int
+    # Population name -> sample indices; None means all samples
+    populations: Dict[str, Optional[np.ndarray]] = field(default_factory=lambda: {ALL_SAMPLES: None})
+    progress: Optional[Callable[[float], None]] = None
+    # Threads for map_blocks; numpy releases the GIL in the heavy kernels
+    threads: int = 1
+    # The population mapping as given, for engines that read other stores
+    population_mapping: Optional[Dict[str, Any]] = None
+
+    def block_rows(self, store: GenotypeStore) -> int:
+        """Variants per block so one int8 block stays within block_bytes."""
+        row_bytes = max(1, store.n_samples * store.ploidy)
+        return max(1, self.block_bytes // row_bytes)
+
+    def iter_blocks(self, store: GenotypeStore, rows: Optional[slice] = None) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """Yield (start, stop, genotypes[start:stop]) over a row range, reporting progress."""
+        start, stop = (0, store.n_variants) if rows is None else (rows.start, rows.stop)
+        step = self.block_rows(store)
+        total = max(1, stop - start)
+        for block_start in range(start, stop, step):
+            block_stop = min(block_start + step, stop)
+            # np.asarray pulls the block out of the memmap once
+            yield block_start, block_stop, np.asarray(store.genotypes[block_start:block_stop])
+            if self.progress is not None:
+                self.progress((block_stop - start) / total)
+
+    def map_blocks(self, store: GenotypeStore, function: Callable[[int, int, np.ndarray], Any],
+                   block_rows: Optional[int] = None) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Yield (start, stop, function(start, stop, genotypes[start:stop])) over
+        all variants in order, with blocks processed on `threads` threads.
+        At most `threads` genotype blocks are in memory at once.
+        """
+        step = block_rows or self.block_rows(store)
+        total = max(1, store.n_variants)
+
+        def task(start: int) -> Tuple[int, int, Any]:
+            stop = min(start + step, store.n_variants)
+            return start, stop, function(start, stop, np.asarray(store.genotypes[start:stop]))
+
+        starts = range(0, store.n_variants, step)
+        with ThreadPoolExecutor(max_workers=max(1, self.threads)) as pool:
+            for start, stop, result in pool.map(task, starts):
+                yield start, stop, result
+                if self.progress is not None:
+                    self.progress(stop / total)
+
+    def artifact(self, name: str, dtype, shape) -> np.ndarray:
+        """Create a disk-backed .npy output array."""
+        self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        return np.lib.format.open_memmap(self.artifact_path(name), mode="w+", dtype=dtype, shape=shape)
+
+    def artifact_path(self, name: str) -> str:
+        # Population labels are user data; keep file names tame
+        return str(self.artifact_dir / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.npy")
+
+
+def resolve_populations(samples: list, mapping: Optional[Dict[str, Any]]) -> Dict[str, Optional[np.ndarray]]:
+    """
+    Turn a population mapping into sample index arrays.
+
+    Accepts either {"POP": ["sample", ...]} or {"sample": "POP"}; samples not
+    in the store are ignored. The whole cohort is always included as ALL.
+    """
+    populations: Dict[str, Optional[np.ndarray]] = {ALL_SAMPLES: None}
+    if not mapping:
+        return populations
+
+    index = {name: i for i, name in enumerate(samples)}
+    members: Dict[str, list] = {}
+    for key, value in mapping.items():
+        if isinstance(value, list):
+            members.setdefault(str(key), []).extend(index[s] for s in value if s in index)
+        elif key in index:
+            members.setdefault(str(value), []).append(index[key])
+
+    for name, indices in sorted(members.items()):
+        if indices and name != ALL_SAMPLES:
+            populations[name] = np.array(sorted(set(indices)), dtype=np.intp)
+    return populations
+
+
+def select_samples(block: np.ndarray, indices: Optional[np.ndarray]) -> np.ndarray:
+    return block if indices is None else block[:, indices]
+
+
+def allele_counts(block: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Alternate allele count and number of called alleles per variant of an int8 block."""
+    an = (block >= 0).sum(axis=(1, 2), dtype=np.int32)
+    ac = (block > 0).sum(axis=(1, 2), dtype=np.int32)
+    return ac, an
+
+
+def genotype_counts(block: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Hom-ref, het and hom-alt counts per variant of a diploid block (alt alleles pooled)."""
+    called = (block >= 0).all(axis=2)
+    n_alt = (block > 0).sum(axis=2)
+    hom_ref = (called & (n_alt == 0)).sum(axis=1, dtype=np.int32)
+    het = (called & (n_alt == 1)).sum(axis=1, dtype=np.int32)
+    hom_alt = (called & (n_alt == 2)).sum(axis=1, dtype=np.int32)
+    return hom_ref, het, hom_alt
+
+
+@lru_cache(maxsize=None)
+def dosage_table(ploidy: int) -> np.ndarray:
+    """
+    Alt allele dosage (NaN if any allele is missing) for every byte pattern
+    of one int8 genotype call, indexed by the call read as an unsigned integer.
+    """
+    codes = np.arange(256 ** ploidy)
+    alleles = [((codes >> (8 * k)) & 0xFF).astype(np.uint8).view(np.int8) for k in range(ploidy)]
+    dosage = sum((allele > 0).astype(np.float64) for allele in alleles)
+    missing = np.any([allele < 0 for allele in alleles], axis=0)
+    return np.where(missing, np.nan, dosage)
+
+
+def centered_dosages(block: np.ndarray, indices: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    float64 (variants, samples) alt allele dosages minus the variant mean,
+    with missing genotypes at 0 (mean imputation), and the alt allele frequency.
+    """
+    ploidy = block.shape[2]
+    if ploidy <= 2:
+        # One table lookup per call instead of per-allele compares and sums
+        codes = np.ascontiguousarray(block).view(np.uint8 if ploidy == 1 else np.uint16)[:, :, 0]
+        dosage = dosage_table(ploidy)[select_samples(codes, indices)]
+        missing = np.isnan(dosage)
+    else:
+        block = select_samples(block, indices)
+        missing = (block < 0).any(axis=2)
+        dosage = (block > 0).sum(axis=2, dtype=np.int16).astype(np.float64)
+    dosage[missing] = 0.0
+    called = dosage.shape[1] - missing.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(called > 0, dosage.sum(axis=1) / called, 0.0)
+    dosage -= mean[:, None]
+    dosage[missing] = 0.0
+    return dosage, mean / ploidy
+
+
+def _count_blocks(source: AlleleCountStore, context: AnalysisContext,
+                  rows: Optional[slice]) -> Iterator[Tuple[int, int, np.ndarray]]:
+    start, stop = (0, source.n_variants) if rows is None else (rows.start, rows.stop)
+    step = max(1, context.block_bytes // (len(source.columns) * len(COUNT_FIELDS) * 4))
+    total = max(1, stop - start)
+    for block_start in range(start, stop, step):
+        block_stop = min(block_start + step, stop)
+        yield block_start, block_stop, np.asarray(source.counts[block_start:block_stop])
+        if context.progress is not None:
+            context.progress((block_stop - start) / total)
+
+
+def iter_allele_counts(source: VariantSource, context: AnalysisContext,
+                       rows: Optional[slice] = None) -> Iterator[Tuple[int, int, Dict[str, Tuple[np.ndarray, np.ndarray]]]]:
+    """(start, stop, {population: (ac, an)}) per block of variants, from genotypes or stored counts."""
+    if isinstance(source, AlleleCountStore):
+        for start, stop, counts in _count_blocks(source, context, rows):
+            yield start, stop, {
+                pop: (counts[:, source.column(pop), AC], counts[:, source.column(pop), AN])
+                for pop in context.populations
+            }
+        return
+    for start, stop, block in context.iter_blocks(source, rows):
+        yield start, stop, {
+            pop: allele_counts(select_samples(block, indices)) for pop, indices in context.populations.items()
+        }
+
+
+def iter_genotype_counts(source: VariantSource, context: AnalysisContext,
+                         rows: Optional[slice] = None) -> Iterator[Tuple[int, int, Dict[str, Tuple[np.ndarray, ...]]]]:
+    """(start, stop, {population: (hom_ref, het, hom_alt)}) per block, from genotypes or stored counts."""
+    if isinstance(source, AlleleCountStore):
+        for start, stop, counts in _count_blocks(source, context, rows):
+            yield start, stop, {
+                pop: tuple(counts[:, source.column(pop), field] for field in (HOM_REF, HET, HOM_ALT))
+                for pop in context.populations
+            }
+        return
+    for start, stop, block in context.iter_blocks(source, rows):
+        yield start, stop, {
+            pop: genotype_counts(select_samples(block, indices)) for pop, indices in context.populations.items()
+        }
+
+
+def histogram(values: np.ndarray, bins: np.ndarray) -> Dict[str, list]:
+    """JSON-friendly histogram ignoring NaNs."""
+    counts, edges = np.histogram(values[~np.isnan(values)], bins=bins)
+    return {"edges": [round(float(e), 6) for e in edges], "counts": counts.tolist()}
+
+
+def to_json_number(value: Any) -> Any:
+    """Convert numpy scalars to JSON numbers; NaN and inf become None."""
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
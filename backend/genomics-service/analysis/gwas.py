@@ -0,0 +1,281 @@
+"""
+Genome-wide association engine.
+
+Every variant is tested against one phenotype, adjusting for covariates,
+without fitting one regression per variant. The covariates (plus an
+intercept) are shared by all tests, so they are projected out once and each
+block of variants is tested with a few matrix products:
+
+- linear: ordinary least squares y ~ g + C. With Q an orthonormal basis of
+  C and g, y residualized on it, beta = g.y / g.g and the residual variance
+  follows from the same dot products (t test, n - rank(C) - 1 df).
+- logistic: score test against the null model y ~ C, fitted once by IRLS
+  (the approach of regenie step 2 and SAIGE). beta is the one-step
+  estimate U / V and se = 1 / sqrt(V), with V the score variance after
+  projecting C out under the null weights.
+
+Missing genotypes are imputed to the variant mean. Blocks run on the
+context's threads. Per-variant results go to one compact structured .npy
+artifact (chrom, pos, beta, se, p); the results hold the top hits, the
+genomic inflation factor and a thinned point set for a Manhattan plot.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from scipy import special, stats
+
+from genotype_store import GenotypeStore
+from .common import AnalysisContext, centered_dosages, histogram, to_json_number
+
+DEFAULT_MIN_MAF = 0.01
+DEFAULT_ALPHA = 5e-8
+DEFAULT_TOP_N = 20
+DEFAULT_PLOT_POINTS = 20000
+# Variants at least this significant are always plotted
+DEFAULT_PLOT_KEEP_P = 1e-3
+# Manhattan thinning grid: genome-wide position bins x -log10(p) steps
+PLOT_POSITION_BINS = 1000
+PLOT_LOG_P_STEP = 0.05
+# Smallest p-value reported; avoids -log10(0)
+MIN_P = 1e-300
+P_BINS = np.linspace(0.0, 1.0, 11)
+NULL_MAX_ITER = 50
+NULL_TOL = 1e-8
+
+RESULT_DTYPE = np.dtype([
+    ("chrom", np.int16),
+    ("pos", np.int32),
+    ("beta", np.float32),
+    ("se", np.float32),
+    ("p", np.float64),
+])
+
+
+def column_basis(matrix: np.ndarray) -> np.ndarray:
+    """Orthonormal basis of the column space; tolerates collinear covariates."""
+    u, s, _ = np.linalg.svd(matrix, full_matrices=False)
+    return u[:, s > s[0] * 1e-10]
+
+
+class LinearTest:
+    """Per-variant OLS t tests with the covariates projected out."""
+
+    model = "linear"
+
+    def __init__(self, y: np.ndarray, covariates: np.ndarray):
+        self.basis = column_basis(covariates)
+        self.residual = y - self.basis @ (self.basis.T @ y)
+        self.rss = float(self.residual @ self.residual)
+        self.df = len(y) - self.basis.shape[1] - 1
+        if self.df < 1:
+            raise ValueError(f"Not enough samples for {self.basis.shape[1]} covariates")
+
+    def test(self, g: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """beta, se and p for centered dosages g (variants, samples)."""
+        projected = g @ self.basis
+        gg = np.einsum("ij,ij->i", g, g) - np.einsum("ij,ij->i", projected, projected)
+        gy = g @ self.residual
+        with np.errstate(invalid="ignore", divide="ignore"):
+            beta = gy / gg
+            sigma2 = np.maximum(self.rss - beta * gy, 0.0) / self.df
+            se = np.sqrt(sigma2 / gg)
+            p = 2.0 * stats.t.sf(np.abs(beta / se), self.df)
+        return beta, se, p
+
+
+class LogisticScoreTest:
+    """Per-variant score tests against a logistic null model fitted once."""
+
+    model = "logistic"
+
+    def __init__(self, y: np.ndarray, covariates: np.ndarray):
+        mu = fit_null_logistic(y, covariates)
+        weights = mu * (1.0 - mu)
+        self.sqrt_weights = np.sqrt(weights)
+        self.basis = column_basis(covariates * self.sqrt_weights[:, None])
+        self.residual = y - mu
+
+    def test(self, g: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """One-step beta, its se and the score test p for centered dosages g."""
+        score = g @ self.residual
+        weighted = g * self.sqrt_weights
+        projected = weighted @ self.basis
+        variance = np.einsum("ij,ij->i", weighted, weighted) - np.einsum("ij,ij->i", projected, projected)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            beta = score / variance
+            se = 1.0 / np.sqrt(variance)
+            p = stats.chi2.sf(score * score / variance, df=1)
+        return beta, se, p
+
+
+def fit_null_logistic(y: np.ndarray, covariates: np.ndarray) -> np.ndarray:
+    """Fitted probabilities of y ~ covariates by Newton-Raphson (IRLS)."""
+    coef = np.zeros(covariates.shape[1])
+    for _ in range(NULL_MAX_ITER):
+        mu = special.expit(covariates @ coef)
+        weights = mu * (1.0 - mu)
+        hessian = covariates.T @ (covariates * weights[:, None])
+        step = np.linalg.lstsq(hessian, covariates.T @ (y - mu), rcond=None)[0]
+        coef += step
+        if np.abs(step).max() < NULL_TOL:
+            break
+    mu = special.expit(covariates @ coef)
+    if not np.all((mu > 1e-8) & (mu < 1 - 1e-8)):
+        raise ValueError("Logistic null model does not converge: covariates separate the cases")
+    return mu
+
+
+def _sample_values(samples: List[str], values: Any, name: str) -> np.ndarray:
+    """Per-sample float column from {sample: value}; absent or null values are NaN."""
+    if not isinstance(values, dict):
+        raise ValueError(f"{name} must map sample names to values")
+    column = np.full(len(samples), np.nan)
+    for i, sample in enumerate(samples):
+        value = values.get(sample)
+        if value is not None:
+            try:
+                column[i] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name}: non-numeric value {value!r} for sample {sample}")
+    return column
+
+
+def phenotype_table(samples: List[str], parameters: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """
+    Sample indices with a phenotype and every covariate, their phenotype
+    values and the covariate matrix (intercept first).
+    """
+    if not parameters.get("phenotypes"):
+        raise ValueError("gwas requires 'phenotypes': {sample: value}")
+    y = _sample_values(samples, parameters["phenotypes"], "phenotypes")
+    covariates = parameters.get("covariates") or {}
+    if not isinstance(covariates, dict):
+        raise ValueError("covariates must map covariate names to {sample: value}")
+    names = sorted(covariates)
+    columns = [_sample_values(samples, covariates[name], f"covariate {name}") for name in names]
+
+    complete = np.isfinite(y)
+    for column in columns:
+        complete &= np.isfinite(column)
+    indices = np.flatnonzero(complete)
+    matrix = np.column_stack([np.ones(len(indices))] + [column[indices] for column in columns])
+    return indices, y[indices], matrix, names
+
+
+def manhattan_points(chrom: np.ndarray, pos: np.ndarray, p: np.ndarray, max_points: int,
+                     keep_p: float) -> List[List[Any]]:
+    """
+    Thinned [chrom index, pos, -log10 p] points that draw the same Manhattan
+    plot as all variants: every variant with p <= keep_p is kept (strongest
+    first, up to half the budget) and the rest keep one point per cell of a
+    genome position x -log10(p) grid, evenly subsampled if still too many.
+    """
+    tested = np.flatnonzero(np.isfinite(p))
+    if len(tested) == 0 or max_points <= 0:
+        return []
+    log_p = -np.log10(np.maximum(p[tested], MIN_P))
+    strong = log_p >= -np.log10(keep_p)
+    strong_rows = tested[strong]
+    if len(strong_rows) > max_points // 2:
+        strong_rows = strong_rows[np.argsort(-log_p[strong], kind="stable")[:max_points // 2]]
+
+    weak_rows, weak_log_p = tested[~strong], log_p[~strong]
+    # Cumulative genome coordinate, as on the plot's x axis
+    lengths = np.zeros(int(chrom.max()) + 1, dtype=np.int64)
+    np.maximum.at(lengths, chrom[weak_rows], pos[weak_rows])
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    x = offsets[chrom[weak_rows]] + pos[weak_rows]
+    x_bin = x * PLOT_POSITION_BINS // max(1, int(lengths.sum()))
+    y_bin = (weak_log_p / PLOT_LOG_P_STEP).astype(np.int64)
+    _, first = np.unique(x_bin * (int(y_bin.max(initial=0)) + 1) + y_bin, return_index=True)
+    weak_rows = weak_rows[np.sort(first)]
+    budget = max_points - len(strong_rows)
+    if len(weak_rows) > budget:
+        weak_rows = weak_rows[np.linspace(0, len(weak_rows) - 1, budget).astype(np.int64)]
+
+    rows = np.sort(np.concatenate([strong_rows, weak_rows]))
+    return [
+        [int(chrom[row]), int(pos[row]), round(float(-np.log10(max(p[row], MIN_P))), 3)]
+        for row in rows
+    ]
+
+
+def run_gwas(store: GenotypeStore, parameters: Dict[str, Any], context: AnalysisContext) -> Dict[str, Any]:
+    """Association of every variant with a phenotype; see the module docstring."""
+    model = parameters.get("model", "auto")
+    min_maf = float(parameters.get("min_maf", DEFAULT_MIN_MAF))
+    alpha = float(parameters.get("alpha", DEFAULT_ALPHA))
+    top_n = int(parameters.get("top_n", DEFAULT_TOP_N))
+    plot_points = int(parameters.get("plot_points", DEFAULT_PLOT_POINTS))
+    plot_keep_p = float(parameters.get("plot_keep_p", DEFAULT_PLOT_KEEP_P))
+
+    indices, y, covariates, covariate_names = phenotype_table(store.samples, parameters)
+    binary = bool(len(y)) and bool(np.isin(y, (0.0, 1.0)).all())
+    if model == "auto":
+        model = "logistic" if binary else "linear"
+    if model == "logistic":
+        if not binary:
+            raise ValueError("Logistic regression needs phenotypes coded 0 (control) / 1 (case)")
+        cases = int(y.sum())
+        if cases == 0 or cases == len(y):
+            raise ValueError("Logistic regression needs both cases and controls")
+        association = LogisticScoreTest(y, covariates)
+    elif model == "linear":
+        association = LinearTest(y, covariates)
+    else:
+        raise ValueError(f"Unknown model '{model}'; expected linear, logistic or auto")
+
+    def test_block(start: int, stop: int, block: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        g, af = centered_dosages(block, indices)
+        beta, se, p = association.test(g)
+        untested = (np.minimum(af, 1.0 - af) < max(min_maf, 1e-12)) | ~np.isfinite(se)
+        for values in (beta, se, p):
+            values[untested] = np.nan
+        return beta, se, p
+
+    out = context.artifact("gwas", RESULT_DTYPE, (store.n_variants,))
+    out["chrom"] = store.chrom
+    out["pos"] = store.pos
+    # Dosage blocks are float64 over the analysed samples: 8 bytes per sample
+    block_rows = max(1, context.block_bytes // (8 * max(1, len(indices))))
+    for start, stop, (beta, se, p) in context.map_blocks(store, test_block, block_rows):
+        out["beta"][start:stop] = beta
+        out["se"][start:stop] = se
+        out["p"][start:stop] = p
+    out.flush()
+
+    p = np.asarray(out["p"])
+    tested = np.isfinite(p)
+    # Genomic inflation: median 1-df chi-square statistic over its expectation under the null
+    lambda_gc = (
+        float(np.median(stats.chi2.isf(p[tested], df=1)) / stats.chi2.ppf(0.5, df=1))
+        if tested.any() else None
+    )
+    order = np.argsort(np.where(tested, p, np.inf), kind="stable")[:top_n]
+    chrom, pos = np.asarray(store.chrom), np.asarray(store.pos)
+    return {
+        "n_variants": store.n_variants,
+        "model": model,
+        "method": "ols_t" if model == "linear" else "score",
+        "n_samples": int(len(indices)),
+        "n_cases": int(y.sum()) if model == "logistic" else None,
+        "covariates": covariate_names,
+        "min_maf": min_maf,
+        "alpha": alpha,
+        "tested": int(tested.sum()),
+        "significant": int((p[tested] < alpha).sum()),
+        "lambda_gc": round(lambda_gc, 4) if lambda_gc is not None else None,
+        "p_histogram": histogram(p, P_BINS),
+        "top_hits": [
+            dict(store.locus(int(row)), beta=to_json_number(out["beta"][row]),
+                 se=to_json_number(out["se"][row]), p=to_json_number(p[row]))
+            for row in order if tested[row]
+        ],
+        "manhattan": {
+            "chromosomes": store.chromosomes,
+            # [chromosome index, position, -log10 p]
+            "points": manhattan_points(chrom, pos, p, plot_points, plot_keep_p),
+        },
+        "artifacts": {"results": context.artifact_path("gwas")},
+    }
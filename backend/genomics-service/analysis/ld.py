@@ -0,0 +1,238 @@
+"""
+Pairwise linkage disequilibrium engine.
+
+r^2 between every pair of variants on the same chromosome that lie within
+window_kb of each other (and, optionally, at most window_variants rows
+apart), as plink --r2 computes it from unphased dosages with missing
+genotypes imputed to the variant mean.
+
+Each chromosome is scanned in blocks of variants. A block is turned into
+unit-norm centered float32 dosages once, so r for a whole block pair is one
+matrix product. Only the blocks that can still reach the current one stay
+buffered, which bounds memory by the window rather than the chromosome.
+Chromosomes run in parallel on the context's threads.
+
+Pairs with r^2 >= min_r2 are written to one structured .npy artifact
+(chrom, pos_a, pos_b, r2). The results summarize every pair in the window,
+thresholded or not: an r^2 histogram and the LD decay curve (mean r^2 by
+distance).
+"""
+
+import math
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from genotype_store import GenotypeStore
+from .common import AnalysisContext, centered_dosages
+
+DEFAULT_WINDOW_KB = 1000
+DEFAULT_WINDOW_VARIANTS = 1000
+DEFAULT_MIN_R2 = 0.2
+DECAY_BINS = 20
+R2_BINS = 10
+# Smallest block, so narrow variant windows still use efficient matrix products
+MIN_BLOCK_ROWS = 256
+
+PAIR_DTYPE = np.dtype([
+    ("chrom", np.int16),
+    ("pos_a", np.int32),
+    ("pos_b", np.int32),
+    ("r2", np.float32),
+])
+
+
+@dataclass
+class Block:
+    """Normalized dosages of consecutive variants on one chromosome."""
+
+    start: int
+    pos: np.ndarray
+    z: np.ndarray
+    polymorphic: np.ndarray
+
+    @property
+    def stop(self) -> int:
+        return self.start + len(self.pos)
+
+
+@dataclass
+class ChromosomeLD:
+    """Per-chromosome accumulators; pairs are streamed to a part file."""
+
+    index: int
+    variants: int
+    pairs: int
+    part: str
+    r2_counts: np.ndarray
+    decay_sum: np.ndarray
+    decay_count: np.ndarray
+
+
+class LDScan:
+    """Blocked r^2 scan of one chromosome."""
+
+    def __init__(self, store: GenotypeStore, block_rows: int, window_bp: int,
+                 window_variants: Optional[int], min_r2: float):
+        self.store = store
+        self.block_rows = block_rows
+        self.window_bp = window_bp
+        self.window_variants = window_variants
+        self.min_r2 = min_r2
+
+    def load(self, start: int, stop: int) -> Block:
+        dosage, _ = centered_dosages(np.asarray(self.store.genotypes[start:stop]))
+        norm = np.sqrt(np.einsum("ij,ij->i", dosage, dosage))
+        polymorphic = norm > 1e-9
+        dosage[polymorphic] /= norm[polymorphic, None]
+        return Block(start, np.asarray(self.store.pos[start:stop]), dosage.astype(np.float32), polymorphic)
+
+    def reachable(self, earlier: Block, block: Block) -> bool:
+        """Whether any variant of an earlier block is within the window of this block."""
+        if block.pos[0] - earlier.pos[-1] > self.window_bp:
+            return False
+        return self.window_variants is None or block.start - (earlier.stop - 1) <= self.window_variants
+
+    def run(self, index: int, rows: slice, part: str) -> ChromosomeLD:
+        result = ChromosomeLD(
+            index=index,
+            variants=rows.stop - rows.start,
+            pairs=0,
+            part=part,
+            r2_counts=np.zeros(R2_BINS, dtype=np.int64),
+            decay_sum=np.zeros(DECAY_BINS),
+            decay_count=np.zeros(DECAY_BINS, dtype=np.int64),
+        )
+        buffer: deque = deque()
+        with open(part, "wb") as out:
+            for start in range(rows.start, rows.stop, self.block_rows):
+                block = self.load(start, min(start + self.block_rows, rows.stop))
+                while buffer and not self.reachable(buffer[0], block):
+                    buffer.popleft()
+                for earlier in buffer:
+                    self._pairs(earlier, block, result, out)
+                self._pairs(block, block, result, out)
+                buffer.append(block)
+        return result
+
+    def _pairs(self, a: Block, b: Block, result: ChromosomeLD, out) -> None:
+        r2 = np.square(a.z @ b.z.T)
+        distance = b.pos[None, :] - a.pos[:, None]
+        valid = (distance <= self.window_bp) & a.polymorphic[:, None] & b.polymorphic[None, :]
+        row_gap = np.arange(b.start, b.stop)[None, :] - np.arange(a.start, a.stop)[:, None]
+        valid &= row_gap > 0
+        if self.window_variants is not None:
+            valid &= row_gap <= self.window_variants
+        r2, distance = r2[valid], distance[valid]
+        if len(r2) == 0:
+            return
+
+        np.minimum(r2, 1.0, out=r2)
+        result.r2_counts += np.bincount(np.minimum((r2 * R2_BINS).astype(np.int64), R2_BINS - 1),
+                                        minlength=R2_BINS)
+        decay_bin = np.minimum(distance * DECAY_BINS // (self.window_bp + 1), DECAY_BINS - 1)
+        result.decay_sum += np.bincount(decay_bin, weights=r2, minlength=DECAY_BINS)
+        result.decay_count += np.bincount(decay_bin, minlength=DECAY_BINS)
+
+        keep = r2 >= self.min_r2
+        if not keep.any():
+            return
+        i, j = np.nonzero(valid)
+        pairs = np.empty(int(keep.sum()), dtype=PAIR_DTYPE)
+        pairs["chrom"] = result.index
+        pairs["pos_a"] = a.pos[i[keep]]
+        pairs["pos_b"] = b.pos[j[keep]]
+        pairs["r2"] = r2[keep]
+        pairs.tofile(out)
+        result.pairs += len(pairs)
+
+
+def run_ld(store: GenotypeStore, parameters: Dict[str, Any], context: AnalysisContext) -> Dict[str, Any]:
+    """Windowed pairwise r^2; see the module docstring."""
+    window_bp = int(float(parameters.get("window_kb", DEFAULT_WINDOW_KB)) * 1000)
+    window_variants = parameters.get("window_variants", DEFAULT_WINDOW_VARIANTS)
+    window_variants = None if window_variants is None else int(window_variants)
+    min_r2 = float(parameters.get("min_r2", DEFAULT_MIN_R2))
+    chromosomes = parameters.get("chromosomes") or store.chromosomes
+    if window_bp < 0 or (window_variants is not None and window_variants < 1):
+        raise ValueError("window_kb must be >= 0 and window_variants >= 1")
+    unknown = sorted(set(chromosomes) - set(store.chromosomes))
+    if unknown:
+        raise ValueError(f"Unknown chromosomes: {', '.join(unknown)}")
+
+    # Float32 dosage blocks stay within block_bytes, and so do the temporaries
+    # of a block pair (r^2, distances, row gaps and masks: ~32 bytes per pair)
+    block_rows = min(context.block_bytes // (4 * max(1, store.n_samples)),
+                     math.isqrt(context.block_bytes // 32))
+    if window_variants is not None:
+        block_rows = min(block_rows, max(window_variants, MIN_BLOCK_ROWS))
+    scan = LDScan(store, max(1, block_rows), window_bp, window_variants, min_r2)
+
+    context.artifact_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [
+        (store.chromosomes.index(chrom), store.chrom_range(chrom))
+        for chrom in chromosomes
+    ]
+    total = max(1, sum(rows.stop - rows.start for _, rows in jobs))
+    done = 0
+    results: List[ChromosomeLD] = []
+    with ThreadPoolExecutor(max_workers=max(1, context.threads)) as pool:
+        futures = [
+            pool.submit(scan.run, index, rows, str(context.artifact_dir / f"ld_{index}.part"))
+            for index, rows in jobs
+        ]
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            done += result.variants
+            if context.progress is not None:
+                context.progress(done / total)
+
+    # Concatenate the per-chromosome part files into one artifact, in chromosome order
+    pairs = context.artifact("ld", PAIR_DTYPE, (sum(result.pairs for result in results),))
+    offset = 0
+    for result in results:
+        if result.pairs:
+            part = np.memmap(result.part, dtype=PAIR_DTYPE, mode="r")
+            pairs[offset:offset + len(part)] = part
+            offset += len(part)
+            del part
+        os.remove(result.part)
+    pairs.flush()
+
+    r2_counts = sum(result.r2_counts for result in results)
+    decay_sum = sum(result.decay_sum for result in results)
+    decay_count = sum(result.decay_count for result in results)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        decay_mean = decay_sum / decay_count
+    bin_bp = (window_bp + 1) / DECAY_BINS
+    return {
+        "n_variants": store.n_variants,
+        "window_kb": window_bp / 1000,
+        "window_variants": window_variants,
+        "min_r2": min_r2,
+        "pairs_tested": int(decay_count.sum()),
+        "pairs_reported": int(offset),
+        "chromosomes": {
+            store.chromosomes[result.index]: {"variants": result.variants, "pairs": result.pairs}
+            for result in results
+        },
+        "r2_histogram": {
+            "edges": [round(i / R2_BINS, 6) for i in range(R2_BINS + 1)],
+            "counts": r2_counts.tolist(),
+        },
+        # Mean r^2 of all tested pairs by distance: the LD decay curve
+        "decay": [
+            {
+                "distance_bp": int(round((i + 0.5) * bin_bp)),
+                "pairs": int(decay_count[i]),
+                "mean_r2": round(float(decay_mean[i]), 6) if decay_count[i] else None,
+            }
+            for i in range(DECAY_BINS)
+        ],
+        "artifacts": {"pairs": context.artifact_path("ld")},
+    }
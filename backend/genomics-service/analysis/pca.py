@@ -0,0 +1,199 @@
+"""
+Principal component analysis engine.
+
+Samples are projected onto the top principal axes of the standardized
+genotype matrix X (variants x samples), as in EIGENSOFT/plink:
+
+1. One pass selects variants: MAF and missingness filters, then greedy LD
+   pruning in windows of ld_window candidate variants per chromosome.
+2. Randomized subspace iteration (Halko et al.) on X^T X: every pass streams
+   the selected variants in blocks and accumulates X^T (X Q), so only an
+   (n_samples x k+oversample) matrix and one float64 block are ever in memory.
+   The last pass doubles as the Rayleigh-Ritz step.
+
+X is never materialized: each block is standardized on the fly from the int8
+genotypes ((dosage - mean) / sd, missing genotypes imputed to the mean).
+"""
+
+from dataclasses import replace
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from genotype_store import GenotypeStore
+from .common import AnalysisContext, allele_counts, to_json_number
+
+DEFAULT_COMPONENTS = 10
+DEFAULT_OVERSAMPLE = 10
+DEFAULT_ITERATIONS = 4
+DEFAULT_MIN_MAF = 0.05
+DEFAULT_MAX_MISSING = 0.1
+DEFAULT_LD_R2 = 0.2
+DEFAULT_LD_WINDOW = 50
+
+
+def standardize(block: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """float64 (variants, samples) standardized dosages of an int8 block; missing -> 0."""
+    dosage = (block > 0).sum(axis=2, dtype=np.int16).astype(np.float64)
+    dosage -= mean[:, None]
+    dosage /= scale[:, None]
+    dosage[(block < 0).any(axis=2)] = 0.0
+    return dosage
+
+
+def ld_prune(z: np.ndarray, chrom: np.ndarray, window: int, max_r2: float) -> np.ndarray:
+    """
+    Greedy LD pruning over consecutive windows of standardized variants.
+    A variant is kept if its r^2 with every variant already kept in its
+    window is below max_r2. Returns a boolean mask.
+    """
+    keep = np.zeros(len(z), dtype=bool)
+    n_samples = z.shape[1]
+    bounds = np.flatnonzero(np.diff(chrom)) + 1
+    for seg_start, seg_stop in zip(np.r_[0, bounds], np.r_[bounds, len(z)]):
+        for start in range(seg_start, seg_stop, window):
+            stop = min(start + window, seg_stop)
+            r2 = np.square(z[start:stop] @ z[start:stop].T / n_samples)
+            kept: List[int] = []
+            for i in range(stop - start):
+                if not kept or r2[i, kept].max() < max_r2:
+                    kept.append(i)
+            keep[start + np.array(kept)] = True
+    return keep
+
+
+def select_variants(store: GenotypeStore, context: AnalysisContext, min_maf: float, max_missing: float,
+                    ld_r2: float, ld_window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float, Dict[str, int]]:
+    """
+    Filtering pass. Returns (rows, mean, scale, total sum of squares of X, dropped counts).
+    """
+    rows, means, scales = [], [], []
+    total_ss = 0.0
+    dropped = {"maf": 0, "missing": 0, "ld": 0}
+    max_alleles = store.n_samples * store.ploidy
+
+    for start, stop, block in context.iter_blocks(store):
+        ac, an = allele_counts(block)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            af = np.where(an > 0, ac / an, 0.0)
+        missing = 1.0 - an / max_alleles
+        ok_missing = missing <= max_missing
+        ok_maf = np.minimum(af, 1.0 - af) >= max(min_maf, 1e-12)
+        dropped["missing"] += int((~ok_missing).sum())
+        dropped["maf"] += int((ok_missing & ~ok_maf).sum())
+
+        candidates = np.flatnonzero(ok_missing & ok_maf)
+        if len(candidates) == 0:
+            continue
+        mean = store.ploidy * af[candidates]
+        scale = np.sqrt(store.ploidy * af[candidates] * (1.0 - af[candidates]))
+        z = standardize(block[candidates], mean, scale)
+        if ld_r2 < 1.0:
+            keep = ld_prune(z, np.asarray(store.chrom[start:stop])[candidates], ld_window, ld_r2)
+            dropped["ld"] += int((~keep).sum())
+            candidates, mean, scale, z = candidates[keep], mean[keep], scale[keep], z[keep]
+
+        rows.append(start + candidates)
+        means.append(mean)
+        scales.append(scale)
+        total_ss += float(np.square(z).sum())
+
+    if not rows:
+        return np.zeros(0, np.int64), np.zeros(0), np.zeros(0), 0.0, dropped
+    return np.concatenate(rows), np.concatenate(means), np.concatenate(scales), total_ss, dropped
+
+
+def gram_product(store: GenotypeStore, rows: np.ndarray, mean: np.ndarray, scale: np.ndarray,
+                 q: np.ndarray, block_rows: int, context: AnalysisContext) -> np.ndarray:
+    """X^T X q over the selected rows, one block of variants at a time."""
+    result = np.zeros_like(q)
+    for start in range(0, len(rows), block_rows):
+        stop = min(start + block_rows, len(rows))
+        x = standardize(np.asarray(store.genotypes[rows[start:stop]]), mean[start:stop], scale[start:stop])
+        result += x.T @ (x @ q)
+        if context.progress is not None:
+            context.progress(stop / len(rows))
+    return result
+
+
+def run_pca(store: GenotypeStore, parameters: Dict[str, Any], context: AnalysisContext) -> Dict[str, Any]:
+    """Top principal components of the samples; per-sample coordinates go into the results."""
+    n_components = int(parameters.get("n_components", DEFAULT_COMPONENTS))
+    oversample = int(parameters.get("oversample", DEFAULT_OVERSAMPLE))
+    n_iter = int(parameters.get("n_iter", DEFAULT_ITERATIONS))
+    min_maf = float(parameters.get("min_maf", DEFAULT_MIN_MAF))
+    max_missing = float(parameters.get("max_missing", DEFAULT_MAX_MISSING))
+    ld_r2 = parameters.get("ld_r2", DEFAULT_LD_R2)
+    ld_r2 = 1.0 if ld_r2 is None else float(ld_r2)
+    ld_window = int(parameters.get("ld_window", DEFAULT_LD_WINDOW))
+    seed = int(parameters.get("seed", 0))
+    if n_components < 1 or n_iter < 0 or ld_window < 2:
+        raise ValueError("n_components must be >= 1, n_iter >= 0 and ld_window >= 2")
+
+    # Progress: one filtering pass plus n_iter + 1 passes over the selected variants
+    n_passes = n_iter + 2
+    report = context.progress or (lambda fraction: None)
+
+    def pass_context(index: int) -> AnalysisContext:
+        return replace(context, progress=lambda fraction: report((index + fraction) / n_passes))
+
+    rows, mean, scale, total_ss, dropped = select_variants(
+        store, pass_context(0), min_maf, max_missing, ld_r2, ld_window
+    )
+    n_samples, n_used = store.n_samples, len(rows)
+    k = min(n_components, n_samples - 1, n_used)
+    if k < 1:
+        raise ValueError(f"Not enough data for PCA: {n_used} variants pass the filters, {n_samples} samples")
+    width = min(k + max(oversample, 0), n_samples)
+
+    # Variant blocks are standardized to float64: 8 bytes per genotype call
+    block_rows = max(1, context.block_bytes // (8 * n_samples))
+    rng = np.random.default_rng(seed)
+    q, _ = np.linalg.qr(rng.standard_normal((n_samples, width)))
+    for iteration in range(n_iter + 1):
+        z = gram_product(store, rows, mean, scale, q, block_rows, pass_context(iteration + 1))
+        if iteration < n_iter:
+            q, _ = np.linalg.qr(z)
+
+    # Rayleigh-Ritz: eigenpairs of X^T X restricted to span(q)
+    eigenvalues, w = np.linalg.eigh(q.T @ z)
+    order = np.argsort(eigenvalues)[::-1][:k]
+    eigenvalues = np.maximum(eigenvalues[order], 0.0)
+    vectors = q @ w[:, order]
+    # Deterministic signs: the largest entry of each component is positive
+    signs = np.sign(vectors[np.abs(vectors).argmax(axis=0), np.arange(k)])
+    vectors *= np.where(signs == 0, 1.0, signs)
+
+    coordinates = context.artifact("pca_coordinates", np.float32, (n_samples, k))
+    coordinates[:] = vectors
+    coordinates.flush()
+    variants = context.artifact("pca_variants", np.int64, (n_used,))
+    variants[:] = rows
+    variants.flush()
+
+    explained = eigenvalues / total_ss if total_ss > 0 else np.zeros(k)
+    centroids = {
+        pop: [to_json_number(v) for v in np.round(vectors[indices].mean(axis=0), 6)]
+        for pop, indices in context.populations.items() if indices is not None
+    }
+    return {
+        "n_variants": store.n_variants,
+        "variants_used": n_used,
+        "variants_dropped": dropped,
+        "filters": {"min_maf": min_maf, "max_missing": max_missing, "ld_r2": ld_r2, "ld_window": ld_window},
+        "method": "randomized_svd",
+        "n_components": k,
+        "n_iter": n_iter,
+        # Eigenvalues of the GRM X^T X / M, as reported by plink
+        "eigenvalues": [round(float(v / n_used), 6) for v in eigenvalues],
+        "explained_variance_ratio": [round(float(v), 6) for v in explained],
+        # Unit-norm eigenvectors, one list of k values per sample
+        "coordinates": {
+            sample: [round(float(v), 6) for v in vectors[i]] for i, sample in enumerate(store.samples)
+        },
+        "population_centroids": centroids,
+        "artifacts": {
+            "coordinates": context.artifact_path("pca_coordinates"),
+            "variants": context.artifact_path("pca_variants"),
+        },
+    }
@@ -0,0 +1,281 @@
+"""
+Windowed population-genetic statistics.
+
+Along the genome, in non-overlapping windows of window_kb:
+
+- Weir & Cockerham (1984) Fst across all populations, as the ratio of the
+  summed variance components (sum a / sum(a + b + c)), plus genome-wide
+  pairwise Fst for every pair of populations;
+- nucleotide diversity pi per population (mean pairwise differences per bp);
+- Tajima's D per population.
+
+Alternate alleles are pooled into one allele class. Each chromosome is read
+once: per block, per-population genotype counts are computed once and every
+requested statistic is derived from those same arrays, then summed into
+windows with bincount. Chromosomes run in parallel on the context's threads.
+The counts can also come from the dataset's allele count store.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .common import ALL_SAMPLES, AnalysisContext, VariantSource, histogram, iter_genotype_counts, to_json_number
+
+DEFAULT_WINDOW_KB = 100
+DEFAULT_TOP_N = 20
+# Tajima's D is not reported for windows with fewer segregating sites
+MIN_SEGREGATING = 3
+FST_BINS = np.linspace(0.0, 1.0, 11)
+FST = "fst"
+DIVERSITY = "diversity"
+
+WINDOW_DTYPE = np.dtype([
+    ("chrom", np.int16),
+    ("start", np.int32),
+    ("end", np.int32),
+    ("variants", np.int32),
+])
+
+
+def weir_cockerham(n: np.ndarray, p: np.ndarray, h: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Variance components (a, b, c) per variant from (populations, variants)
+    arrays of called individuals n, alt allele frequency p and observed
+    heterozygosity h. Variants that cannot be estimated get zeros.
+    """
+    r = n.shape[0]
+    n_sum = n.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n_bar = n_sum / r
+        n_c = (n_sum - (n * n).sum(axis=0) / n_sum) / (r - 1)
+        p_bar = (n * p).sum(axis=0) / n_sum
+        s2 = (n * np.square(p - p_bar)).sum(axis=0) / ((r - 1) * n_bar)
+        h_bar = (n * h).sum(axis=0) / n_sum
+        pq = p_bar * (1.0 - p_bar)
+        a = n_bar / n_c * (s2 - (pq - (r - 1) / r * s2 - h_bar / 4.0) / (n_bar - 1.0))
+        b = n_bar / (n_bar - 1.0) * (pq - (r - 1) / r * s2 - (2.0 * n_bar - 1.0) / (4.0 * n_bar) * h_bar)
+        c = h_bar / 2.0
+    valid = (n > 0).all(axis=0) & (n_bar > 1.0) & np.isfinite(a) & np.isfinite(b)
+    return np.where(valid, a, 0.0), np.where(valid, b, 0.0), np.where(valid, c, 0.0)
+
+
+def tajima_d(theta_pi: np.ndarray, segregating: np.ndarray, n_chromosomes: int) -> np.ndarray:
+    """Tajima's D per window from summed pi and segregating site counts."""
+    if n_chromosomes < 2:
+        return np.full(len(theta_pi), np.nan)
+    i = np.arange(1, n_chromosomes)
+    a1, a2 = (1.0 / i).sum(), (1.0 / i ** 2).sum()
+    n = n_chromosomes
+    b1 = (n + 1) / (3.0 * (n - 1))
+    b2 = 2.0 * (n * n + n + 3) / (9.0 * n * (n - 1))
+    c1 = b1 - 1.0 / a1
+    c2 = b2 - (n + 2) / (a1 * n) + a2 / a1 ** 2
+    e1, e2 = c1 / a1, c2 / (a1 ** 2 + a2)
+    s = segregating.astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        d = (theta_pi - s / a1) / np.sqrt(e1 * s + e2 * s * (s - 1.0))
+    return np.where(s >= MIN_SEGREGATING, d, np.nan)
+
+
+@dataclass
+class ChromosomeWindows:
+    """Window sums of one chromosome."""
+
+    index: int
+    n_windows: int
+    variants: np.ndarray
+    pi: Dict[str, np.ndarray] = field(default_factory=dict)
+    segregating: Dict[str, np.ndarray] = field(default_factory=dict)
+    fst_a: Optional[np.ndarray] = None
+    fst_abc: Optional[np.ndarray] = None
+    # Genome-wide sums per population pair
+    pair_a: Optional[np.ndarray] = None
+    pair_abc: Optional[np.ndarray] = None
+
+
+class WindowScan:
+    """One pass over a chromosome accumulating the requested statistics per window."""
+
+    def __init__(self, store: VariantSource, context: AnalysisContext, window_bp: int,
+                 statistics: Sequence[str], groups: List[str], pairs: List[Tuple[int, int]]):
+        self.store = store
+        # Workers report progress per chromosome from the caller, not per block
+        self.context = replace(context, progress=None)
+        self.window_bp = window_bp
+        self.statistics = statistics
+        self.groups = groups
+        self.pairs = pairs
+
+    def run(self, index: int, rows: slice) -> ChromosomeWindows:
+        n_windows = 0
+        if rows.stop > rows.start:
+            n_windows = int(self.store.pos[rows.stop - 1]) // self.window_bp + 1
+        windows = ChromosomeWindows(index, n_windows, np.zeros(n_windows, dtype=np.int64))
+        if DIVERSITY in self.statistics:
+            windows.pi = {pop: np.zeros(n_windows) for pop in self.context.populations}
+            windows.segregating = {pop: np.zeros(n_windows, dtype=np.int64) for pop in self.context.populations}
+        if FST in self.statistics:
+            windows.fst_a, windows.fst_abc = np.zeros(n_windows), np.zeros(n_windows)
+            windows.pair_a, windows.pair_abc = np.zeros(len(self.pairs)), np.zeros(len(self.pairs))
+
+        # Genotype counts per population, shared by every statistic
+        for start, stop, counts in iter_genotype_counts(self.store, self.context, rows):
+            window = np.asarray(self.store.pos[start:stop]) // self.window_bp
+            windows.variants += np.bincount(window, minlength=n_windows)
+            if DIVERSITY in self.statistics:
+                self._diversity(windows, window, counts)
+            if FST in self.statistics:
+                self._fst(windows, window, counts)
+        return windows
+
+    def _diversity(self, windows: ChromosomeWindows, window: np.ndarray, counts: Dict[str, Tuple]) -> None:
+        for pop, (hom_ref, het, hom_alt) in counts.items():
+            an = 2.0 * (hom_ref + het + hom_alt)
+            ac = het + 2.0 * hom_alt
+            with np.errstate(invalid="ignore", divide="ignore"):
+                pi = np.where(an > 1, 2.0 * ac * (an - ac) / (an * (an - 1.0)), 0.0)
+            windows.pi[pop] += np.bincount(window, weights=pi, minlength=windows.n_windows)
+            windows.segregating[pop] += np.bincount(window, weights=(ac > 0) & (ac < an),
+                                                    minlength=windows.n_windows).astype(np.int64)
+
+    def _fst(self, windows: ChromosomeWindows, window: np.ndarray, counts: Dict[str, Tuple]) -> None:
+        n = np.stack([sum(counts[pop]) for pop in self.groups]).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            p = np.stack([(counts[pop][1] + 2.0 * counts[pop][2]) for pop in self.groups]) / (2.0 * n)
+            h = np.stack([counts[pop][1] for pop in self.groups]) / n
+        p, h = np.nan_to_num(p), np.nan_to_num(h)
+
+        a, b, c = weir_cockerham(n, p, h)
+        windows.fst_a += np.bincount(window, weights=a, minlength=windows.n_windows)
+        windows.fst_abc += np.bincount(window, weights=a + b + c, minlength=windows.n_windows)
+        for k, (i, j) in enumerate(self.pairs):
+            a, b, c = weir_cockerham(n[[i, j]], p[[i, j]], h[[i, j]])
+            windows.pair_a[k] += a.sum()
+            windows.pair_abc[k] += (a + b + c).sum()
+
+
+def run_window_statistics(store: VariantSource, parameters: Dict[str, Any], context: AnalysisContext,
+                          statistics: Sequence[str]) -> Dict[str, Any]:
+    """Windowed Fst and/or diversity statistics; see the module docstring."""
+    if store.ploidy != 2:
+        raise ValueError("Population statistics require diploid genotypes")
+    window_bp = int(float(parameters.get("window_kb", DEFAULT_WINDOW_KB)) * 1000)
+    top_n = int(parameters.get("top_n", DEFAULT_TOP_N))
+    if window_bp < 1:
+        raise ValueError("window_kb must be positive")
+    groups = [pop for pop in context.populations if pop != ALL_SAMPLES]
+    if FST in statistics and len(groups) < 2:
+        raise ValueError("Fst needs at least two populations: pass 'populations' or set them on the dataset")
+    pairs = list(combinations(range(len(groups)), 2))
+
+    scan = WindowScan(store, context, window_bp, statistics, groups, pairs)
+    jobs = [(i, store.chrom_range(chrom)) for i, chrom in enumerate(store.chromosomes)]
+    total = max(1, store.n_variants)
+    done = 0
+    chromosomes: List[ChromosomeWindows] = []
+    with ThreadPoolExecutor(max_workers=max(1, context.threads)) as pool:
+        futures = [pool.submit(scan.run, index, rows) for index, rows in jobs]
+        for (_, rows), future in zip(jobs, futures):
+            chromosomes.append(future.result())
+            done += rows.stop - rows.start
+            if context.progress is not None:
+                context.progress(done / total)
+
+    n_windows = sum(chrom.n_windows for chrom in chromosomes)
+    windows = context.artifact("windows", WINDOW_DTYPE, (n_windows,))
+    offset = 0
+    for chrom in chromosomes:
+        span = slice(offset, offset + chrom.n_windows)
+        windows["chrom"][span] = chrom.index
+        windows["start"][span] = np.arange(chrom.n_windows) * window_bp
+        windows["end"][span] = np.arange(1, chrom.n_windows + 1) * window_bp
+        windows["variants"][span] = chrom.variants
+        offset += chrom.n_windows
+    windows.flush()
+    # Windows without variants carry no information: their statistics are NaN
+    empty = np.asarray(windows["variants"]) == 0
+
+    results: Dict[str, Any] = {
+        "n_variants": store.n_variants,
+        "window_kb": window_bp / 1000,
+        "n_windows": n_windows,
+        "windows_with_variants": int((~empty).sum()),
+        "artifacts": {"windows": context.artifact_path("windows")},
+    }
+
+    if DIVERSITY in statistics:
+        populations = {}
+        for pop, indices in context.populations.items():
+            n_chromosomes = 2 * (store.n_samples if indices is None else len(indices))
+            pi_sum = np.concatenate([chrom.pi[pop] for chrom in chromosomes]) if chromosomes else np.zeros(0)
+            segregating = (np.concatenate([chrom.segregating[pop] for chrom in chromosomes])
+                           if chromosomes else np.zeros(0, dtype=np.int64))
+            pi = context.artifact(f"pi_{pop}", np.float32, (n_windows,))
+            pi[:] = np.where(empty, np.nan, pi_sum / window_bp)
+            pi.flush()
+            d = context.artifact(f"tajima_d_{pop}", np.float32, (n_windows,))
+            d[:] = np.where(empty, np.nan, tajima_d(pi_sum, segregating, n_chromosomes))
+            d.flush()
+            covered = (~empty).sum() * window_bp
+            populations[pop] = {
+                "n_samples": n_chromosomes // 2,
+                "segregating_sites": int(segregating.sum()),
+                # Over the windows that contain variants
+                "pi": to_json_number(pi_sum.sum() / covered) if covered else None,
+                "mean_tajima_d": to_json_number(np.nanmean(d)) if np.isfinite(d).any() else None,
+                "artifacts": {
+                    "pi": context.artifact_path(f"pi_{pop}"),
+                    "tajima_d": context.artifact_path(f"tajima_d_{pop}"),
+                },
+            }
+        results["populations"] = populations
+
+    if FST in statistics:
+        fst_a = np.concatenate([chrom.fst_a for chrom in chromosomes])
+        fst_abc = np.concatenate([chrom.fst_abc for chrom in chromosomes])
+        fst = context.artifact("fst", np.float32, (n_windows,))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fst[:] = np.where(empty | (fst_abc <= 0), np.nan, fst_a / fst_abc)
+        fst.flush()
+        pair_a = sum(chrom.pair_a for chrom in chromosomes)
+        pair_abc = sum(chrom.pair_abc for chrom in chromosomes)
+        values = np.asarray(fst, dtype=np.float64)
+        order = np.argsort(np.where(np.isfinite(values), -values, np.inf), kind="stable")[:top_n]
+        results["fst"] = {
+            "method": "weir_cockerham",
+            "populations": groups,
+            "genome_wide": to_json_number(fst_a.sum() / fst_abc.sum()) if fst_abc.sum() > 0 else None,
+            "pairwise": {
+                f"{groups[i]}-{groups[j]}": (to_json_number(pair_a[k] / pair_abc[k]) if pair_abc[k] > 0 else None)
+                for k, (i, j) in enumerate(pairs)
+            },
+            "histogram": histogram(values, FST_BINS),
+            "top_windows": [
+                {
+                    "chrom": store.chromosomes[int(windows["chrom"][row])],
+                    "start": int(windows["start"][row]),
+                    "end": int(windows["end"][row]),
+                    "variants": int(windows["variants"][row]),
+                    "fst": to_json_number(values[row]),
+                }
+                for row in order if np.isfinite(values[row])
+            ],
+        }
+        results["artifacts"]["fst"] = context.artifact_path("fst")
+    return results
+
+
+def run_fst(store: VariantSource, parameters: Dict[str, Any], context: AnalysisContext) -> Dict[str, Any]:
+    return run_window_statistics(store, parameters, context, (FST,))
+
+
+def run_diversity(store: VariantSource, parameters: Dict[str, Any], context: AnalysisContext) -> Dict[str, Any]:
+    return run_window_statistics(store, parameters, context, (DIVERSITY,))
+
+
+def run_popgen(store: VariantSource, parameters: Dict[str, Any], context: AnalysisContext) -> Dict[str, Any]:
+    return run_window_statistics(store, parameters, context, (FST, DIVERSITY))
@@ -0,0 +1,167 @@
+"""
+Read-through cache for analysis records.
+
+GET /analyses/{id} is polled while an analysis runs and re-read long after it
+finishes. Records are cached as JSON in Redis, or in a size-bounded
+in-process LRU when Redis is unreachable; update_analysis invalidates the
+entry, and records that are still running get a short TTL.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import redis
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Running analyses are updated in place; cap how long a racing read can pin an old record
+TRANSIENT_TTL = 5
+FINAL_STATUSES = {"completed", "failed"}
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    invalidations: int = 0
+    skipped: int = 0
+    errors: int = 0
+
+
+class MemoryBackend:
+    """LRU of serialized values with per-entry expiry."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, raw: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisBackend:
+    """Shared cache in Redis; keys expire, so volatile-lru eviction bounds memory."""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        self._redis = redis.Redis.from_url(url, socket_timeout=1.0)
+
+    def get(self, key: str) -> Optional[str]:
+        raw = self._redis.get(key)
+        return raw.decode() if raw is not None else None
+
+    def set(self, key: str, raw: str, ttl: int) -> None:
+        self._redis.set(key, raw, ex=ttl)
+
+    def delete(self, key: str) -> None:
+        self._redis.delete(key)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Process-wide backend; Redis when configured and reachable."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if settings.cache_backend == "redis":
+                try:
+                    redis.Redis.from_url(settings.redis_url, socket_connect_timeout=1.0).ping()
+                    _backend = RedisBackend(settings.redis_url)
+                except Exception as e:
+                    logger.warning(f"Redis unavailable, using in-memory cache: {e}")
+            if _backend is None:
+                _backend = MemoryBackend(settings.cache_max_entries)
+            logger.info(f"Cache backend: {_backend.name}")
+        return _backend
+
+
+class ReadThroughCache:
+    """One namespace of cached JSON documents with its own counters."""
+
+    def __init__(self, namespace: str, ttl_for: Callable[[Dict[str, Any]], int]):
+        self.namespace = namespace
+        self.ttl_for = ttl_for
+        self.stats = CacheStats()
+
+    def _key(self, key: str) -> str:
+        return f"{settings.cache_prefix}:{self.namespace}:{key}"
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Cached value for key, else loader()'s result (cached unless None). Values must be JSON-ready."""
+        cache_key = self._key(key)
+        try:
+            raw = get_backend().get(cache_key)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Cache read failed for {cache_key}: {e}")
+            raw = None
+        if raw is not None:
+            self.stats.hits += 1
+            return json.loads(raw)
+
+        self.stats.misses += 1
+        value = loader()
+        if value is None:
+            return None
+        raw = json.dumps(value)
+        if len(raw) > settings.cache_max_value_bytes:
+            self.stats.skipped += 1
+            return value
+        try:
+            get_backend().set(cache_key, raw, self.ttl_for(value))
+            self.stats.sets += 1
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Cache write failed for {cache_key}: {e}")
+        return value
+
+    def invalidate(self, key: str) -> None:
+        try:
+            get_backend().delete(self._key(key))
+            self.stats.invalidations += 1
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Cache invalidation failed for {self._key(key)}: {e}")
+
+
+analysis_cache = ReadThroughCache(
+    "analysis",
+    ttl_for=lambda record: settings.cache_analysis_ttl if record["status"] in FINAL_STATUSES else TRANSIENT_TTL,
+)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for monitoring."""
+    return {"backend": get_backend().name, analysis_cache.namespace: asdict(analysis_cache.stats)}
@@ -0,0 +1,266 @@
+"""
+PostgreSQL access for the genomics service.
+
+The datasets and analyses tables are owned by database/schemas/001_initial_schema.sql,
+so they are accessed with plain SQL rather than ORM models. When the database is
+unreachable the service keeps analysis records in memory so it can still run
+against bare genotype stores in development.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from cache import analysis_cache
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+engine: Optional[Engine] = None
+
+# Fallback analysis records when PostgreSQL is not available
+_memory_analyses: Dict[str, Dict[str, Any]] = {}
+_memory_lock = threading.Lock()
+
+# Newest analyses with a matching result key considered for reuse
+REUSE_CANDIDATES = 5
+
+
+@dataclass
+class Dataset:
+    """A dataset resolved to its genotype store."""
+
+    id: str
+    store_path: Path
+    user_id: Optional[str] = None
+    populations: Optional[Dict[str, Any]] = None
+
+    @property
+    def persistent(self) -> bool:
+        """Analyses of datasets with a datasets row are stored in PostgreSQL."""
+        return engine is not None and self.user_id is not None
+
+
+def init_database() -> bool:
+    """Connect to PostgreSQL; returns False (memory fallback) if it is unavailable."""
+    global engine
+    try:
+        engine = create_engine(settings.postgresql_url, pool_pre_ping=True, pool_recycle=300)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        logger.info("Database connection successful")
+        return True
+    except Exception as e:
+        logger.warning(f"Database unavailable, analysis records kept in memory: {e}")
+        engine = None
+        return False
+
+
+def close_database() -> None:
+    global engine
+    if engine is not None:
+        engine.dispose()
+        engine = None
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+def resolve_dataset(dataset_id: str) -> Optional[Dataset]:
+    """
+    Find the genotype store of a dataset.
+
+    A datasets row points at its store through metadata.genotype_store (a path)
+    or metadata.content_hash (a store under processed_dir). A bare content hash
+    naming a store under processed_dir is accepted as well.
+    """
+    if engine is not None and _is_uuid(dataset_id):
+        with engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT id, user_id, populations, metadata FROM datasets WHERE id = CAST(:id AS uuid)"),
+                {"id": dataset_id},
+            ).mappings().first()
+        if row is not None:
+            metadata = row["metadata"] or {}
+            if metadata.get("genotype_store"):
+                store_path = Path(metadata["genotype_store"])
+            else:
+                store_path = Path(settings.processed_dir) / str(metadata.get("content_hash", row["id"]))
+            return Dataset(
+                id=str(row["id"]),
+                store_path=store_path,
+                user_id=str(row["user_id"]),
+                populations=row["populations"],
+            )
+
+    store_path = Path(settings.processed_dir) / Path(dataset_id).name
+    if store_path.is_dir():
+        return Dataset(id=dataset_id, store_path=store_path)
+    return None
+
+
+def create_analysis(dataset: Dataset, analysis_type: str, parameters: Dict[str, Any],
+                    result_key: Optional[str] = None) -> str:
+    """Record a new running analysis and return its id."""
+    if dataset.persistent:
+        with engine.begin() as conn:
+            return _insert_analysis(conn, dataset, analysis_type, parameters, result_key)
+    with _memory_lock:
+        return _insert_memory_analysis(dataset, analysis_type, parameters, result_key)
+
+
+def create_or_reuse_analysis(dataset: Dataset, analysis_type: str, parameters: Dict[str, Any], result_key: str,
+                             reusable: Callable[[Dict[str, Any]], bool], force: bool = False) -> Tuple[str, bool]:
+    """
+    Return (id, True) for the newest analysis of the dataset with this result
+    key that reusable() accepts, else record a new running analysis and return
+    (id, False). Lookup and insert happen under a per-key lock, so concurrent
+    identical requests share one analysis. With force a new analysis is always
+    recorded; later requests reuse it.
+    """
+    if dataset.persistent:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))"), {"key": result_key})
+            if not force:
+                rows = conn.execute(
+                    text(
+                        "SELECT id, status, results, started_at, progress_at FROM analyses "
+                        "WHERE dataset_id = CAST(:dataset_id AS uuid) AND result_key = :result_key "
+                        "AND status IN ('running', 'completed') ORDER BY started_at DESC LIMIT :limit"
+                    ),
+                    {"dataset_id": dataset.id, "result_key": result_key, "limit": REUSE_CANDIDATES},
+                ).mappings().all()
+                for row in rows:
+                    if reusable(dict(row)):
+                        return str(row["id"]), True
+            return _insert_analysis(conn, dataset, analysis_type, parameters, result_key), False
+
+    with _memory_lock:
+        if not force:
+            candidates = sorted(
+                (record for record in _memory_analyses.values()
+                 if record["dataset_id"] == dataset.id and record.get("result_key") == result_key
+                 and record["status"] in ("running", "completed")),
+                key=lambda record: record["started_at"],
+                reverse=True,
+            )
+            for record in candidates[:REUSE_CANDIDATES]:
+                if reusable(record):
+                    return record["id"], True
+        return _insert_memory_analysis(dataset, analysis_type, parameters, result_key), False
+
+
+def _insert_analysis(conn: Connection, dataset: Dataset, analysis_type: str, parameters: Dict[str, Any],
+                     result_key: Optional[str]) -> str:
+    analysis_id = str(uuid.uuid4())
+    conn.execute(
+        text(
+            "INSERT INTO analyses (id, dataset_id, user_id, analysis_type, parameters, result_key, status, progress, "
+            "started_at, progress_at) VALUES (CAST(:id AS uuid), CAST(:dataset_id AS uuid), CAST(:user_id AS uuid), "
+            ":analysis_type, CAST(:parameters AS jsonb), :result_key, 'running', 0, :started_at, :started_at)"
+        ),
+        {
+            "id": analysis_id,
+            "dataset_id": dataset.id,
+            "user_id": dataset.user_id,
+            "analysis_type": analysis_type,
+            "parameters": json.dumps(parameters),
+            "result_key": result_key,
+            "started_at": datetime.now(timezone.utc),
+        },
+    )
+    return analysis_id
+
+
+def _insert_memory_analysis(dataset: Dataset, analysis_type: str, parameters: Dict[str, Any],
+                            result_key: Optional[str]) -> str:
+    # Caller holds _memory_lock
+    analysis_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    _memory_analyses[analysis_id] = {
+        "id": analysis_id,
+        "dataset_id": dataset.id,
+        "analysis_type": analysis_type,
+        "parameters": parameters,
+        "result_key": result_key,
+        "status": "running",
+        "progress": 0,
+        "results": None,
+        "error_message": None,
+        "started_at": now,
+        "progress_at": now,
+        "completed_at": None,
+        "computation_time": None,
+    }
+    return analysis_id
+
+
+def update_analysis(analysis_id: str, **fields: Any) -> None:
+    """
+    Update columns of an analysis record (status, progress, results, error_message, ...).
+    Every update also stamps progress_at, the liveness clock of running analyses;
+    with no fields it is just a heartbeat.
+    """
+    fields = {"progress_at": datetime.now(timezone.utc), **fields}
+    try:
+        _update_analysis(analysis_id, fields)
+    finally:
+        analysis_cache.invalidate(analysis_id)
+
+
+def _update_analysis(analysis_id: str, fields: Dict[str, Any]) -> None:
+    with _memory_lock:
+        if analysis_id in _memory_analyses:
+            _memory_analyses[analysis_id].update(fields)
+            return
+
+    if engine is None:
+        raise LookupError(f"Analysis {analysis_id} not found")
+    assignments = []
+    params: Dict[str, Any] = {"id": analysis_id}
+    for name, value in fields.items():
+        if name in ("results", "parameters"):
+            assignments.append(f"{name} = CAST(:{name} AS jsonb)")
+            value = json.dumps(value)
+        else:
+            assignments.append(f"{name} = :{name}")
+        params[name] = value
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE analyses SET {', '.join(assignments)} WHERE id = CAST(:id AS uuid)"), params)
+
+
+def get_analysis(analysis_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch an analysis record by id."""
+    with _memory_lock:
+        if analysis_id in _memory_analyses:
+            return dict(_memory_analyses[analysis_id])
+
+    if engine is None or not _is_uuid(analysis_id):
+        return None
+    with engine.connect() as conn:
+        row = conn.execute(
+            text(
+                "SELECT id, dataset_id, analysis_type, parameters, status, progress, results, "
+                "error_message, started_at, completed_at, computation_time FROM analyses WHERE id = CAST(:id AS uuid)"
+            ),
+            {"id": analysis_id},
+        ).mappings().first()
+    if row is None:
+        return None
+    record = dict(row)
+    record["id"] = str(record["id"])
+    record["dataset_id"] = str(record["dataset_id"])
+    return record
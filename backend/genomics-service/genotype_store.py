@@ -0,0 +1,101 @@
+"""
+Read-only access to the columnar genotype stores written by the
+file-processing service (see services/file-processing/app/services/genotype_store.py).
+All arrays are memory-mapped; nothing is loaded until it is sliced.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+SUPPORTED_FORMAT_VERSIONS = {1}
+META_NAME = "meta.json"
+MISSING = -1
+
+
+class StoreError(ValueError):
+    """Raised when a genotype store is missing or unreadable."""
+
+
+@dataclass
+class GenotypeStore:
+    """Memory-mapped view of a converted VCF."""
+
+    path: Path
+    meta: Dict[str, Any]
+    genotypes: np.ndarray  # int8 (variants, samples, ploidy), -1 = missing
+    pos: np.ndarray        # int32 (variants,)
+    chrom: np.ndarray      # int16 (variants,) index into chromosomes
+    ref_offsets: np.ndarray
+    ref_data: np.ndarray
+    alt_offsets: np.ndarray
+    alt_data: np.ndarray
+
+    @property
+    def samples(self) -> List[str]:
+        return self.meta["samples"]
+
+    @property
+    def chromosomes(self) -> List[str]:
+        return self.meta["chromosomes"]
+
+    @property
+    def n_variants(self) -> int:
+        return self.meta["n_variants"]
+
+    @property
+    def n_samples(self) -> int:
+        return self.meta["n_samples"]
+
+    @property
+    def ploidy(self) -> int:
+        return self.meta["ploidy"]
+
+    def chrom_range(self, chrom: str) -> slice:
+        """Row range of a chromosome."""
+        start, end = self.meta["chrom_offsets"].get(chrom, (0, 0))
+        return slice(start, end)
+
+    def ref(self, row: int) -> str:
+        return bytes(self.ref_data[self.ref_offsets[row]:self.ref_offsets[row + 1]]).decode()
+
+    def alt(self, row: int) -> str:
+        return bytes(self.alt_data[self.alt_offsets[row]:self.alt_offsets[row + 1]]).decode()
+
+    def locus(self, row: int) -> Dict[str, Any]:
+        """Human-readable identification of a variant row."""
+        return {
+            "chrom": self.chromosomes[int(self.chrom[row])],
+            "pos": int(self.pos[row]),
+            "ref": self.ref(row),
+            "alt": self.alt(row),
+        }
+
+
+def open_store(path: Union[str, Path]) -> GenotypeStore:
+    """Open a converted store without reading the arrays into memory."""
+    path = Path(path)
+    meta_path = path / META_NAME
+    if not meta_path.exists():
+        raise StoreError(f"No genotype store at {path}")
+    meta = json.loads(meta_path.read_text())
+    if meta.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+        raise StoreError(f"Unsupported genotype store version: {meta.get('format_version')}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(path / f"{name}.npy", mmap_mode="r")
+
+    return GenotypeStore(
+        path=path,
+        meta=meta,
+        genotypes=load("genotypes"),
+        pos=load("pos"),
+        chrom=load("chrom"),
+        ref_offsets=load("ref_offsets"),
+        ref_data=load("ref_data"),
+        alt_offsets=load("alt_offsets"),
+        alt_data=load("alt_data"),
+    )
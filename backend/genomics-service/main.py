@@ -3,14 +3,29 @@ GenomeInsight Genomics Processing Service
 FastAPI application for bioinformatics computations
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import uvicorn
 import os
+import logging
 from datetime import datetime
 
+from analysis import ANALYSES, analysis_key, run_analysis
+from cache import analysis_cache, cache_stats, get_backend as get_cache_backend
+from database import (
+    init_database, close_database, resolve_dataset, create_analysis, create_or_reuse_analysis, get_analysis,
+)
+from memoization import reusable, touch
+from metrics import ANALYSES_QUEUED, ANALYSIS_REQUESTS, RequestMetricsMiddleware, register_cache_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="GenomeInsight Genomics Service",
@@ -29,22 +44,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route (outermost, so it times the whole stack)
+app.add_middleware(RequestMetricsMiddleware)
+register_cache_stats(cache_stats)
+
 # Pydantic models for API
 class HealthResponse(BaseModel):
     status: str
     timestamp: datetime
     service: str
     version: str
+    cache: Optional[Dict[str, Any]] = None
 
 class AnalysisRequest(BaseModel):
     dataset_id: str
     analysis_type: str
     parameters: Optional[Dict[str, Any]] = {}
+    force: bool = False  # recompute even if an identical analysis exists
 
 class AnalysisResponse(BaseModel):
     analysis_id: str
     status: str
     message: str
+    reused: bool = False
+
+class AnalysisRecord(BaseModel):
+    analysis_id: str
+    dataset_id: str
+    analysis_type: str
+    status: str
+    progress: int = 0
+    parameters: Optional[Dict[str, Any]] = None
+    results: Optional[Dict[str, Any]] = None
+    error_message: Optional[str] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    computation_time: Optional[int] = None
+
+@app.on_event("startup")
+async def startup_event():
+    """Connect to PostgreSQL (falls back to in-memory analysis records)."""
+    init_database()
+    get_cache_backend()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    close_database()
 
 # Health check endpoint
 @app.get("/health", response_model=HealthResponse)
@@ -54,7 +99,8 @@ async def health_check():
         status="healthy",
         timestamp=datetime.now(),
         service="genomics-service",
-        version="1.0.0"
+        version="1.0.0",
+        cache=cache_stats()
     )
 
 # Root endpoint
@@ -82,17 +128,71 @@ async def upload_genomic_file(file: UploadFile = File(...)):
         message=f"File {file.filename} uploaded successfully"
     )
 
-# Placeholder for analysis endpoint
+def run_queued_analysis(analysis_id: str, *args) -> None:
+    """Background task of an accepted analysis; leaves the queue as it starts."""
+    ANALYSES_QUEUED.dec()
+    run_analysis(analysis_id, *args)
+
+# Analysis endpoint
 @app.post("/analyze", response_model=AnalysisResponse)
-async def start_analysis(request: AnalysisRequest):
-    """Start genomic data analysis"""
-    # Placeholder implementation
+def start_analysis(request: AnalysisRequest, background_tasks: BackgroundTasks):
+    """Start genomic data analysis (sync: dataset lookup, store reads and the memoization lock block)"""
+    if request.analysis_type not in ANALYSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported analysis type: {request.analysis_type}. "
+                   f"Available: {', '.join(sorted(ANALYSES))}"
+        )
+
+    dataset = resolve_dataset(request.dataset_id)
+    if dataset is None:
+        raise HTTPException(status_code=404, detail=f"Dataset {request.dataset_id} not found")
+
+    parameters = request.parameters or {}
+    key = analysis_key(dataset, request.analysis_type, parameters)
+    if key is None:
+        ANALYSIS_REQUESTS.labels(request.analysis_type, "uncached").inc()
+        analysis_id = create_analysis(dataset, request.analysis_type, parameters)
+    else:
+        analysis_id, reused = create_or_reuse_analysis(
+            dataset, request.analysis_type, parameters, key, reusable, force=request.force
+        )
+        ANALYSIS_REQUESTS.labels(
+            request.analysis_type, "hit" if reused else "forced" if request.force else "miss"
+        ).inc()
+        if reused:
+            # Identical analysis finished or in flight: hand out its record
+            touch(analysis_id)
+            record = get_analysis(analysis_id)
+            status = record["status"] if record is not None else "running"
+            return AnalysisResponse(
+                analysis_id=analysis_id,
+                status=status,
+                message=f"Reusing {status} analysis {request.analysis_type} for dataset {request.dataset_id}",
+                reused=True,
+            )
+    ANALYSES_QUEUED.inc()
+    background_tasks.add_task(run_queued_analysis, analysis_id, dataset, request.analysis_type, parameters)
+
     return AnalysisResponse(
-        analysis_id=f"analysis-{request.dataset_id}",
-        status="started",
+        analysis_id=analysis_id,
+        status="running",
         message=f"Analysis {request.analysis_type} started for dataset {request.dataset_id}"
     )
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/analyses/{analysis_id}", response_model=AnalysisRecord)
+def get_analysis_status(analysis_id: str):
+    """Get status and results of an analysis (read-through cached; sync: Redis and psycopg2 block)"""
+    record = analysis_cache.get_or_load(analysis_id, lambda: jsonable_encoder(get_analysis(analysis_id)))
+    if record is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return AnalysisRecord(analysis_id=record.pop("id"), **record)
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -0,0 +1,162 @@
+"""
+Memoization of analysis results.
+
+An analysis is keyed on everything that determines its output: the dataset's
+content (genotype stores are named by the content hash of their VCF; runs on
+allele counts also key on the live count store version), the analysis type,
+the canonicalized parameters, the population mapping it falls back to and the
+engine version. /analyze reuses the newest analysis with the same key that is
+still running, or that completed and still has its artifacts on disk. A running
+analysis counts as alive while its record keeps being written: progress steps
+and a heartbeat every memo_running_timeout / HEARTBEATS_PER_TIMEOUT seconds
+stamp progress_at, so one whose process died stops being joined after
+memo_running_timeout.
+
+Artifact directories under results_dir are evicted least recently used first
+once they exceed results_max_bytes. Reusing an analysis refreshes its
+directory's mtime, which is the LRU clock.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Parameters that change how an analysis runs but not what it computes
+EXECUTION_PARAMETERS = {"block_bytes"}
+
+# Heartbeats a running analysis writes per memo_running_timeout
+HEARTBEATS_PER_TIMEOUT = 4
+
+_evict_lock = threading.Lock()
+
+
+@dataclass
+class ResultDir:
+    path: Path
+    size: int
+    mtime: float
+
+
+def canonical_parameters(parameters: Dict[str, Any]) -> str:
+    """Parameters as canonical JSON: sorted keys, no whitespace, execution-only knobs dropped."""
+    relevant = {name: value for name, value in parameters.items() if name not in EXECUTION_PARAMETERS}
+    return json.dumps(relevant, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def result_key(content: str, analysis_type: str, parameters: Dict[str, Any], engine_version: int,
+               populations: Optional[Dict[str, Any]] = None) -> str:
+    """Deterministic sha256 of everything an analysis result depends on."""
+    document = json.dumps(
+        {
+            "content": content,
+            "analysis_type": analysis_type,
+            "parameters": json.loads(canonical_parameters(parameters)),
+            "engine_version": engine_version,
+            "populations": populations,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(document.encode()).hexdigest()
+
+
+def _artifact_paths(results: Any) -> Iterator[str]:
+    if isinstance(results, dict):
+        for name, value in results.items():
+            if name == "artifacts" and isinstance(value, dict):
+                yield from (path for path in value.values() if isinstance(path, str))
+            else:
+                yield from _artifact_paths(value)
+    elif isinstance(results, list):
+        for value in results:
+            yield from _artifact_paths(value)
+
+
+def result_dir(analysis_id: str) -> Path:
+    return Path(settings.results_dir) / analysis_id
+
+
+def reusable(record: Dict[str, Any]) -> bool:
+    """Whether an analysis with a matching key can stand in for a new one."""
+    if record["status"] == "running":
+        # A process that died mid-run leaves its record running forever, but stops writing to it
+        written = record.get("progress_at") or record.get("started_at")
+        if written is None:
+            return True
+        if written.tzinfo is None:
+            written = written.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - written < timedelta(seconds=settings.memo_running_timeout)
+    if record["status"] != "completed":
+        return False
+    return all(os.path.exists(path) for path in _artifact_paths(record.get("results")))
+
+
+def touch(analysis_id: str) -> None:
+    """Mark an analysis's artifacts as recently used."""
+    try:
+        os.utime(result_dir(analysis_id))
+    except FileNotFoundError:
+        pass
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def _result_dirs() -> List[ResultDir]:
+    root = Path(settings.results_dir)
+    if not root.is_dir():
+        return []
+    dirs = []
+    for entry in root.iterdir():
+        try:
+            if entry.is_dir():
+                dirs.append(ResultDir(entry, _dir_size(entry), entry.stat().st_mtime))
+        except FileNotFoundError:
+            pass
+    return dirs
+
+
+def evict_results(protect: Iterable[str] = ()) -> List[str]:
+    """
+    Delete least recently used artifact directories until results_dir fits in
+    results_max_bytes (0 disables eviction). Directories of the protected
+    analyses (the ones still running) are never deleted. Returns the evicted ids.
+    """
+    if settings.results_max_bytes <= 0:
+        return []
+    protected: Set[str] = set(protect)
+    evicted = []
+    with _evict_lock:
+        dirs = _result_dirs()
+        total = sum(d.size for d in dirs)
+        for d in sorted(dirs, key=lambda d: d.mtime):
+            if total <= settings.results_max_bytes:
+                break
+            if d.path.name in protected:
+                continue
+            shutil.rmtree(d.path, ignore_errors=True)
+            total -= d.size
+            evicted.append(d.path.name)
+    if evicted:
+        logger.info(f"Evicted artifacts of {len(evicted)} analyses, {total} bytes of results remain")
+    return evicted
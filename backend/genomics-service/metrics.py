@@ -0,0 +1,92 @@
+"""
+Prometheus metrics for the genomics service, exported on GET /metrics.
+
+Route labels use the route template (/analyses/{analysis_id}), never the raw
+path, to bound cardinality.
+"""
+
+import time
+from typing import Callable
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily
+
+# Analyses run from seconds (allele frequencies) to hours (genome-wide LD)
+ANALYSIS_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200, 14400)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+)
+ANALYSIS_SECONDS = Histogram(
+    "analysis_duration_seconds",
+    "Analysis compute time by type and outcome",
+    ["analysis_type", "status"],
+    buckets=ANALYSIS_BUCKETS,
+)
+ANALYSES_QUEUED = Gauge(
+    "analyses_queued",
+    "Analyses accepted by /analyze that have not started yet",
+)
+ANALYSES_RUNNING = Gauge(
+    "analyses_running",
+    "Analyses computing in this process",
+)
+ANALYSIS_REQUESTS = Counter(
+    "analysis_requests_total",
+    "/analyze requests by type and memoization outcome (hit, miss, forced, uncached)",
+    ["analysis_type", "outcome"],
+)
+RESULTS_EVICTED = Counter(
+    "analysis_results_evicted_total",
+    "Analysis artifact directories evicted from results_dir",
+)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], route, str(status[0])).observe(time.perf_counter() - started)
+
+
+class CacheStatsCollector:
+    """The read-through cache counters (see cache) as Prometheus counters."""
+
+    def __init__(self, stats: Callable[[], dict]):
+        self.stats = stats
+
+    def collect(self):
+        family = CounterMetricFamily(
+            "cache_operations", "Read-through cache operations", labels=["namespace", "operation"]
+        )
+        for namespace, counters in self.stats().items():
+            if isinstance(counters, dict):
+                for operation, value in counters.items():
+                    family.add_metric([namespace, operation], value)
+        yield family
+
+
+def register_cache_stats(stats: Callable[[], dict]) -> None:
+    REGISTRY.register(CacheStatsCollector(stats))
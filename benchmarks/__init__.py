@@ -0,0 +1,14 @@
+"""
+Reproducible benchmarks for GenomeInsight.
+
+Generates deterministic synthetic VCF, BED and FASTQ inputs and measures
+upload ingestion, format validation, VCF parsing, deep validation, columnar
+conversion and every genomics analysis type. Each run happens in a fresh
+process and reports wall time, throughput (MB/s, variants/s) and peak RSS;
+results are saved as JSON so two commits can be compared. Everything runs
+offline on one Linux machine: no database, Redis or network is needed.
+
+    python -m benchmarks run --preset small --output before.json
+    python -m benchmarks run --preset small --output after.json
+    python -m benchmarks compare before.json after.json
+"""
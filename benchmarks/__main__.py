@@ -0,0 +1,170 @@
+"""Command line entry point: python -m benchmarks {run,list,compare,generate,load}."""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from . import load, runner, suite, synthetic
+
+
+def _run(args: argparse.Namespace) -> int:
+    preset = runner.PRESETS[args.preset]
+    config = runner.Config(
+        variants=args.variants or preset["variants"],
+        samples=args.samples or preset["samples"],
+        chromosomes=args.chromosomes,
+        populations=args.populations,
+        missing_rate=args.missing_rate,
+        compression=args.compression,
+        seed=args.seed,
+    )
+    names = args.only.split(",") if args.only else list(suite.BENCHMARKS)
+    result = runner.run(config, names, repeat=args.repeat, workdir=args.workdir)
+
+    output = args.output
+    if output is None:
+        commit = (result["git"]["commit"] or "nogit")[:12]
+        output = suite.ROOT / "benchmarks" / "results" / f"{commit}-{args.preset}.json"
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {output}")
+    return 1 if result["failures"] else 0
+
+
+def _list(args: argparse.Namespace) -> int:
+    for name, bench in suite.BENCHMARKS.items():
+        print(f"{name:<28} {bench.service}")
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    base = json.loads(Path(args.base).read_text())
+    head = json.loads(Path(args.head).read_text())
+    lines, regressions = runner.compare(base, head, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def _generate(args: argparse.Namespace) -> int:
+    out = Path(args.directory)
+    out.mkdir(parents=True, exist_ok=True)
+    suffix = synthetic.SUFFIXES[args.compression]
+    vcf = synthetic.generate_vcf(
+        out / f"synthetic.vcf{suffix}", args.variants, args.samples,
+        chromosomes=args.chromosomes, populations=args.populations, missing_rate=args.missing_rate,
+        phased=args.phased, compression=args.compression, seed=args.seed,
+    )
+    synthetic.generate_bed(out / f"synthetic.bed{suffix}", args.variants, chromosomes=args.chromosomes,
+                           compression=args.compression, seed=args.seed)
+    synthetic.generate_fastq(out / f"synthetic.fastq{suffix}", max(1, args.variants // 10),
+                             compression=args.compression, seed=args.seed)
+    (out / "populations.json").write_text(json.dumps(vcf.populations))
+    (out / "phenotypes.json").write_text(json.dumps(synthetic.phenotypes(args.samples, args.seed)))
+    print(f"Wrote {vcf.path} ({vcf.size} bytes) and BED, FASTQ, populations and phenotypes to {out}")
+    return 0
+
+
+def _load(args: argparse.Namespace) -> int:
+    config = load.LoadConfig(
+        duration=args.duration,
+        uploaders=args.uploaders,
+        pollers=args.pollers,
+        validators=args.validators,
+        upload_variants=args.upload_variants,
+        upload_samples=args.upload_samples,
+        seed_files=args.seed_files,
+        inline_workers=args.inline_workers,
+        sample_interval=args.sample_interval,
+        database_url=args.database_url,
+        port=args.port,
+        seed=args.seed,
+    )
+    result = load.run_load(config, workdir=args.workdir)
+    print("\n".join(load.format_report(result)))
+
+    output = args.output
+    if output is None:
+        commit = (result["git"]["commit"] or "nogit")[:12]
+        output = suite.ROOT / "benchmarks" / "results" / f"{commit}-load.json"
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {output}")
+    return 1 if any(entry["errors"] for entry in result["operations"].values()) else 0
+
+
+def _add_data_options(parser: argparse.ArgumentParser, sizes_required: bool) -> None:
+    parser.add_argument("--variants", type=int, required=sizes_required)
+    parser.add_argument("--samples", type=int, required=sizes_required)
+    parser.add_argument("--chromosomes", type=int, default=2)
+    parser.add_argument("--populations", type=int, default=2)
+    parser.add_argument("--missing-rate", type=float, default=0.01)
+    parser.add_argument("--compression", choices=synthetic.COMPRESSIONS, default=synthetic.BGZF)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run benchmarks and save the results as JSON")
+    run.add_argument("--preset", choices=runner.PRESETS, default="small",
+                     help="input size; --variants/--samples override it")
+    _add_data_options(run, sizes_required=False)
+    run.add_argument("--only", help="comma-separated benchmark names (see list)")
+    run.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the median is reported")
+    run.add_argument("--workdir", type=Path,
+                     help="where inputs and outputs go; inputs are reused when the config matches")
+    run.add_argument("--output", type=Path, help="result file (default benchmarks/results/<commit>-<preset>.json)")
+    run.set_defaults(handler=_run)
+
+    listing = commands.add_parser("list", help="list the benchmarks")
+    listing.set_defaults(handler=_list)
+
+    comparison = commands.add_parser("compare", help="compare two result files")
+    comparison.add_argument("base")
+    comparison.add_argument("head")
+    comparison.add_argument("--threshold", type=float, default=0.10,
+                            help="relative growth of time or peak RSS reported as a regression")
+    comparison.set_defaults(handler=_compare)
+
+    generate = commands.add_parser("generate", help="write synthetic input files")
+    generate.add_argument("directory")
+    _add_data_options(generate, sizes_required=True)
+    generate.add_argument("--phased", action="store_true")
+    generate.set_defaults(handler=_generate)
+
+    defaults = load.LoadConfig()
+    loading = commands.add_parser("load", help="drive a live file-processing API with concurrent clients")
+    loading.add_argument("--duration", type=float, default=defaults.duration, help="seconds of measured load")
+    loading.add_argument("--uploaders", type=int, default=defaults.uploaders, help="concurrent VCF uploads")
+    loading.add_argument("--pollers", type=int, default=defaults.pollers,
+                         help="clients alternating GET /files and GET /files/{id}")
+    loading.add_argument("--validators", type=int, default=defaults.validators,
+                         help="clients calling GET /validate/{filename}")
+    loading.add_argument("--upload-variants", type=int, default=defaults.upload_variants)
+    loading.add_argument("--upload-samples", type=int, default=defaults.upload_samples)
+    loading.add_argument("--seed-files", type=int, default=defaults.seed_files,
+                         help="small files registered before the measured phase")
+    loading.add_argument("--inline-workers", type=int, default=defaults.inline_workers,
+                         help="in-process processing workers (0 leaves uploaded files queued)")
+    loading.add_argument("--sample-interval", type=float, default=defaults.sample_interval,
+                         help="seconds between memory samples and timeline rows")
+    loading.add_argument("--database-url", help="throwaway PostgreSQL (default: SQLite in the workdir)")
+    loading.add_argument("--port", type=int, default=defaults.port)
+    loading.add_argument("--seed", type=int, default=defaults.seed)
+    loading.add_argument("--workdir", type=Path, help="uploads, database and server.log (default: a temp dir)")
+    loading.add_argument("--output", type=Path, help="result file (default benchmarks/results/<commit>-load.json)")
+    loading.set_defaults(handler=_load)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+"""
+HTTP load harness for the file-processing service.
+
+Boots app.main:app under uvicorn in a child process against local stand-ins:
+SQLite (through settings.postgresql_url, served by aiosqlite) unless
+--database-url points at a throwaway PostgreSQL, and the in-memory cache and
+job queue instead of Redis. It then drives a mixed workload for a fixed
+duration with an async httpx client:
+
+    uploaders   POST /upload of a synthetic VCF, each upload unique content
+    pollers     GET /files (first page) then GET /files/{id} of a random file
+    validators  GET /validate/{filename} of a random file
+
+and reports p50/p95/p99 latency, request and byte throughput per operation,
+and the server's RSS (with its worker processes) over time.
+"""
+
+import asyncio
+import importlib.util
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from . import runner, suite, synthetic
+
+# Uploads of large files take long; only a stuck server should hit this
+REQUEST_TIMEOUT = 600.0
+STARTUP_TIMEOUT = 60.0
+SEED_CONCURRENCY = 8
+
+
+@dataclass
+class LoadConfig:
+    duration: float = 60.0
+    uploaders: int = 4
+    pollers: int = 16
+    validators: int = 4
+    upload_variants: int = 20_000
+    upload_samples: int = 200
+    seed_files: int = 200
+    inline_workers: int = 1
+    sample_interval: float = 1.0
+    database_url: Optional[str] = None
+    port: int = 18002
+    seed: int = 0
+
+
+@dataclass
+class Sample:
+    operation: str
+    started: float
+    seconds: float
+    status: int
+    bytes: int = 0
+
+
+@dataclass
+class Recorder:
+    """Every request of the measured phase, plus server memory samples."""
+
+    origin: float = field(default_factory=time.perf_counter)
+    samples: List[Sample] = field(default_factory=list)
+    memory: List[Tuple[float, float]] = field(default_factory=list)
+
+    def record(self, operation: str, started: float, status: int, size: int = 0) -> None:
+        now = time.perf_counter()
+        self.samples.append(Sample(operation, started - self.origin, now - started, status, size))
+
+
+class TaggedUpload:
+    """
+    A VCF read with one extra header line after ##fileformat, so every upload
+    is distinct content (identical uploads take the cheap deduplication path).
+    Seekable, so the client can send a Content-Length.
+    """
+
+    def __init__(self, path: Path, tag: str):
+        self.file = open(path, "rb")
+        first = self.file.readline()
+        self.head = first + f"##load_test_upload={tag}\n".encode()
+        self.body_start = len(first)
+        self.size = len(self.head) + os.fstat(self.file.fileno()).st_size - self.body_start
+        self.position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self.position
+        data = b""
+        if self.position < len(self.head):
+            data = self.head[self.position:self.position + size]
+            self.position += len(data)
+            size -= len(data)
+            if size:
+                self.file.seek(self.body_start)
+        if size:
+            chunk = self.file.read(size)
+            self.position += len(chunk)
+            data += chunk
+        return data
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self.position, os.SEEK_END: self.size}[whence]
+        self.position = max(0, min(self.size, base + offset))
+        self.file.seek(self.body_start + max(0, self.position - len(self.head)))
+        return self.position
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def _process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        try:
+            children = (task / "children").read_text().split()
+        except OSError:
+            continue
+        for child in children:
+            pids.extend(_process_tree(int(child)))
+    return pids
+
+
+def tree_rss_mb(pid: int) -> float:
+    """Resident memory of a process and all its descendants (parse workers)."""
+    total_kb = 0
+    for member in _process_tree(pid):
+        try:
+            with open(f"/proc/{member}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return round(total_kb / 1024, 1)
+
+
+class Server:
+    """The file-processing API in a uvicorn child process."""
+
+    def __init__(self, config: LoadConfig, workdir: Path):
+        self.config = config
+        self.workdir = workdir
+        self.url = f"http://127.0.0.1:{config.port}"
+        self.process: Optional[subprocess.Popen] = None
+        self.log_path = workdir / "server.log"
+
+    def environment(self) -> Dict[str, str]:
+        database_url = self.config.database_url
+        if database_url is None:
+            if importlib.util.find_spec("aiosqlite") is None:
+                raise RuntimeError("SQLite stand-in needs aiosqlite: pip install aiosqlite (or pass --database-url)")
+            database = self.workdir / "load.db"
+            # WAL (persistent in the file) lets readers run during writes; writers
+            # still serialize, so use --database-url for PostgreSQL capacity figures
+            with sqlite3.connect(database) as connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+            database_url = f"sqlite:///{database}"
+        return {
+            **os.environ,
+            **runner.service_environment(self.workdir),
+            "POSTGRESQL_URL": database_url,
+            "INLINE_WORKERS": str(self.config.inline_workers),
+        }
+
+    def start(self) -> None:
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(self.config.port), "--log-level", "warning", "--no-access-log"],
+            cwd=suite.SERVICE_PATHS["file-processing"],
+            env=self.environment(),
+            stdout=open(self.log_path, "wb"),
+            stderr=subprocess.STDOUT,
+        )
+
+    async def wait_ready(self, client: httpx.AsyncClient) -> None:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with {self.process.returncode}; see {self.log_path}")
+            try:
+                response = await client.get(f"{self.url}/health")
+                if response.status_code == 200 and response.json()["database"]["status"] == "healthy":
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+        raise RuntimeError(f"Server not ready after {STARTUP_TIMEOUT:.0f}s; see {self.log_path}")
+
+    def rss_mb(self) -> float:
+        return tree_rss_mb(self.process.pid)
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+@dataclass
+class Catalog:
+    """Files known to exist on the server, for the pollers and validators."""
+
+    ids: List[int] = field(default_factory=list)
+    filenames: List[str] = field(default_factory=list)
+
+    def add(self, upload: Dict[str, Any]) -> None:
+        self.ids.append(upload["file_id"])
+        self.filenames.append(upload["filename"])
+
+
+async def seed_files(client: httpx.AsyncClient, url: str, catalog: Catalog, count: int, seed: int) -> None:
+    """Register small, distinct BED files so listing and lookups have rows to work on."""
+    limit = asyncio.Semaphore(SEED_CONCURRENCY)
+
+    async def one(i: int) -> None:
+        rng = random.Random(seed * 1_000_003 + i)
+        body = "".join(
+            f"chr{rng.randint(1, 22)}\t{start}\t{start + rng.randint(50, 5000)}\tseed{i}_{n}\n"
+            for n, start in enumerate(sorted(rng.randrange(1, 10**8) for _ in range(50)))
+        ).encode()
+        async with limit:
+            response = await client.post(f"{url}/upload", files={"file": (f"seed_{i}.bed", body, "text/plain")})
+        response.raise_for_status()
+        catalog.add(response.json())
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+
+
+async def uploader(client: httpx.AsyncClient, url: str, recorder: Recorder, catalog: Catalog,
+                   vcf: Path, worker: int, deadline: float) -> None:
+    n = 0
+    while time.perf_counter() < deadline:
+        body = TaggedUpload(vcf, f"{worker}-{n}")
+        started = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/upload",
+                                         files={"file": (f"load_{worker}_{n}.vcf", body, "text/plain")})
+            status = response.status_code
+            if status == 200:
+                catalog.add(response.json())
+        except httpx.HTTPError:
+            status = 0
+        finally:
+            body.close()
+        recorder.record("upload", started, status, body.size)
+        n += 1
+
+
+async def poller(client: httpx.AsyncClient, url: str, recorder: Recorder, catalog: Catalog,
+                 rng: random.Random, deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        for operation, path in (("list_files", "/files?limit=50"),
+                                ("file_details", f"/files/{rng.choice(catalog.ids)}")):
+            started = time.perf_counter()
+            try:
+                status = (await client.get(f"{url}{path}")).status_code
+            except httpx.HTTPError:
+                status = 0
+            recorder.record(operation, started, status)
+
+
+async def validator(client: httpx.AsyncClient, url: str, recorder: Recorder, catalog: Catalog,
+                    rng: random.Random, deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            status = (await client.get(f"{url}/validate/{rng.choice(catalog.filenames)}")).status_code
+        except httpx.HTTPError:
+            status = 0
+        recorder.record("validate", started, status)
+
+
+async def sample_memory(server: Server, recorder: Recorder, interval: float, deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        recorder.memory.append((round(time.perf_counter() - recorder.origin, 3), server.rss_mb()))
+        await asyncio.sleep(interval)
+
+
+def summarize(recorder: Recorder, duration: float) -> Dict[str, Any]:
+    """Latency percentiles and throughput per operation."""
+    summary = {}
+    for operation in sorted({sample.operation for sample in recorder.samples}):
+        samples = [sample for sample in recorder.samples if sample.operation == operation]
+        ok = [sample for sample in samples if 200 <= sample.status < 400]
+        latency_ms = np.array([sample.seconds for sample in ok]) * 1000
+        entry: Dict[str, Any] = {
+            "requests": len(samples),
+            "errors": len(samples) - len(ok),
+            "requests_per_s": round(len(ok) / duration, 2),
+        }
+        if len(ok):
+            p50, p95, p99 = np.percentile(latency_ms, [50, 95, 99])
+            entry.update(p50_ms=round(float(p50), 2), p95_ms=round(float(p95), 2),
+                         p99_ms=round(float(p99), 2), max_ms=round(float(latency_ms.max()), 2))
+        uploaded = sum(sample.bytes for sample in ok)
+        if uploaded:
+            entry["mb_per_s"] = round(uploaded / duration / 1e6, 3)
+        summary[operation] = entry
+    return summary
+
+
+def timeline(recorder: Recorder, interval: float, duration: float) -> List[Dict[str, Any]]:
+    """Completed requests, errors and server RSS per interval of the measured phase."""
+    buckets = max(1, int(np.ceil(duration / interval)))
+    rows = [{"t": round((i + 1) * interval, 3), "requests": {}, "errors": 0, "rss_mb": None} for i in range(buckets)]
+    for sample in recorder.samples:
+        row = rows[min(buckets - 1, int((sample.started + sample.seconds) / interval))]
+        row["requests"][sample.operation] = row["requests"].get(sample.operation, 0) + 1
+        if not 200 <= sample.status < 400:
+            row["errors"] += 1
+    for at, rss in recorder.memory:
+        row = rows[min(buckets - 1, int(at / interval))]
+        row["rss_mb"] = rss if row["rss_mb"] is None else max(row["rss_mb"], rss)
+    return rows
+
+
+async def drive(config: LoadConfig, server: Server, vcf: Path) -> Dict[str, Any]:
+    workers = config.uploaders + config.pollers + config.validators
+    limits = httpx.Limits(max_connections=workers + SEED_CONCURRENCY + 1, max_keepalive_connections=workers + 1)
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        await server.wait_ready(client)
+        catalog = Catalog()
+        await seed_files(client, server.url, catalog, max(1, config.seed_files), config.seed)
+        rss_before = server.rss_mb()
+
+        recorder = Recorder()
+        deadline = recorder.origin + config.duration
+        rng = random.Random(config.seed)
+        tasks = [sample_memory(server, recorder, config.sample_interval, deadline)]
+        tasks += [uploader(client, server.url, recorder, catalog, vcf, i, deadline) for i in range(config.uploaders)]
+        tasks += [poller(client, server.url, recorder, catalog, random.Random(rng.random()), deadline)
+                  for _ in range(config.pollers)]
+        tasks += [validator(client, server.url, recorder, catalog, random.Random(rng.random()), deadline)
+                  for _ in range(config.validators)]
+        await asyncio.gather(*tasks)
+        # In-flight requests finish after the deadline; rates use the actual span
+        elapsed = time.perf_counter() - recorder.origin
+
+    rss = [value for _, value in recorder.memory]
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "operations": summarize(recorder, elapsed),
+        "memory": {
+            "rss_before_mb": rss_before,
+            "rss_peak_mb": max(rss, default=None),
+            "rss_end_mb": server.rss_mb(),
+        },
+        "timeline": timeline(recorder, config.sample_interval, elapsed),
+        "files_registered": len(catalog.ids),
+    }
+
+
+def run_load(config: LoadConfig, workdir: Optional[Path] = None, log=print) -> Dict[str, Any]:
+    """Boot the service, drive the workload and return the result document."""
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="genomeinsight-load-"))
+    data = workdir / "data"
+    data.mkdir(parents=True, exist_ok=True)
+    vcf = data / f"upload-{config.upload_variants}x{config.upload_samples}-{config.seed}.vcf"
+    if not vcf.exists():
+        synthetic.generate_vcf(vcf, config.upload_variants, config.upload_samples, seed=config.seed)
+    log(f"Upload file {vcf} ({vcf.stat().st_size / 1e6:.1f} MB)")
+
+    server = Server(config, workdir)
+    server.start()
+    try:
+        result = asyncio.run(drive(config, server, vcf))
+    finally:
+        server.stop()
+    return {
+        "format": runner.RESULT_FORMAT,
+        "git": runner._git_state(),
+        "host": runner._host(),
+        "config": {**asdict(config), "database": "sqlite" if config.database_url is None else "external"},
+        "upload_bytes": vcf.stat().st_size,
+        **result,
+    }
+
+
+def format_report(result: Dict[str, Any]) -> List[str]:
+    lines = [f"{'operation':<14} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+             f"{'p99 ms':>9} {'max ms':>9} {'MB/s':>8}"]
+    for operation, entry in result["operations"].items():
+        lines.append(
+            f"{operation:<14} {entry['requests']:>9} {entry['errors']:>7} {entry['requests_per_s']:>8.2f} "
+            + " ".join(f"{entry.get(key, float('nan')):>9.1f}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+            + f" {entry.get('mb_per_s', 0):>8.2f}"
+        )
+    memory = result["memory"]
+    lines.append(f"server RSS: {memory['rss_before_mb']} MB before, {memory['rss_peak_mb']} MB peak, "
+                 f"{memory['rss_end_mb']} MB after {result['elapsed_s']:.0f}s")
+    return lines
@@ -0,0 +1,239 @@
+"""
+Benchmark orchestration: input generation, one spawned process per run,
+result files and comparisons between them.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import suite, synthetic
+
+RESULT_FORMAT = 1
+# Time differences below this are noise, whatever the ratio
+NOISE_SECONDS = 0.005
+# Bump when the generator's output changes, so cached inputs are regenerated
+GENERATOR_VERSION = 1
+
+PRESETS: Dict[str, Dict[str, int]] = {
+    "small": {"variants": 20_000, "samples": 200},
+    "medium": {"variants": 200_000, "samples": 1_000},
+    "large": {"variants": 1_000_000, "samples": 2_500},
+}
+
+
+@dataclass
+class Config:
+    """What the inputs are generated from; part of every result file."""
+
+    variants: int
+    samples: int
+    chromosomes: int = 2
+    populations: int = 2
+    missing_rate: float = 0.01
+    compression: str = synthetic.BGZF
+    seed: int = 0
+
+
+def generate_inputs(config: Config, workdir: Path) -> suite.Inputs:
+    """Generate the input files under workdir/data, reusing them if they match config."""
+    data = workdir / "data"
+    manifest_path = data / "manifest.json"
+    manifest = {"generator_version": GENERATOR_VERSION, **asdict(config)}
+    suffix = synthetic.SUFFIXES[config.compression]
+    inputs = suite.Inputs(
+        root=str(workdir),
+        vcf=str(data / f"synthetic.vcf{suffix}"),
+        bed=str(data / f"synthetic.bed{suffix}"),
+        fastq=str(data / f"synthetic.fastq{suffix}"),
+        store=str(workdir / "processed" / "benchmark"),
+        variants=config.variants,
+        samples=config.samples,
+        populations=config.populations,
+        seed=config.seed,
+    )
+    if manifest_path.exists() and json.loads(manifest_path.read_text()) == manifest:
+        return inputs
+
+    data.mkdir(parents=True, exist_ok=True)
+    manifest_path.unlink(missing_ok=True)
+    # A store converted from other inputs must not be analysed
+    Path(inputs.store, "meta.json").unlink(missing_ok=True)
+    synthetic.generate_vcf(
+        inputs.vcf, config.variants, config.samples,
+        chromosomes=config.chromosomes, populations=config.populations,
+        missing_rate=config.missing_rate, compression=config.compression, seed=config.seed,
+    )
+    synthetic.generate_bed(inputs.bed, config.variants, chromosomes=config.chromosomes,
+                           compression=config.compression, seed=config.seed)
+    synthetic.generate_fastq(inputs.fastq, max(1, config.variants // 10),
+                             compression=config.compression, seed=config.seed)
+    manifest_path.write_text(json.dumps(manifest))
+    return inputs
+
+
+def service_environment(workdir: Path) -> Dict[str, str]:
+    """Settings for both services: everything under workdir, no network services needed."""
+    return {
+        "UPLOAD_DIR": str(workdir / "uploads"),
+        "BLOB_DIR": str(workdir / "uploads" / "blobs"),
+        "UPLOAD_SESSION_DIR": str(workdir / "uploads" / "sessions"),
+        "PROCESSED_DIR": str(workdir / "processed"),
+        "RESULTS_DIR": str(workdir / "results"),
+        "ALLELE_COUNTS_DIR": str(workdir / "allele_counts"),
+        "RESULTS_MAX_BYTES": "0",
+        "CACHE_BACKEND": "memory",
+        "JOB_QUEUE_BACKEND": "memory",
+        "DEBUG": "false",
+    }
+
+
+def _spawn(function, *args) -> Any:
+    # A fresh interpreter per run: clean imports, caches and peak RSS
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(function, *args).result()
+
+
+def _git_state() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=suite.ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=suite.ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def _host() -> Dict[str, Any]:
+    memory_mb = None
+    try:
+        with open("/proc/meminfo") as f:
+            memory_mb = int(f.readline().split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "memory_mb": memory_mb,
+    }
+
+
+def summarize_runs(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median time of the runs and the throughputs it implies."""
+    seconds = statistics.median(run["seconds"] for run in runs)
+    first = runs[0]
+    summary: Dict[str, Any] = {
+        "seconds": round(seconds, 6),
+        "seconds_min": round(min(run["seconds"] for run in runs), 6),
+        "runs": [round(run["seconds"], 6) for run in runs],
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+        "peak_children_rss_mb": max(run["peak_children_rss_mb"] for run in runs),
+    }
+    if seconds > 0:
+        if first["bytes"]:
+            summary["mb_per_s"] = round(first["bytes"] / seconds / 1e6, 3)
+        if first["variants"]:
+            summary["variants_per_s"] = round(first["variants"] / seconds, 1)
+        if first["genotypes"]:
+            summary["genotypes_per_s"] = round(first["genotypes"] / seconds, 1)
+    summary.update(first["extra"])
+    return summary
+
+
+def run(config: Config, names: Sequence[str], repeat: int = 3, workdir: Optional[Path] = None,
+        log=print) -> Dict[str, Any]:
+    """Run the named benchmarks repeat times each and return the result document."""
+    unknown = sorted(set(names) - set(suite.BENCHMARKS))
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="genomeinsight-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    os.environ.update(service_environment(workdir))
+
+    started = time.perf_counter()
+    inputs = generate_inputs(config, workdir)
+    log(f"Inputs ready in {time.perf_counter() - started:.1f}s under {workdir}")
+    inputs_dict = asdict(inputs)
+
+    results: Dict[str, Any] = {}
+    failures: Dict[str, str] = {}
+    for name in names:
+        bench = suite.BENCHMARKS[name]
+        if bench.needs_store and not Path(inputs.store, "meta.json").exists():
+            log("Converting the VCF for the analysis benchmarks")
+            _spawn(suite.prepare_store, inputs_dict)
+        try:
+            runs = [_spawn(suite.run_benchmark, name, inputs_dict) for _ in range(repeat)]
+        except Exception as e:
+            failures[name] = f"{type(e).__name__}: {e}"
+            log(f"{name:<28} FAILED {failures[name]}")
+            continue
+        results[name] = summarize_runs(runs)
+        log(format_result(name, results[name]))
+
+    return {
+        "format": RESULT_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git": _git_state(),
+        "host": _host(),
+        "config": asdict(config),
+        "repeat": repeat,
+        "inputs": {
+            "vcf_bytes": Path(inputs.vcf).stat().st_size,
+            "bed_bytes": Path(inputs.bed).stat().st_size,
+            "fastq_bytes": Path(inputs.fastq).stat().st_size,
+        },
+        "benchmarks": results,
+        "failures": failures,
+    }
+
+
+def format_result(name: str, result: Dict[str, Any]) -> str:
+    rates = []
+    if "mb_per_s" in result:
+        rates.append(f"{result['mb_per_s']:.1f} MB/s")
+    if "variants_per_s" in result:
+        rates.append(f"{result['variants_per_s']:.0f} variants/s")
+    return (f"{name:<28} {result['seconds']:>10.4f}s  {', '.join(rates):<36} "
+            f"peak RSS {result['peak_rss_mb']:.0f}MB")
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float = 0.10) -> Tuple[List[str], List[str]]:
+    """
+    Table lines comparing two result documents, and the benchmarks whose
+    median time or peak RSS grew by more than threshold.
+    """
+    lines = []
+    if base.get("config") != head.get("config"):
+        lines.append("warning: results were produced from different inputs; ratios are not comparable")
+    if base.get("host") != head.get("host"):
+        lines.append("warning: results come from different hosts")
+    lines.append(f"{'benchmark':<28} {'base s':>10} {'head s':>10} {'time':>8} {'base MB':>8} {'head MB':>8} {'rss':>8}")
+    regressions = []
+    for name in sorted(set(base["benchmarks"]) & set(head["benchmarks"])):
+        a, b = base["benchmarks"][name], head["benchmarks"][name]
+        time_ratio = b["seconds"] / a["seconds"] if a["seconds"] else float("inf")
+        rss_ratio = b["peak_rss_mb"] / a["peak_rss_mb"] if a["peak_rss_mb"] else float("inf")
+        slower = time_ratio > 1 + threshold and b["seconds"] - a["seconds"] > NOISE_SECONDS
+        regressed = slower or rss_ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        lines.append(
+            f"{name:<28} {a['seconds']:>10.4f} {b['seconds']:>10.4f} {time_ratio:>7.2f}x "
+            f"{a['peak_rss_mb']:>8.0f} {b['peak_rss_mb']:>8.0f} {rss_ratio:>7.2f}x{'  REGRESSION' if regressed else ''}"
+        )
+    for name in sorted(set(base["benchmarks"]) ^ set(head["benchmarks"])):
+        lines.append(f"{name:<28} only in {'base' if name in base['benchmarks'] else 'head'}")
+    return lines, regressions
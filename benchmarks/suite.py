@@ -0,0 +1,262 @@
+"""
+Benchmark definitions.
+
+Each benchmark runs in a fresh spawned process (see runner) with only its
+service on sys.path, so imports, settings and peak RSS never leak between
+benchmarks. A benchmark does its own setup, times only the work under test
+and returns a Measurement; run_benchmark adds the process's peak RSS.
+"""
+
+import asyncio
+import os
+import resource
+import shutil
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .synthetic import phenotypes, population_mapping
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVICE_PATHS = {
+    "file-processing": ROOT / "services" / "file-processing",
+    "genomics": ROOT / "backend" / "genomics-service",
+}
+
+# Format checks read a bounded prefix and take milliseconds; average several calls
+VALIDATE_CALLS = 20
+PLOIDY = 2
+
+# Parameters per analysis type; the engines' defaults otherwise
+ANALYSIS_PARAMETERS: Dict[str, Callable[["Inputs"], Dict[str, Any]]] = {
+    "allele_counts": lambda inputs: {},
+    "allele_frequency": lambda inputs: {},
+    "diversity": lambda inputs: {},
+    "fst": lambda inputs: {},
+    "gwas": lambda inputs: {"phenotypes": phenotypes(inputs.samples, inputs.seed)},
+    "hwe": lambda inputs: {},
+    "ld": lambda inputs: {},
+    "pca": lambda inputs: {},
+    "popgen": lambda inputs: {},
+}
+
+
+@dataclass
+class Inputs:
+    """Generated files and the genotype store the benchmarks share."""
+
+    root: str
+    vcf: str
+    bed: str
+    fastq: str
+    store: str
+    variants: int
+    samples: int
+    populations: int
+    seed: int
+
+
+@dataclass
+class Measurement:
+    """Wall time of the timed section and the work it covered."""
+
+    seconds: float
+    bytes: int = 0
+    variants: int = 0
+    genotypes: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Benchmark:
+    name: str
+    service: str
+    function: Callable[[Inputs], Measurement]
+    needs_store: bool = False
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, service: str, needs_store: bool = False):
+    def register(function: Callable[[Inputs], Measurement]) -> Callable[[Inputs], Measurement]:
+        BENCHMARKS[name] = Benchmark(name, service, function, needs_store)
+        return function
+    return register
+
+
+def _file_size(path: str) -> int:
+    return Path(path).stat().st_size
+
+
+@benchmark("upload", "file-processing")
+def upload(inputs: Inputs) -> Measurement:
+    """POST /upload ingestion: stream to disk in chunks with SHA-256 and format sniffing."""
+    from fastapi import UploadFile
+    from app.services.upload_stream import stream_upload_to_disk
+
+    size = _file_size(inputs.vcf)
+    destination = Path(inputs.root) / "staging" / Path(inputs.vcf).name
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    async def ingest():
+        with open(inputs.vcf, "rb") as f:
+            return await stream_upload_to_disk(UploadFile(file=f, filename=destination.name), destination,
+                                               max_size=size + 1)
+
+    started = time.perf_counter()
+    streamed = asyncio.run(ingest())
+    seconds = time.perf_counter() - started
+    destination.unlink()
+    return Measurement(seconds, bytes=streamed.size)
+
+
+def _validate(path: str, filename: str) -> Measurement:
+    from app.utils.file_validator import file_validator, sniff_file
+
+    size = _file_size(path)
+    started = time.perf_counter()
+    for _ in range(VALIDATE_CALLS):
+        report = file_validator.validate(filename, sniff_file(path), size)
+    seconds = (time.perf_counter() - started) / VALIDATE_CALLS
+    if not report.is_valid:
+        raise RuntimeError(f"{filename} failed validation: {report.errors}")
+    return Measurement(seconds, extra={"file_type": report.file_type})
+
+
+@benchmark("validate_vcf", "file-processing")
+def validate_vcf(inputs: Inputs) -> Measurement:
+    return _validate(inputs.vcf, Path(inputs.vcf).name)
+
+
+@benchmark("validate_bed", "file-processing")
+def validate_bed(inputs: Inputs) -> Measurement:
+    return _validate(inputs.bed, Path(inputs.bed).name)
+
+
+@benchmark("validate_fastq", "file-processing")
+def validate_fastq(inputs: Inputs) -> Measurement:
+    return _validate(inputs.fastq, Path(inputs.fastq).name)
+
+
+def _summarize(inputs: Inputs, validate: bool) -> Measurement:
+    from app.services.vcf_parser import summarize_vcf
+
+    started = time.perf_counter()
+    summary = summarize_vcf(inputs.vcf, validate=validate)
+    seconds = time.perf_counter() - started
+    if summary.variant_count != inputs.variants:
+        raise RuntimeError(f"Parsed {summary.variant_count} variants, expected {inputs.variants}")
+    extra = {"ranges": len(summary.plan.ranges), "compression": summary.plan.compression}
+    if validate:
+        extra["errors"] = summary.validation.error_count
+    return Measurement(seconds, bytes=_file_size(inputs.vcf), variants=summary.variant_count,
+                       genotypes=summary.variant_count * summary.sample_count, extra=extra)
+
+
+@benchmark("parse_vcf", "file-processing")
+def parse_vcf(inputs: Inputs) -> Measurement:
+    """Header parsing and per-chromosome record counts (the conversion's first pass)."""
+    return _summarize(inputs, validate=False)
+
+
+@benchmark("deep_validate_vcf", "file-processing")
+def deep_validate_vcf(inputs: Inputs) -> Measurement:
+    """Record-by-record validation in the counting pass."""
+    return _summarize(inputs, validate=True)
+
+
+@benchmark("convert_vcf", "file-processing")
+def convert_vcf(inputs: Inputs) -> Measurement:
+    """Columnar genotype store conversion; the analyses run on its output."""
+    from app.services.genotype_store import convert_vcf as convert
+    from app.services.vcf_parser import summarize_vcf
+
+    summary = summarize_vcf(inputs.vcf)
+    shutil.rmtree(inputs.store, ignore_errors=True)
+    Path(inputs.store).parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    convert(inputs.vcf, inputs.store, summary)
+    seconds = time.perf_counter() - started
+    return Measurement(seconds, bytes=_file_size(inputs.vcf), variants=summary.variant_count,
+                       genotypes=summary.variant_count * summary.sample_count)
+
+
+@benchmark("transcode_vcf", "file-processing")
+def transcode_vcf(inputs: Inputs) -> Measurement:
+    """BGZF transcoding at ingest on settings.bgzf_threads threads; bytes are uncompressed text."""
+    from app.core.config import settings
+    from app.services.bgzf import write_bgzf
+    from app.services.vcf_parser import open_vcf
+
+    destination = Path(inputs.root) / "staging" / "transcoded.vcf.gz"
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    threads = settings.bgzf_threads or os.cpu_count() or 1
+    started = time.perf_counter()
+    with open_vcf(inputs.vcf) as source, open(destination, "wb") as out:
+        text_size = write_bgzf(source, out, threads, settings.bgzf_level)
+    seconds = time.perf_counter() - started
+    extra = {"threads": threads, "stored_bytes": _file_size(str(destination))}
+    destination.unlink()
+    return Measurement(seconds, bytes=text_size, variants=inputs.variants, extra=extra)
+
+
+def _analysis(analysis_type: str, inputs: Inputs) -> Measurement:
+    from analysis import ANALYSES, run_analysis
+    from analysis.allele_counts import counts_path
+    from database import Dataset, create_analysis, get_analysis
+    from genotype_store import open_store
+    from memoization import result_dir
+
+    if analysis_type not in ANALYSES:
+        raise KeyError(f"The genomics service has no {analysis_type} analysis")
+    store = open_store(inputs.store)
+    if analysis_type == "allele_counts":
+        # Stores already counted are skipped; measure a full count every run
+        shutil.rmtree(counts_path(store), ignore_errors=True)
+    dataset = Dataset(id="benchmark", store_path=Path(inputs.store),
+                      populations=population_mapping(inputs.samples, inputs.populations))
+    parameters = ANALYSIS_PARAMETERS[analysis_type](inputs)
+    analysis_id = create_analysis(dataset, analysis_type, parameters)
+
+    started = time.perf_counter()
+    run_analysis(analysis_id, dataset, analysis_type, parameters)
+    seconds = time.perf_counter() - started
+    record = get_analysis(analysis_id)
+    shutil.rmtree(result_dir(analysis_id), ignore_errors=True)
+    if record["status"] != "completed":
+        raise RuntimeError(f"{analysis_type} failed: {record['error_message']}")
+    return Measurement(seconds, bytes=store.n_variants * store.n_samples * store.ploidy,
+                       variants=store.n_variants, genotypes=store.n_variants * store.n_samples)
+
+
+for _analysis_type in ANALYSIS_PARAMETERS:
+    benchmark(f"analysis_{_analysis_type}", "genomics", needs_store=True)(
+        lambda inputs, analysis_type=_analysis_type: _analysis(analysis_type, inputs)
+    )
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def run_benchmark(name: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Entry point inside the spawned process."""
+    bench = BENCHMARKS[name]
+    sys.path.insert(0, str(SERVICE_PATHS[bench.service]))
+    measurement = bench.function(Inputs(**inputs))
+    result = asdict(measurement)
+    result["peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_SELF)
+    # Parse and convert fan out to worker processes
+    result["peak_children_rss_mb"] = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return result
+
+
+def prepare_store(inputs: Dict[str, Any]) -> Optional[str]:
+    """Convert the VCF for the analysis benchmarks (untimed setup)."""
+    sys.path.insert(0, str(SERVICE_PATHS["file-processing"]))
+    convert_vcf(Inputs(**inputs))
+    return inputs["store"]
@@ -0,0 +1,259 @@
+"""
+Deterministic synthetic genomic files.
+
+Every generator takes a seed; the same arguments always produce byte-identical
+files, whatever the compression (gzip members carry no timestamp and BGZF
+blocks are cut at fixed sizes), so benchmark inputs are reproducible across
+machines and commits.
+
+VCF genotypes follow a simple population model: per-variant ancestral
+frequencies, population frequencies drawn around them with Balding-Nichols
+drift of the given Fst, Hardy-Weinberg genotypes within each population and
+uniformly missing calls.
+"""
+
+import gzip
+import struct
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Dict, List, Union
+
+import numpy as np
+
+PLAIN = "plain"
+GZIP = "gzip"
+BGZF = "bgzf"
+COMPRESSIONS = (PLAIN, GZIP, BGZF)
+SUFFIXES = {PLAIN: "", GZIP: ".gz", BGZF: ".gz"}
+
+# Records generated and written at a time; bounds memory for any file size
+CHUNK_VARIANTS = 4096
+CHUNK_RECORDS = 65536
+# Mean distance between neighbouring variants
+MEAN_GAP_BP = 100
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+# BGZF block payload (as bgzip) and the end-of-file marker block
+BGZF_BLOCK_SIZE = 0xFF00
+_BGZF_HEADER = struct.Struct("<4sIBBHBBHH")
+_BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+class BGZFWriter:
+    """Minimal bgzip-compatible writer (one deflate stream per 65280 bytes)."""
+
+    def __init__(self, raw: IO[bytes], level: int = 6):
+        self.raw = raw
+        self.level = level
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.buffer += data
+        while len(self.buffer) >= BGZF_BLOCK_SIZE:
+            self._block(bytes(self.buffer[:BGZF_BLOCK_SIZE]))
+            del self.buffer[:BGZF_BLOCK_SIZE]
+        return len(data)
+
+    def _block(self, data: bytes) -> None:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        payload = compressor.compress(data) + compressor.flush()
+        # BSIZE is the total block size minus one: 18 header + payload + 8 footer bytes
+        self.raw.write(_BGZF_HEADER.pack(b"\x1f\x8b\x08\x04", 0, 0, 0xFF, 6, 66, 67, 2, len(payload) + 25))
+        self.raw.write(payload)
+        self.raw.write(struct.pack("<II", zlib.crc32(data), len(data)))
+
+    def close(self) -> None:
+        if self.buffer:
+            self._block(bytes(self.buffer))
+            self.buffer.clear()
+        self.raw.write(_BGZF_EOF)
+        self.raw.close()
+
+    def __enter__(self) -> "BGZFWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_output(path: Union[str, Path], compression: str):
+    """Binary writer for path with the given compression."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}; expected one of {', '.join(COMPRESSIONS)}")
+    raw = open(path, "wb")
+    if compression == GZIP:
+        # No file name or mtime in the header, so output is reproducible
+        return gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=6, mtime=0)
+    if compression == BGZF:
+        return BGZFWriter(raw)
+    return raw
+
+
+@dataclass
+class SyntheticVCF:
+    """A generated VCF and what it contains."""
+
+    path: Path
+    variants: int
+    samples: List[str]
+    populations: Dict[str, List[str]]
+    chromosomes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return self.path.stat().st_size
+
+
+def sample_names(samples: int) -> List[str]:
+    return [f"S{i:06d}" for i in range(samples)]
+
+
+def population_labels(samples: int, populations: int) -> np.ndarray:
+    return np.arange(samples) % max(1, populations)
+
+
+def population_mapping(samples: int, populations: int) -> Dict[str, List[str]]:
+    """Population name -> member samples, as the genomics service takes it."""
+    names = sample_names(samples)
+    labels = population_labels(samples, populations)
+    return {f"POP{p + 1}": [names[i] for i in np.flatnonzero(labels == p)] for p in range(max(1, populations))}
+
+
+def phenotypes(samples: int, seed: int = 0) -> Dict[str, float]:
+    """A standard normal quantitative trait per sample (for GWAS)."""
+    rng = np.random.default_rng([seed, 1])
+    return {name: round(float(value), 6) for name, value in zip(sample_names(samples), rng.standard_normal(samples))}
+
+
+def _genotype_table(phased: bool) -> np.ndarray:
+    """Text of every diploid call, indexed by first allele * 2 + second allele; 4 is missing."""
+    sep = "|" if phased else "/"
+    calls = [f"0{sep}0", f"0{sep}1", f"1{sep}0", f"1{sep}1", f".{sep}."]
+    return np.frombuffer("".join(f"{call}\t" for call in calls).encode(), dtype=np.uint8).reshape(5, 4)
+
+
+def _variant_lines(rng: np.random.Generator, chrom: str, positions: np.ndarray, first_id: int,
+                   labels: np.ndarray, populations: int, fst: float, missing_rate: float,
+                   table: np.ndarray) -> bytes:
+    rows = len(positions)
+    samples = len(labels)
+    ancestral = np.clip(rng.beta(0.6, 0.6, rows), 0.01, 0.99)
+    if fst > 0:
+        shape = (1 - fst) / fst
+        freqs = rng.beta((ancestral * shape)[:, None], ((1 - ancestral) * shape)[:, None], (rows, populations))
+    else:
+        freqs = np.repeat(ancestral[:, None], populations, axis=1)
+    alleles = rng.random((rows, samples, 2)) < freqs[:, labels][:, :, None]
+    codes = alleles[:, :, 0] * 2 + alleles[:, :, 1]
+    codes[rng.random((rows, samples)) < missing_rate] = 4
+
+    text = table[codes].reshape(rows, samples * 4)
+    text[:, -1] = ord("\n")
+    ref = rng.integers(0, 4, rows)
+    alt = (ref + rng.integers(1, 4, rows)) % 4
+    af = (alleles.sum(axis=(1, 2)) / (2 * samples)).round(4)
+    return b"".join(
+        f"{chrom}\t{pos}\tvar{first_id + i}\t{'ACGT'[ref[i]]}\t{'ACGT'[alt[i]]}\t.\tPASS\tAF={af[i]:g}\tGT\t".encode()
+        + text[i].tobytes()
+        for i, pos in enumerate(positions.tolist())
+    )
+
+
+def generate_vcf(
+    path: Union[str, Path],
+    variants: int,
+    samples: int,
+    *,
+    chromosomes: int = 2,
+    populations: int = 2,
+    fst: float = 0.05,
+    missing_rate: float = 0.01,
+    phased: bool = False,
+    compression: str = PLAIN,
+    seed: int = 0,
+) -> SyntheticVCF:
+    """Write a diploid, biallelic VCF with variants split evenly across chromosomes."""
+    path = Path(path)
+    rng = np.random.default_rng([seed, 0])
+    names = sample_names(samples)
+    labels = population_labels(samples, populations)
+    table = _genotype_table(phased)
+    per_chrom = np.full(chromosomes, variants // chromosomes)
+    per_chrom[: variants % chromosomes] += 1
+    contigs = {str(c + 1): int(n) for c, n in enumerate(per_chrom)}
+
+    with open_output(path, compression) as out:
+        header = [
+            "##fileformat=VCFv4.2",
+            "##source=genomeinsight-benchmarks",
+            *(f"##contig=<ID={chrom},length={n * MEAN_GAP_BP * 2 + 1}>" for chrom, n in contigs.items()),
+            '##INFO=<ID=AF,Number=A,Type=Float,Description="Alternate allele frequency">',
+            '##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">',
+            "\t".join(["#CHROM", "POS", "ID", "REF", "ALT", "QUAL", "FILTER", "INFO", "FORMAT", *names]),
+        ]
+        out.write(("\n".join(header) + "\n").encode())
+        written = 0
+        for chrom, count in contigs.items():
+            position = 0
+            for start in range(0, count, CHUNK_VARIANTS):
+                rows = min(CHUNK_VARIANTS, count - start)
+                positions = position + np.cumsum(rng.integers(1, 2 * MEAN_GAP_BP, rows))
+                position = int(positions[-1])
+                out.write(_variant_lines(rng, chrom, positions, written, labels, max(1, populations),
+                                         fst, missing_rate, table))
+                written += rows
+
+    return SyntheticVCF(
+        path=path,
+        variants=variants,
+        samples=names,
+        populations=population_mapping(samples, populations),
+        chromosomes=contigs,
+    )
+
+
+def generate_bed(path: Union[str, Path], intervals: int, *, chromosomes: int = 2,
+                 compression: str = PLAIN, seed: int = 0) -> Path:
+    """Write sorted BED6 intervals split evenly across chromosomes."""
+    path = Path(path)
+    rng = np.random.default_rng([seed, 2])
+    per_chrom = np.full(chromosomes, intervals // chromosomes)
+    per_chrom[: intervals % chromosomes] += 1
+    written = 0
+    with open_output(path, compression) as out:
+        for c, count in enumerate(per_chrom.tolist()):
+            end = 0
+            for start in range(0, count, CHUNK_RECORDS):
+                rows = min(CHUNK_RECORDS, count - start)
+                starts = end + np.cumsum(rng.integers(1, 2000, rows))
+                lengths = rng.integers(50, 5000, rows)
+                scores = rng.integers(0, 1001, rows)
+                strands = np.where(rng.random(rows) < 0.5, "+", "-")
+                end = int(starts[-1] + lengths[-1])
+                out.write("".join(
+                    f"chr{c + 1}\t{s}\t{s + n}\tregion{written + i}\t{score}\t{strand}\n"
+                    for i, (s, n, score, strand) in enumerate(zip(starts.tolist(), lengths.tolist(),
+                                                                  scores.tolist(), strands.tolist()))
+                ).encode())
+                written += rows
+    return path
+
+
+def generate_fastq(path: Union[str, Path], reads: int, *, read_length: int = 150,
+                   compression: str = PLAIN, seed: int = 0) -> Path:
+    """Write single-end reads with Phred+33 qualities."""
+    path = Path(path)
+    rng = np.random.default_rng([seed, 3])
+    written = 0
+    with open_output(path, compression) as out:
+        while written < reads:
+            rows = min(CHUNK_RECORDS // 16, reads - written)
+            bases = BASES[rng.integers(0, 4, (rows, read_length))]
+            quals = (rng.integers(2, 41, (rows, read_length)) + 33).astype(np.uint8)
+            out.write(b"".join(
+                b"@read%d\n%s\n+\n%s\n" % (written + i, bases[i].tobytes(), quals[i].tobytes())
+                for i in range(rows)
+            ))
+            written += rows
+    return path
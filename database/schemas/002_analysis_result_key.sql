@@ -0,0 +1,5 @@
+-- Memoization key of an analysis: sha256 of the dataset content hash, analysis
+-- type, canonical parameters and engine version (see genomics-service memoization.py)
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS result_key VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_analyses_result_key ON analyses(dataset_id, result_key, started_at DESC);
@@ -0,0 +1,4 @@
+-- Last write to a running analysis (progress step or heartbeat); a running
+-- analysis that stops updating it is presumed dead and is not reused
+-- (see genomics-service memoization.py)
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS progress_at TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,44 @@
+"""
+Batch upload API.
+Registers many files (e.g. per-sample VCFs from a sequencing run) in one
+multipart request with one database transaction.
+"""
+
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.database import get_async_db
+from ..services.batch_upload import ingest_batch
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["upload"])
+
+
+@router.post("/upload/batch")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Upload and validate several genomic files at once.
+    Each entry of "files" is either the POST /upload response (plus job_id)
+    or a failure with its status_code and error.
+    """
+    if len(files) > settings.max_batch_files:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files in batch: {len(files)} (maximum {settings.max_batch_files})"
+        )
+
+    try:
+        return await ingest_batch(db, files)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch upload error: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch upload failed: {str(e)}")
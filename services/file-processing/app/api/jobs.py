@@ -0,0 +1,33 @@
+"""
+Background job status API.
+"""
+
+from fastapi import APIRouter, HTTPException
+
+from ..models.file_models import ProcessingJobResponse, ProcessingStatus
+from ..services.jobs import get_job_queue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+STATUS_MESSAGES = {
+    ProcessingStatus.PENDING: "Job is waiting for a worker",
+    ProcessingStatus.PROCESSING: "Job is being processed",
+    ProcessingStatus.COMPLETED: "Job completed",
+    ProcessingStatus.FAILED: "Job failed",
+}
+
+
+@router.get("/{job_id}", response_model=ProcessingJobResponse)
+def get_job(job_id: str):
+    """Report the state of a processing job (sync: the Redis queue client blocks)."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ProcessingJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        progress=job.progress,
+        message=STATUS_MESSAGES[job.status],
+        results=job.results,
+        error_message=job.error_message,
+    )
@@ -0,0 +1,72 @@
+"""
+Region query API.
+Streams the records of a processed VCF that fall inside a genomic interval,
+located through the genotype store's position and record-offset index.
+"""
+
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_async_db
+from ..models.database import UploadedFile
+from ..services import genotype_store
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/files", tags=["regions"])
+
+
+@router.get("/{file_id}/region")
+async def get_region(
+    file_id: int,
+    chrom: str = Query(..., description="Chromosome as named in the file"),
+    start: int = Query(..., ge=1, description="First position, 1-based"),
+    end: int = Query(..., ge=1, description="Last position, inclusive"),
+    header: bool = Query(True, description="Include the VCF header"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Stream the records with start <= POS <= end on chrom. Store reads run in a
+    worker thread and the records stream from the threadpool, so the event
+    loop never touches the file.
+    """
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    db_file = await db.scalar(select(UploadedFile).where(
+        UploadedFile.id == file_id,
+        UploadedFile.is_deleted == False
+    ))
+    if not db_file:
+        raise HTTPException(status_code=404, detail="File not found")
+    if db_file.status != "processed" or not db_file.processed_path:
+        raise HTTPException(status_code=409, detail=f"File is not processed (status: {db_file.status})")
+
+    store = await asyncio.to_thread(genotype_store.open_store, db_file.processed_path)
+    if store.record_offsets is None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"File has no region index; reprocess it with POST /files/{file_id}/process"
+        )
+    if not genotype_store.supports_region_queries(store):
+        raise HTTPException(
+            status_code=409,
+            detail="Region queries need an uncompressed or BGZF-compressed (bgzip) file"
+        )
+    if chrom not in store.meta["chrom_offsets"]:
+        raise HTTPException(status_code=404, detail=f"Chromosome {chrom} not found in file")
+
+    rows = await asyncio.to_thread(genotype_store.region_rows, store, chrom, start, end)
+    record_count = rows.stop - rows.start if isinstance(rows, slice) else len(rows)
+    logger.info(f"Region {chrom}:{start}-{end} of file {file_id}: {record_count} records")
+
+    return StreamingResponse(
+        genotype_store.iter_records(store, db_file.file_path, rows, include_header=header),
+        media_type="text/plain",
+        headers={"X-Record-Count": str(record_count)},
+    )
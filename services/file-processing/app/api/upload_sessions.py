@@ -0,0 +1,83 @@
+"""
+Resumable multi-part upload API.
+Clients create a session, PUT numbered chunks (in any order, in parallel),
+check which chunks arrived, then commit the session into a single file.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_async_db
+from ..models.file_models import UploadSessionCreate, UploadSessionStatus
+from ..services import blob_store, upload_sessions
+from ..services.ingest import finalize_upload
+from ..services.processing import enqueue_processing
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/uploads", tags=["upload-sessions"])
+
+
+@router.post("", status_code=201)
+async def create_upload_session(request: UploadSessionCreate):
+    """Start a resumable upload session."""
+    manifest = upload_sessions.create_session(
+        request.filename, request.total_size, request.chunk_size
+    )
+    return {
+        "session_id": manifest.session_id,
+        "filename": manifest.filename,
+        "total_size": manifest.total_size,
+        "chunk_size": manifest.chunk_size,
+        "total_chunks": manifest.total_chunks,
+    }
+
+
+@router.get("/{session_id}", response_model=UploadSessionStatus)
+async def get_upload_session(session_id: str):
+    """Report which chunks of a session have been received."""
+    return upload_sessions.session_status(session_id)
+
+
+@router.put("/{session_id}/chunks/{index}")
+async def upload_chunk(session_id: str, index: int, request: Request):
+    """Upload one chunk as the raw request body. Re-sending a chunk replaces it."""
+    size, sha256 = await upload_sessions.write_chunk(session_id, index, request.stream())
+    return {"session_id": session_id, "index": index, "size": size, "sha256": sha256}
+
+
+@router.post("/{session_id}/commit")
+async def commit_upload_session(session_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Assemble a complete session into one file and register it like POST /upload."""
+    try:
+        manifest = upload_sessions.load_manifest(session_id)
+
+        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        safe_filename = f"{timestamp}_{manifest.filename}"
+        file_path = blob_store.staging_path(safe_filename)
+
+        logger.info(f"Assembling upload session {session_id} into {safe_filename}")
+        streamed = await asyncio.to_thread(upload_sessions.assemble, session_id, file_path)
+        logger.info(f"File saved: {safe_filename} ({streamed.size} bytes, sha256 {streamed.sha256})")
+
+        result = await finalize_upload(db, streamed, safe_filename, manifest.filename)
+        upload_sessions.delete_session(session_id)
+        # The Redis queue client is synchronous
+        result["job_id"] = await asyncio.to_thread(enqueue_processing, result)
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Commit error for session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Commit failed: {str(e)}")
+
+
+@router.delete("/{session_id}", status_code=204)
+async def abort_upload_session(session_id: str):
+    """Discard a session and its chunks."""
+    upload_sessions.delete_session(session_id)
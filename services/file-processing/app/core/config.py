@@ -47,7 +47,141 @@ class Settings(BaseSettings):
         default=1024 * 1024 * 1024,  # 1GB
         description="Maximum file size in bytes"
     )
-    
+    upload_chunk_size: int = Field(
+        default=1024 * 1024,  # 1MB
+        description="Chunk size used when streaming uploads to disk"
+    )
+    blob_dir: str = Field(
+        default="/app/uploads/blobs",
+        description="Content-addressed storage for uploaded files"
+    )
+    upload_session_dir: str = Field(
+        default="/app/uploads/sessions",
+        description="Directory holding chunks of resumable upload sessions"
+    )
+    upload_session_chunk_size: int = Field(
+        default=16 * 1024 * 1024,  # 16MB
+        description="Default chunk size for resumable upload sessions"
+    )
+    max_upload_session_chunk_size: int = Field(
+        default=256 * 1024 * 1024,  # 256MB
+        description="Largest chunk a client may request for an upload session"
+    )
+    max_upload_session_size: int = Field(
+        default=50 * 1024 * 1024 * 1024,  # 50GB
+        description="Maximum total size of a resumable upload"
+    )
+    parse_block_size: int = Field(
+        default=4 * 1024 * 1024,  # 4MB
+        description="Block size for streaming VCF parsing"
+    )
+    parse_workers: int = Field(
+        default=0,
+        description="Processes used to parse one VCF (0 = one per CPU core, 1 = no process pool)"
+    )
+    parse_split_size: int = Field(
+        default=32 * 1024 * 1024,  # 32MB
+        description="Minimum uncompressed bytes per range when a VCF is parsed in parallel"
+    )
+    max_batch_files: int = Field(
+        default=1000,
+        description="Maximum number of files in one POST /upload/batch request"
+    )
+    batch_upload_concurrency: int = Field(
+        default=8,
+        description="Files of a batch upload streamed to disk and validated concurrently"
+    )
+    vcf_deep_validation: bool = Field(
+        default=False,
+        description="Check every VCF record while processing (POST /files/{id}/process can override)"
+    )
+    vcf_validation_max_examples: int = Field(
+        default=5,
+        description="Errors recorded (with line numbers) per error class by deep validation"
+    )
+    vcf_validation_error_budget: int = Field(
+        default=1000,
+        description="Deep validation stops after this many errors"
+    )
+    sniff_lines: int = Field(
+        default=50,
+        description="Number of leading lines inspected for the format check"
+    )
+    sniff_bytes: int = Field(
+        default=64 * 1024,  # 64KB
+        description="Maximum (decompressed) prefix kept for the format check"
+    )
+    store_bgzf: bool = Field(
+        default=True,
+        description="Transcode plain and gzip VCF/BED uploads to BGZF before storing them"
+    )
+    bgzf_threads: int = Field(
+        default=0,
+        description="Threads compressing one upload to BGZF (0 = one per CPU core)"
+    )
+    bgzf_level: int = Field(
+        default=6,
+        description="zlib level for BGZF transcoding (1 = fastest, 9 = smallest)"
+    )
+
+    # Background Jobs
+    job_queue_backend: str = Field(
+        default="redis",
+        description="Job queue backend: 'redis' or 'memory' (single process, for development and tests)"
+    )
+    job_queue_name: str = Field(
+        default="genomeinsight:jobs",
+        description="Redis key prefix for the job queue"
+    )
+    job_ttl_seconds: int = Field(
+        default=7 * 24 * 3600,
+        description="How long job state is kept in Redis"
+    )
+    job_visibility_timeout: int = Field(
+        default=120,
+        description="Seconds without a heartbeat after which a worker's claimed jobs are requeued"
+    )
+    job_max_attempts: int = Field(
+        default=3,
+        description="Deliveries of a job before it (and its file) is marked failed"
+    )
+    inline_workers: int = Field(
+        default=1,
+        description="Worker threads run inside the API process with the memory backend"
+    )
+    worker_metrics_port: int = Field(
+        default=9102,
+        description="Port worker processes serve Prometheus metrics on (0 = disabled)"
+    )
+
+    # Caching
+    cache_backend: str = Field(
+        default="redis",
+        description="Response cache backend: 'redis' (falls back to memory if unreachable) or 'memory'"
+    )
+    cache_prefix: str = Field(
+        default="genomeinsight:cache",
+        description="Redis key prefix for cached responses"
+    )
+    cache_file_ttl: int = Field(
+        default=300,
+        description="Seconds GET /files/{file_id} responses are cached"
+    )
+    cache_max_entries: int = Field(
+        default=10000,
+        description="Entries kept by the in-memory cache backend"
+    )
+    cache_max_value_bytes: int = Field(
+        default=1024 * 1024,  # 1MB
+        description="Responses larger than this are not cached"
+    )
+
+    # File Listing
+    file_count_cache_ttl: int = Field(
+        default=30,
+        description="Seconds between re-reads of the per-status/file-type totals for GET /files; uploads and status changes update them in between"
+    )
+
     # API Configuration
     api_host: str = Field(default="0.0.0.0", description="API host")
     api_port: int = Field(default=8002, description="API port")
@@ -112,6 +246,37 @@ class Settings(BaseSettings):
         
         return url
 
+    def get_async_database_url(self) -> str:
+        """Database URL with an asyncio driver (asyncpg for PostgreSQL, aiosqlite for SQLite)."""
+        url = self.get_database_url()
+        scheme, _, rest = url.partition("://")
+        drivers = {
+            "postgresql": "postgresql+asyncpg",
+            "postgres": "postgresql+asyncpg",
+            "postgresql+psycopg2": "postgresql+asyncpg",
+            "sqlite": "sqlite+aiosqlite",
+        }
+        return f"{drivers.get(scheme, scheme)}://{rest}"
+
+
+# Upload file extensions (lower case, compressed double extensions included) -> file type
+FILE_TYPE_MAPPING = {
+    '.vcf': 'vcf',
+    '.vcf.gz': 'vcf',
+    '.vcf.bgz': 'vcf',
+    '.bed': 'bed',
+    '.bed.gz': 'bed',
+    '.bam': 'bam',
+    '.sam': 'sam',
+    '.fastq': 'fastq',
+    '.fq': 'fastq',
+    '.fastq.gz': 'fastq',
+    '.fq.gz': 'fastq',
+    '.fa': 'fasta',
+    '.fasta': 'fasta',
+    '.fa.gz': 'fasta',
+    '.fasta.gz': 'fasta',
+}
 
 # Create global settings instance
 settings = Settings()
@@ -3,16 +3,18 @@ Database connection and session management.
 Fixed to properly handle Docker environment and connection errors.
 """
 
-from sqlalchemy import create_engine, text, pool
+from sqlalchemy import create_engine, inspect, text, pool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 import logging
 import time
 from contextlib import contextmanager
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
 
 from .config import settings
+from .metrics import DB_POOL_WAIT_SECONDS, watch_pool
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -21,9 +23,34 @@ logger = logging.getLogger(__name__)
 # SQLAlchemy base class
 Base = declarative_base()
 
+
+class InstrumentedQueuePool(pool.QueuePool):
+    """QueuePool that records how long each checkout waits for a connection."""
+
+    metrics_name = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(self.metrics_name).observe(time.perf_counter() - started)
+
+
+class InstrumentedAsyncQueuePool(pool.AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(self.metrics_name).observe(time.perf_counter() - started)
+
+
 # Database engine configuration
 engine_kwargs = {
-    "poolclass": pool.QueuePool,
+    "poolclass": InstrumentedQueuePool,
     "pool_size": 5,
     "max_overflow": 10,
     "pool_pre_ping": True,
@@ -31,9 +58,22 @@ engine_kwargs = {
     "echo": settings.debug,  # SQL query logging in debug mode
 }
 
+# Async engine for request handlers; requests wait on the pool without
+# blocking the event loop, so keep it larger than the sync pool
+async_engine_kwargs = {
+    "poolclass": InstrumentedAsyncQueuePool,
+    "pool_size": 20,
+    "max_overflow": 20,
+    "pool_pre_ping": True,
+    "pool_recycle": 300,
+    "echo": settings.debug,
+}
+
 # Global variables
 engine = None
 SessionLocal = None
+async_engine: AsyncEngine = None
+AsyncSessionLocal = None
 
 
 def create_database_engine():
@@ -45,6 +85,7 @@ def create_database_engine():
         logger.info(f"Creating database engine with URL: {database_url}")
         
         engine = create_engine(database_url, **engine_kwargs)
+        watch_pool("sync", engine.pool, engine_kwargs["pool_size"] + engine_kwargs["max_overflow"])
         
         # Test connection
         with engine.connect() as conn:
@@ -58,6 +99,18 @@ def create_database_engine():
         raise
 
 
+def create_async_database_engine():
+    """Create the asyncio engine and session factory; connections are opened lazily."""
+    global async_engine, AsyncSessionLocal
+
+    async_engine = create_async_engine(settings.get_async_database_url(), **async_engine_kwargs)
+    watch_pool("async", async_engine.sync_engine.pool,
+               async_engine_kwargs["pool_size"] + async_engine_kwargs["max_overflow"])
+    # Rows stay readable after commit without a (blocking) lazy refresh
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+    return async_engine
+
+
 def create_session_factory():
     """Create session factory."""
     global SessionLocal
@@ -102,6 +155,20 @@ def wait_for_db(max_retries: int = 30, retry_interval: int = 2) -> bool:
     return False
 
 
+def add_missing_columns(table) -> None:
+    """Add the model's (nullable) columns that an existing table lacks."""
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    # Replicas may start together; SQLite has no IF NOT EXISTS here
+    if_not_exists = "IF NOT EXISTS " if engine.dialect.name == "postgresql" else ""
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {if_not_exists}{column.name} {column_type}"))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
 def init_database():
     """Initialize database connection and create tables."""
     global engine, SessionLocal
@@ -123,6 +190,10 @@ def init_database():
         # Create all tables
         logger.info("Creating database tables...")
         Base.metadata.create_all(bind=engine)
+        # create_all skips existing tables; add columns and indexes introduced since
+        add_missing_columns(UploadedFile.__table__)
+        for index in UploadedFile.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
         logger.info("Database tables created successfully")
         
         return True
@@ -172,6 +243,35 @@ def get_db() -> Generator[Session, None, None]:
         session.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for FastAPI to get an async database session.
+    Used with Depends(get_async_db) in async route functions.
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Database not initialized")
+
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Database session error: {e}")
+            raise
+
+
+async def get_optional_async_db() -> AsyncGenerator[Optional[AsyncSession], None]:
+    """
+    Like get_async_db, but yields None instead of failing when the database is
+    not initialized, for routes that can work from the filesystem alone.
+    """
+    if AsyncSessionLocal is None:
+        yield None
+        return
+    async for session in get_async_db():
+        yield session
+
+
 def close_database():
     """Close database connections."""
     global engine, SessionLocal
@@ -184,15 +284,25 @@ def close_database():
         logger.info("Database connections closed")
 
 
+async def close_async_database():
+    """Close the async engine's connections."""
+    global async_engine, AsyncSessionLocal
+
+    if async_engine:
+        await async_engine.dispose()
+        async_engine = None
+        AsyncSessionLocal = None
+
+
 # Health check function
-def check_database_health() -> dict:
-    """Check database health status."""
+async def check_database_health() -> dict:
+    """Check database health status without blocking the event loop."""
     try:
-        if engine is None:
+        if async_engine is None:
             return {"status": "error", "message": "Database not initialized"}
             
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT 1 as health_check"))
+        async with async_engine.connect() as conn:
+            result = await conn.execute(text("SELECT 1 as health_check"))
             row = result.fetchone()
             
             if row and row[0] == 1:
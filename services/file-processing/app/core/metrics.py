@@ -0,0 +1,145 @@
+"""
+Prometheus metrics for the file processing service.
+
+The API exports them on GET /metrics; worker processes (python -m app.worker)
+serve their own registry on settings.worker_metrics_port. Route labels use the
+route template (/files/{file_id}), never the raw path, to bound cardinality.
+"""
+
+import time
+from typing import Callable
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily
+
+# Parsing and conversion of a large VCF takes minutes to hours
+LONG_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+# 1MB/s .. 1GB/s
+THROUGHPUT_BUCKETS = tuple(float(2 ** 20 * 2 ** i) for i in range(11))
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+)
+UPLOAD_BYTES = Counter(
+    "upload_bytes_total",
+    "Bytes received by uploads",
+    ["source"],
+)
+UPLOAD_THROUGHPUT = Histogram(
+    "upload_throughput_bytes_per_second",
+    "Receive rate of each upload (or upload session chunk)",
+    ["source"],
+    buckets=THROUGHPUT_BUCKETS,
+)
+VALIDATION_SECONDS = Histogram(
+    "file_validation_duration_seconds",
+    "Format validation time by file type",
+    ["file_type"],
+)
+PARSE_SECONDS = Histogram(
+    "file_parse_duration_seconds",
+    "Processing stage time by file type",
+    ["file_type", "stage"],
+    buckets=LONG_BUCKETS,
+)
+JOB_SECONDS = Histogram(
+    "processing_job_duration_seconds",
+    "Processing job time by file type and outcome",
+    ["file_type", "status"],
+    buckets=LONG_BUCKETS,
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "processing_job_queue_depth",
+    "Processing jobs waiting for a worker",
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["pool"],
+)
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Checked out connections over pool_size + max_overflow",
+    ["pool"],
+)
+
+
+def watch_pool(name: str, db_pool, capacity: int) -> None:
+    """Export the checkout gauges of a QueuePool, read at scrape time."""
+    DB_POOL_CHECKED_OUT.labels(name).set_function(db_pool.checkedout)
+    DB_POOL_SATURATION.labels(name).set_function(lambda: db_pool.checkedout() / capacity)
+
+
+def watch_queue_depth(depth: Callable[[], int]) -> None:
+    def read() -> float:
+        try:
+            return float(depth())
+        except Exception:
+            # Queue backend unreachable; the scrape itself must not fail
+            return float("nan")
+
+    JOB_QUEUE_DEPTH.set_function(read)
+
+
+def record_upload(source: str, size: int, started: float) -> None:
+    """Count an upload received since started (a perf_counter reading)."""
+    UPLOAD_BYTES.labels(source).inc(size)
+    elapsed = time.perf_counter() - started
+    if size and elapsed > 0:
+        UPLOAD_THROUGHPUT.labels(source).observe(size / elapsed)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every HTTP request; streams bodies through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], route, str(status[0])).observe(time.perf_counter() - started)
+
+
+class CacheStatsCollector:
+    """The read-through cache counters (see services.cache) as Prometheus counters."""
+
+    def __init__(self, stats: Callable[[], dict]):
+        self.stats = stats
+
+    def collect(self):
+        family = CounterMetricFamily(
+            "cache_operations", "Read-through cache operations", labels=["namespace", "operation"]
+        )
+        for namespace, counters in self.stats().items():
+            if isinstance(counters, dict):
+                for operation, value in counters.items():
+                    family.add_metric([namespace, operation], value)
+        yield family
+
+
+def register_cache_stats(stats: Callable[[], dict]) -> None:
+    REGISTRY.register(CacheStatsCollector(stats))
@@ -3,21 +3,39 @@ Main FastAPI application for GenomeInsight file processing service.
 Simplified version for Phase 1 - Database integration testing.
 """
 
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import os
 import logging
 from typing import List, Optional
 from datetime import datetime
-import aiofiles
 from pathlib import Path
 
 # Local imports
 from .core.config import settings
-from .core.database import init_database, get_db, check_database_health, close_database
+from .core import metrics
+from .core.database import (
+    init_database, get_async_db, get_optional_async_db, check_database_health, close_database,
+    create_async_database_engine, close_async_database
+)
 from .models.database import UploadedFile
+from .services.upload_stream import stream_upload_to_disk
+from .services.ingest import finalize_upload
+from .services import blob_store, file_listing
+from .utils.file_validator import file_validator, sniff_file
+from .services.cache import cache_stats, file_details_cache, get_backend as get_cache_backend
+from .services.jobs import get_job_queue
+from .services.processing import enqueue_processing, PROCESSABLE_TYPES
+from .api.upload_sessions import router as upload_sessions_router
+from .api.batch_upload import router as batch_upload_router
+from .api.jobs import router as jobs_router
+from .api.regions import router as regions_router
+from .worker import start_inline_workers, stop_inline_workers
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -40,6 +58,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route (outermost, so it times the whole stack)
+app.add_middleware(metrics.RequestMetricsMiddleware)
+metrics.register_cache_stats(cache_stats)
+metrics.watch_queue_depth(lambda: get_job_queue().depth())
+
+# Routers
+app.include_router(upload_sessions_router)
+app.include_router(batch_upload_router)
+app.include_router(jobs_router)
+app.include_router(regions_router)
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -55,17 +84,26 @@ async def startup_event():
         # Create upload directories
         os.makedirs(settings.upload_dir, exist_ok=True)
         os.makedirs(settings.processed_dir, exist_ok=True)
+        os.makedirs(settings.upload_session_dir, exist_ok=True)
+        os.makedirs(settings.blob_dir, exist_ok=True)
         logger.info("Upload directories created")
         
         # Initialize database with proper error handling
         try:
             logger.info("Initializing database connection...")
             init_database()
+            create_async_database_engine()
             logger.info("Database initialized successfully")
         except Exception as e:
             logger.error(f"Database initialization failed: {e}")
             logger.warning("Continuing without database - some features will be disabled")
         
+        # Pick the cache backend now rather than on the first request
+        get_cache_backend()
+        
+        # Workers inside the API process only for the in-memory job queue
+        start_inline_workers()
+        
         logger.info("Service startup completed successfully")
         
     except Exception as e:
@@ -77,6 +115,8 @@ async def startup_event():
 async def shutdown_event():
     """Clean up on shutdown."""
     logger.info("Shutting down GenomeInsight File Processing Service...")
+    stop_inline_workers()
+    await close_async_database()
     close_database()
     logger.info("Shutdown completed")
 
@@ -84,7 +124,7 @@ async def shutdown_event():
 @app.get("/health")
 async def health_check():
     """Health check endpoint with database status."""
-    db_health = check_database_health()
+    db_health = await check_database_health()
     
     return {
         "status": "healthy",
@@ -92,6 +132,7 @@ async def health_check():
         "version": "1.0.0",
         "timestamp": datetime.utcnow().isoformat(),
         "database": db_health,
+        "cache": cache_stats(),
         "upload_dir": settings.upload_dir,
         "processed_dir": settings.processed_dir,
         "config": {
@@ -101,44 +142,46 @@ async def health_check():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus metrics (sync: reading the queue depth may block on Redis)."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/validate/{filename}")
-async def validate_file_endpoint(filename: str):
-    """Basic file validation by filename."""
-    file_path = Path(settings.upload_dir) / filename
+async def validate_file_endpoint(filename: str, db: Optional[AsyncSession] = Depends(get_optional_async_db)):
+    """Validate a stored file by its content."""
+    # Stored files live in the blob store; fall back to the legacy upload directory
+    db_file = None
+    if db is not None:
+        try:
+            db_file = await db.scalar(select(UploadedFile).where(
+                UploadedFile.filename == filename,
+                UploadedFile.is_deleted == False
+            ))
+        except Exception as e:
+            logger.warning(f"File lookup failed, validating from the upload directory: {e}")
+    file_path = Path(db_file.file_path) if db_file else Path(settings.upload_dir) / filename
     
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
     
-    # Basic validation without external validator
+    # Content-based validation over a bounded prefix of the file
     file_size = file_path.stat().st_size
-    file_extension = file_path.suffix.lower()
-    
-    # Simple file type detection
-    genomic_extensions = {
-        '.vcf': 'vcf',
-        '.vcf.gz': 'vcf',
-        '.bed': 'bed',
-        '.bam': 'bam',
-        '.sam': 'sam',
-        '.fastq': 'fastq',
-        '.fq': 'fastq',
-        '.fa': 'fasta',
-        '.fasta': 'fasta'
-    }
-    
-    file_type = genomic_extensions.get(file_extension, 'unknown')
-    is_valid = file_type != 'unknown' and file_size > 0
-    
+    report = file_validator.validate(filename, await asyncio.to_thread(sniff_file, file_path), file_size)
+
     return {
         "filename": filename,
-        "is_valid": is_valid,
-        "file_type": file_type,
+        "is_valid": report.is_valid,
+        "file_type": report.file_type or 'unknown',
+        "detected_type": report.detected_type,
         "file_size": file_size,
-        "errors": [] if is_valid else [f"Unsupported file type: {file_extension}"],
-        "warnings": [],
+        "errors": report.errors,
+        "warnings": report.warnings,
         "metadata": {
-            "file_extension": file_extension,
-            "file_size_mb": round(file_size / (1024*1024), 2)
+            "file_extension": report.extension,
+            "file_size_mb": round(file_size / (1024*1024), 2),
+            "compression": report.compression
         }
     }
 
@@ -146,7 +189,7 @@ async def validate_file_endpoint(filename: str):
 @app.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Upload and validate a genomic file with database persistence."""
     try:
@@ -160,92 +203,18 @@ async def upload_file(
         # Create unique filename to avoid conflicts
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         safe_filename = f"{timestamp}_{file.filename}"
-        file_path = Path(settings.upload_dir) / safe_filename
+        file_path = blob_store.staging_path(safe_filename)
         
-        # Save file to disk
+        # Stream file to disk in bounded chunks (hash and format sniff inline)
         logger.info(f"Saving file: {safe_filename}")
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        streamed = await stream_upload_to_disk(file, file_path)
         
-        file_size = len(content)
-        logger.info(f"File saved: {safe_filename} ({file_size} bytes)")
+        logger.info(f"File saved: {safe_filename} ({streamed.size} bytes, sha256 {streamed.sha256})")
         
-        # Basic file type detection
-        file_extension = Path(file.filename).suffix.lower()
-        genomic_extensions = {
-            '.vcf': 'vcf',
-            '.vcf.gz': 'vcf',
-            '.bed': 'bed',
-            '.bam': 'bam',
-            '.sam': 'sam',
-            '.fastq': 'fastq',
-            '.fq': 'fastq',
-            '.fa': 'fasta',
-            '.fasta': 'fasta'
-        }
-        
-        file_type = genomic_extensions.get(file_extension, 'unknown')
-        is_valid = file_type != 'unknown' and file_size > 0
-        
-        if not is_valid:
-            # Remove invalid file
-            if file_path.exists():
-                file_path.unlink()
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid file type: {file_extension}"
-            )
-        
-        # Save file metadata to database
-        try:
-            db_file = UploadedFile(
-                filename=safe_filename,
-                original_filename=file.filename,
-                file_size=file_size,
-                file_type=file_type,
-                status="uploaded",
-                file_path=str(file_path),
-                validation_result={
-                    "is_valid": is_valid,
-                    "file_type": file_type,
-                    "errors": [],
-                    "warnings": [],
-                    "metadata": {
-                        "file_extension": file_extension,
-                        "file_size_mb": round(file_size / (1024*1024), 2)
-                    }
-                }
-            )
-            
-            db.add(db_file)
-            db.commit()
-            db.refresh(db_file)
-            
-            logger.info(f"File metadata saved to database: ID {db_file.id}")
-            
-            return {
-                "message": "File uploaded successfully",
-                "file_id": db_file.id,
-                "filename": safe_filename,
-                "original_filename": file.filename,
-                "file_size": file_size,
-                "file_type": file_type,
-                "status": "uploaded",
-                "validation": {
-                    "is_valid": is_valid,
-                    "file_type": file_type,
-                    "errors": [],
-                    "warnings": []
-                }
-            }
-            
-        except Exception as e:
-            logger.error(f"Database error: {e}")
-            # Remove file if database save fails
-            if file_path.exists():
-                file_path.unlink()
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        result = await finalize_upload(db, streamed, safe_filename, file.filename)
+        # The Redis queue client is synchronous
+        result["job_id"] = await asyncio.to_thread(enqueue_processing, result)
+        return result
         
     except HTTPException:
         raise
@@ -256,83 +225,117 @@ async def upload_file(
 
 @app.get("/files")
 async def list_files(
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    offset: int = Query(0, ge=0, description="Deprecated; follow next_cursor instead"),
     status: Optional[str] = None,
     file_type: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List uploaded files with pagination and filtering."""
+    """
+    List uploaded files, newest first, with keyset pagination and filtering.
+    Pass next_cursor from the previous page as cursor; total is cached for
+    file_count_cache_ttl seconds.
+    """
     try:
-        query = db.query(UploadedFile).filter(UploadedFile.is_deleted == False)
-        
-        # Apply filters
-        if status:
-            query = query.filter(UploadedFile.status == status)
-        if file_type:
-            query = query.filter(UploadedFile.file_type == file_type)
-        
-        # Get total count
-        total = query.count()
-        
-        # Apply pagination and ordering
-        files = query.order_by(UploadedFile.uploaded_at.desc()).offset(offset).limit(limit).all()
+        files, next_cursor = await file_listing.list_page(db, limit, cursor, status, file_type, offset)
+        total = await file_listing.file_counts.total(db, status, file_type)
         
         return {
-            "files": [
-                {
-                    "id": f.id,
-                    "filename": f.filename,
-                    "original_filename": f.original_filename,
-                    "file_size": f.file_size,
-                    "file_type": f.file_type,
-                    "status": f.status,
-                    "uploaded_at": f.uploaded_at.isoformat() if f.uploaded_at else None,
-                    "updated_at": f.updated_at.isoformat() if f.updated_at else None
-                }
-                for f in files
-            ],
+            "files": [file_listing.summarize(f) for f in files],
             "total": total,
             "limit": limit,
-            "offset": offset
+            "next_cursor": next_cursor
         }
         
+    except file_listing.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing files: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
 
 
 @app.get("/files/{file_id}")
-async def get_file_details(file_id: int, db: Session = Depends(get_db)):
-    """Get detailed information about a specific file."""
-    try:
-        file = db.query(UploadedFile).filter(
+async def get_file_details(file_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get detailed information about a specific file (read-through cached)."""
+    
+    async def load() -> Optional[dict]:
+        file = await db.scalar(select(UploadedFile).where(
             UploadedFile.id == file_id,
             UploadedFile.is_deleted == False
-        ).first()
-        
+        ))
         if not file:
-            raise HTTPException(status_code=404, detail="File not found")
+            return None
         
         return {
             "id": file.id,
             "filename": file.filename,
             "original_filename": file.original_filename,
             "file_size": file.file_size,
+            "original_size": file.original_size,
+            "stored_size": file.stored_size,
             "file_type": file.file_type,
             "status": file.status,
+            "error_message": file.error_message,
             "file_path": file.file_path,
+            "processed_path": file.processed_path,
+            "content_hash": file.content_hash,
+            "sample_count": file.sample_count,
+            "variant_count": file.variant_count,
             "uploaded_at": file.uploaded_at.isoformat() if file.uploaded_at else None,
             "updated_at": file.updated_at.isoformat() if file.updated_at else None,
             "validation_result": file.validation_result,
             "analysis_results": file.analysis_results
         }
-        
-    except HTTPException:
-        raise
+    
+    try:
+        details = await file_details_cache.get_or_load(file_id, load)
     except Exception as e:
         logger.error(f"Error getting file details: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get file details: {str(e)}")
+    
+    if details is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return details
+
+
+@app.post("/files/{file_id}/process")
+async def process_file_endpoint(
+    file_id: int,
+    deep_validation: Optional[bool] = Query(None, description="Check every record; defaults to the server setting"),
+    force: bool = Query(False, description="Re-queue a file stuck in 'processing' (e.g. its worker died)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Queue (or re-queue) background processing of a stored file. A file
+    still marked as processing is only re-queued with force=true.
+    """
+    file = await db.scalar(select(UploadedFile).where(
+        UploadedFile.id == file_id,
+        UploadedFile.is_deleted == False
+    ))
+    
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+    if file.file_type not in PROCESSABLE_TYPES:
+        raise HTTPException(status_code=400, detail=f"Cannot process file of type {file.file_type}")
+    if file.status == "processing" and not force:
+        raise HTTPException(
+            status_code=409,
+            detail="File is already being processed; pass force=true if its job is stuck"
+        )
+    
+    # The Redis queue client is synchronous
+    job_id = await asyncio.to_thread(enqueue_processing, {
+        "file_id": file.id,
+        "filename": file.filename,
+        "file_type": file.file_type,
+        "status": "uploaded"
+    }, deep_validation=deep_validation)
+    if job_id is None:
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    
+    return {"file_id": file.id, "job_id": job_id, "status": "queued"}
 
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ Simplified version for Phase 1 testing.
 """
 
 from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Text, JSON, Boolean, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from datetime import datetime
 from typing import Optional, Dict, Any
@@ -11,6 +12,15 @@ from typing import Optional, Dict, Any
 from ..core.database import Base
 
 
+# SQLite compares timestamps as text: bind them in the format its
+# CURRENT_TIMESTAMP server default stores, or a keyset cursor on
+# (uploaded_at, id) never gets past rows sharing a second
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+
 class UploadedFile(Base):
     """Model for tracking uploaded genomic files."""
     
@@ -23,10 +33,15 @@ class UploadedFile(Base):
     filename = Column(String(255), nullable=False, index=True)
     original_filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
+    processed_path = Column(String(500), nullable=True)  # Columnar genotype store
     
     # File metadata
     file_size = Column(BigInteger, nullable=False)
+    # Bytes as uploaded and as kept in the blob store (BGZF-transcoded); unset on older rows
+    original_size = Column(BigInteger, nullable=True)
+    stored_size = Column(BigInteger, nullable=True)
     file_type = Column(String(50), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded bytes
     
     # File status tracking
     status = Column(String(50), nullable=False, default="uploaded", index=True)
@@ -40,8 +55,8 @@ class UploadedFile(Base):
     error_message = Column(Text, nullable=True)
     
     # Timestamps
-    uploaded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    uploaded_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Soft delete
     is_deleted = Column(Boolean, default=False, nullable=False, index=True)
@@ -54,6 +69,9 @@ class UploadedFile(Base):
     __table_args__ = (
         Index('idx_status_uploaded_at', 'status', 'uploaded_at'),
         Index('idx_file_type_status', 'file_type', 'status'),
+        # Keyset pagination of GET /files on (uploaded_at, id)
+        Index('idx_uploaded_at_id', 'uploaded_at', 'id'),
+        Index('idx_file_type_uploaded_at', 'file_type', 'uploaded_at', 'id'),
     )
     
     def __repr__(self):
@@ -66,8 +84,13 @@ class UploadedFile(Base):
             "filename": self.filename,
             "original_filename": self.original_filename,
             "file_size": self.file_size,
+            "original_size": self.original_size,
+            "stored_size": self.stored_size,
             "file_type": self.file_type,
+            "content_hash": self.content_hash,
             "status": self.status,
+            "sample_count": self.sample_count,
+            "variant_count": self.variant_count,
             "uploaded_at": self.uploaded_at.isoformat() if self.uploaded_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
             "validation_result": self.validation_result,
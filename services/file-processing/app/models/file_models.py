@@ -47,6 +47,10 @@ class FileProcessingJob(BaseModel):
     completed_at: Optional[datetime] = None
     error_message: Optional[str] = None
     results: Optional[Dict[str, Any]] = None
+    # None: use settings.vcf_deep_validation
+    deep_validation: Optional[bool] = None
+    # Times a worker has started the job (redeliveries after a worker died included)
+    attempts: int = 0
 
 class FileValidationResult(BaseModel):
     is_valid: bool
@@ -61,4 +65,28 @@ class ProcessingJobResponse(BaseModel):
     progress: float
     message: str
     results: Optional[Dict[str, Any]] = None
-    error_message: Optional[str] = None
\ No newline at end of file
+    error_message: Optional[str] = None
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    total_size: int = Field(..., gt=0)
+    chunk_size: Optional[int] = Field(default=None, gt=0)
+
+class UploadSessionManifest(BaseModel):
+    session_id: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    created_at: datetime
+
+class UploadSessionStatus(BaseModel):
+    session_id: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: List[int]
+    missing_chunks: List[int]
+    is_complete: bool
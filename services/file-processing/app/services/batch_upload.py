@@ -0,0 +1,187 @@
+"""
+Batch ingest for many files in one request.
+
+Parts are streamed to staging concurrently, checked and moved into the blob
+store on a bounded thread pool, and every accepted file is registered with a
+single INSERT ... RETURNING in one transaction. Per-file failures (size,
+format) are reported alongside the successes instead of failing the batch;
+only a database error fails the whole batch.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..models.database import UploadedFile
+from . import blob_store
+from .file_listing import file_counts
+from .ingest import duplicate_values, new_file_values, store_staged, upload_response, validate_staged
+from .processing import enqueue_processing_many
+from .upload_stream import StreamedUpload, stream_upload_to_disk
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    """One part of a batch upload as it moves through the pipeline."""
+
+    index: int
+    original_filename: str
+    safe_filename: str
+    streamed: Optional[StreamedUpload] = None
+    values: Optional[Dict[str, Any]] = None
+    created_blob: Optional[Path] = None
+    deduplicated: bool = False
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def fail(self, status_code: int, error: str) -> None:
+        self.status_code = status_code
+        self.error = error
+        if self.streamed is not None and self.streamed.path.exists():
+            self.streamed.path.unlink()
+
+    def failure(self) -> Dict[str, Any]:
+        return {
+            "original_filename": self.original_filename,
+            "status": "failed",
+            "status_code": self.status_code,
+            "error": self.error,
+        }
+
+
+async def _stage(item: BatchItem, upload: UploadFile, limit: asyncio.Semaphore) -> None:
+    async with limit:
+        try:
+            item.streamed = await stream_upload_to_disk(upload, blob_store.staging_path(item.safe_filename))
+        except HTTPException as e:
+            item.fail(e.status_code, e.detail)
+        except Exception as e:
+            logger.error(f"Could not stage {item.original_filename}: {e}")
+            item.fail(500, f"Upload failed: {str(e)}")
+
+
+def _store_new(item: BatchItem) -> None:
+    """Validate a staged file and move it into the blob store (see store_staged). Runs on a worker thread."""
+    try:
+        report = validate_staged(item.streamed, item.original_filename)
+        file_path, created = store_staged(item.streamed, report)
+    except HTTPException as e:
+        item.fail(e.status_code, e.detail)
+        return
+    except Exception as e:
+        logger.error(f"Could not store {item.original_filename}: {e}")
+        item.fail(500, f"Upload failed: {str(e)}")
+        return
+    item.created_blob = file_path if created else None
+    item.values = new_file_values(item.streamed, file_path, item.safe_filename, item.original_filename, report)
+
+
+async def _existing_by_hash(db: AsyncSession, hashes: List[str]) -> Dict[str, UploadedFile]:
+    """Newest live file per content hash whose blob is still on disk, in one query."""
+    if not hashes:
+        return {}
+    result = await db.scalars(select(UploadedFile).where(
+        UploadedFile.content_hash.in_(hashes),
+        UploadedFile.is_deleted == False,
+        UploadedFile.status != "error"
+    ).order_by(UploadedFile.id.desc()))
+    existing: Dict[str, UploadedFile] = {}
+    for db_file in result:
+        if db_file.content_hash not in existing and blob_store.blob_exists(db_file.content_hash):
+            existing[db_file.content_hash] = db_file
+    return existing
+
+
+async def ingest_batch(db: AsyncSession, uploads: List[UploadFile]) -> Dict[str, Any]:
+    """Register a batch of uploads. Returns per-file results in request order."""
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    items = [
+        BatchItem(index, upload.filename, f"{timestamp}_{upload.filename}")
+        for index, upload in enumerate(uploads)
+    ]
+    limit = asyncio.Semaphore(max(1, settings.batch_upload_concurrency))
+
+    # Stage 1: stream every part to disk (hashing and sniffing inline)
+    await asyncio.gather(*(_stage(item, upload, limit) for item, upload in zip(items, uploads)))
+    staged = [item for item in items if item.ok]
+
+    # Stage 2: content already stored is registered without re-validation;
+    # repeats within the batch follow the first file with that content
+    existing = await _existing_by_hash(db, sorted({item.streamed.sha256 for item in staged}))
+    first_by_hash: Dict[str, BatchItem] = {}
+    repeats: List[BatchItem] = []
+    for item in staged:
+        sha256 = item.streamed.sha256
+        if sha256 in existing:
+            item.streamed.path.unlink()
+            item.values = duplicate_values(existing[sha256], item.safe_filename, item.original_filename)
+            item.deduplicated = True
+        elif sha256 in first_by_hash:
+            repeats.append(item)
+        else:
+            first_by_hash[sha256] = item
+
+    async def store_new(item: BatchItem) -> None:
+        async with limit:
+            await asyncio.to_thread(_store_new, item)
+
+    await asyncio.gather(*(store_new(item) for item in first_by_hash.values()))
+
+    for item in repeats:
+        first = first_by_hash[item.streamed.sha256]
+        if not first.ok:
+            item.fail(first.status_code, first.error)
+            continue
+        item.streamed.path.unlink()
+        item.values = dict(first.values, filename=item.safe_filename, original_filename=item.original_filename)
+        item.deduplicated = True
+
+    # Stage 3: one multi-row INSERT ... RETURNING for the whole batch
+    accepted = [item for item in items if item.ok]
+    results: Dict[int, Dict[str, Any]] = {}
+    if accepted:
+        try:
+            rows = await db.scalars(
+                insert(UploadedFile).returning(UploadedFile, sort_by_parameter_order=True),
+                [item.values for item in accepted],
+            )
+            db_files = rows.all()
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Database error registering batch of {len(accepted)} files: {e}")
+            for item in accepted:
+                if item.created_blob is not None and item.created_blob.exists():
+                    item.created_blob.unlink()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        for db_file in db_files:
+            file_counts.added(db_file.status, db_file.file_type)
+
+        responses = [upload_response(db_file, deduplicated=item.deduplicated) for item, db_file in zip(accepted, db_files)]
+        # All jobs in one queue round trip, off the event loop (the Redis client is synchronous)
+        job_ids = await asyncio.to_thread(enqueue_processing_many, responses)
+        for item, result, job_id in zip(accepted, responses, job_ids):
+            result["job_id"] = job_id
+            results[item.index] = result
+
+    logger.info(f"Batch upload registered {len(accepted)} of {len(items)} files")
+    return {
+        "total": len(items),
+        "succeeded": len(accepted),
+        "failed": len(items) - len(accepted),
+        "files": [results[item.index] if item.ok else item.failure() for item in items],
+    }
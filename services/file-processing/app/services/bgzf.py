@@ -0,0 +1,161 @@
+"""
+BGZF (blocked gzip) support.
+
+BGZF files - the output of bgzip, as used for VCF.gz - are a series of gzip
+members of at most 64KB uncompressed each. Every member records its
+compressed size in a header extra field and its uncompressed size in the
+footer, so block boundaries can be found without decompressing anything and
+any block can be decompressed on its own. That is what lets a single file be
+split across processes.
+
+Positions inside the decompressed stream are addressed with virtual offsets,
+as in htslib: (compressed offset of the block << 16) | offset within the block.
+
+Because blocks are independent, writing is parallel too: write_bgzf compresses
+blocks on a thread pool (zlib releases the GIL) and writes them in order.
+"""
+
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Deque, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from ..utils.compression import BGZF_HEADER, BGZF_MAGIC, BGZFError, read_block_header
+
+_FOOTER_SIZE = 8  # CRC32 + ISIZE
+# Uncompressed bytes per written block, as bgzip: incompressible data still fits in 64KB
+BLOCK_DATA_SIZE = 0xFF00
+# Empty block marking the end of a BGZF file
+EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+# Blocks queued per compression thread before the writer waits
+BLOCKS_PER_THREAD = 8
+
+
+def make_virtual_offset(block_offset: int, within: int) -> int:
+    return (block_offset << 16) | within
+
+
+def split_virtual_offset(virtual_offset: int) -> Tuple[int, int]:
+    return virtual_offset >> 16, virtual_offset & 0xFFFF
+
+
+def is_bgzf(path: Union[str, Path]) -> bool:
+    """Whether a file starts with a BGZF block."""
+    with open(path, "rb") as f:
+        try:
+            return read_block_header(f) is not None
+        except BGZFError:
+            return False
+
+
+def read_block(f: IO[bytes]) -> Optional[bytes]:
+    """Decompress the block at the current position and advance past it. None at end of file."""
+    start = f.tell()
+    header = read_block_header(f)
+    if header is None:
+        return None
+    block_size, header_size = header
+    f.seek(start + header_size)
+    payload = f.read(block_size - header_size)
+    if len(payload) < block_size - header_size:
+        raise BGZFError(f"Truncated BGZF block at offset {start}")
+    data = zlib.decompress(payload[:-_FOOTER_SIZE], -zlib.MAX_WBITS)
+    (isize,) = struct.unpack("<I", payload[-4:])
+    if len(data) != isize:
+        raise BGZFError(f"BGZF block at offset {start} has the wrong size")
+    return data
+
+
+def scan_blocks(path: Union[str, Path]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Locate every block from the headers and footers alone.
+
+    Returns (compressed offsets, uncompressed offsets), each with one entry
+    per block plus a final entry for the end of the file.
+    """
+    coffsets = []
+    uoffsets = []
+    uncompressed = 0
+    with open(path, "rb") as f:
+        offset = 0
+        while True:
+            f.seek(offset)
+            header = read_block_header(f)
+            if header is None:
+                break
+            block_size = header[0]
+            f.seek(offset + block_size - 4)
+            raw = f.read(4)
+            if len(raw) < 4:
+                raise BGZFError(f"Truncated BGZF block at offset {offset}")
+            coffsets.append(offset)
+            uoffsets.append(uncompressed)
+            uncompressed += struct.unpack("<I", raw)[0]
+            offset += block_size
+    coffsets.append(offset)
+    uoffsets.append(uncompressed)
+    return np.array(coffsets, dtype=np.int64), np.array(uoffsets, dtype=np.int64)
+
+
+def to_virtual_offset(coffsets: np.ndarray, uoffsets: np.ndarray, position: int) -> int:
+    """Virtual offset of an uncompressed byte position, given scan_blocks output."""
+    # side="right" skips empty blocks (e.g. the EOF marker) starting at the same position
+    block = int(np.searchsorted(uoffsets, position, side="right")) - 1
+    return make_virtual_offset(int(coffsets[block]), int(position - uoffsets[block]))
+
+
+def iter_virtual(path: Union[str, Path], virtual_offset: int, length: Optional[int] = None) -> Iterator[bytes]:
+    """Yield decompressed data starting at a virtual offset, up to length bytes (or to the end)."""
+    block_offset, within = split_virtual_offset(virtual_offset)
+    remaining = length
+    with open(path, "rb") as f:
+        f.seek(block_offset)
+        while remaining is None or remaining > 0:
+            data = read_block(f)
+            if data is None:
+                break
+            if within:
+                data = data[within:]
+                within = 0
+            if remaining is not None:
+                data = data[:remaining]
+                remaining -= len(data)
+            if data:
+                yield data
+
+
+def compress_block(data: bytes, level: int = 6) -> bytes:
+    """One BGZF block holding data (at most BLOCK_DATA_SIZE bytes)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    payload = compressor.compress(data) + compressor.flush()
+    # BSIZE is the block size minus one: 18 header + payload + 8 footer bytes
+    header = BGZF_HEADER.pack(BGZF_MAGIC, 0, 0, 0xFF, 6, 66, 67, 2) + struct.pack("<H", len(payload) + 25)
+    return header + payload + struct.pack("<II", zlib.crc32(data), len(data))
+
+
+def write_bgzf(source: IO[bytes], out: IO[bytes], threads: int = 1, level: int = 6) -> int:
+    """
+    Compress everything readable from source into out as BGZF, ending with
+    the EOF marker block. Blocks are compressed on threads workers and written
+    in order; at most threads * BLOCKS_PER_THREAD blocks are held in memory.
+    Returns the number of uncompressed bytes read.
+    """
+    total = 0
+    pending: Deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        while True:
+            data = source.read(BLOCK_DATA_SIZE)
+            if not data:
+                break
+            total += len(data)
+            pending.append(pool.submit(compress_block, data, level))
+            while len(pending) >= max(1, threads) * BLOCKS_PER_THREAD:
+                out.write(pending.popleft().result())
+        while pending:
+            out.write(pending.popleft().result())
+    out.write(EOF_BLOCK)
+    return total
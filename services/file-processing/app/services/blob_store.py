@@ -0,0 +1,53 @@
+"""
+Content-addressed blob storage for uploaded files.
+Each distinct upload is stored once under its SHA-256: blob_dir/ab/cd/abcd...
+"""
+
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR_NAME = "staging"
+
+
+def blob_path(sha256: str) -> Path:
+    """Location of the blob for a content hash."""
+    sha256 = sha256.lower()
+    return Path(settings.blob_dir) / sha256[:2] / sha256[2:4] / sha256
+
+
+def blob_exists(sha256: str) -> bool:
+    return blob_path(sha256).exists()
+
+
+def staging_path(filename: str) -> Path:
+    """
+    Unique path for an upload in flight. Staging lives inside blob_dir so
+    promoting a finished upload to its blob is an atomic rename.
+    """
+    directory = Path(settings.blob_dir) / STAGING_DIR_NAME
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{uuid.uuid4().hex}_{Path(filename).name}"
+
+
+def store(staged: Path, sha256: str) -> Tuple[Path, bool]:
+    """
+    Move a staged file into the store under its hash.
+    Returns (blob path, created). If the blob already exists the staged copy is dropped.
+    """
+    target = blob_path(sha256)
+    if target.exists():
+        staged.unlink()
+        return target, False
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Concurrent uploads of the same content race benignly: the bytes are identical
+    os.replace(staged, target)
+    logger.info(f"Stored blob {sha256}")
+    return target, True
@@ -0,0 +1,195 @@
+"""
+Read-through cache for API responses.
+
+Values are JSON documents stored in Redis with a TTL, or in a size-bounded
+in-process LRU when Redis is not configured or not reachable (development
+and tests). Writers invalidate keys explicitly; TTLs bound staleness for
+anything that is missed, such as invalidations made by another process
+while running on the in-memory backend.
+
+Cache failures never fail a request: a Redis error counts as a miss.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    invalidations: int = 0
+    skipped: int = 0  # values over cache_max_value_bytes
+    errors: int = 0
+
+
+class MemoryBackend:
+    """LRU of serialized values with per-entry expiry."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    async def set(self, key: str, raw: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisBackend:
+    """
+    Shared cache in Redis. Keys carry a TTL, so the server's volatile-lru
+    eviction (see docker-compose) bounds memory without touching job queues.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        self._async = aioredis.Redis.from_url(url, socket_timeout=1.0)
+        # Invalidations also come from synchronous worker code
+        self._sync = redis.Redis.from_url(url, socket_timeout=1.0)
+
+    async def get(self, key: str) -> Optional[str]:
+        raw = await self._async.get(key)
+        return raw.decode() if raw is not None else None
+
+    async def set(self, key: str, raw: str, ttl: int) -> None:
+        await self._async.set(key, raw, ex=ttl)
+
+    def delete(self, key: str) -> None:
+        self._sync.delete(key)
+
+
+class ReadThroughCache:
+    """
+    One namespace of cached documents with its own TTL and counters.
+    ttl_for can shorten the TTL of values that are still changing.
+    """
+
+    def __init__(self, namespace: str, ttl: int, ttl_for: Optional[Callable[[Dict[str, Any]], int]] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.ttl_for = ttl_for
+        self.stats = CacheStats()
+
+    def _key(self, key: Any) -> str:
+        return f"{settings.cache_prefix}:{self.namespace}:{key}"
+
+    async def get_or_load(
+        self,
+        key: Any,
+        loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        """Cached value for key, else loader()'s result (cached unless None)."""
+        backend = get_backend()
+        cache_key = self._key(key)
+        try:
+            raw = await backend.get(cache_key)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Cache read failed for {cache_key}: {e}")
+            raw = None
+        if raw is not None:
+            self.stats.hits += 1
+            return json.loads(raw)
+
+        self.stats.misses += 1
+        value = await loader()
+        if value is None:
+            return None
+
+        raw = json.dumps(value)
+        if len(raw) > settings.cache_max_value_bytes:
+            self.stats.skipped += 1
+            return value
+        try:
+            await backend.set(cache_key, raw, self.ttl_for(value) if self.ttl_for else self.ttl)
+            self.stats.sets += 1
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Cache write failed for {cache_key}: {e}")
+        return value
+
+    def invalidate(self, key: Any) -> None:
+        try:
+            get_backend().delete(self._key(key))
+            self.stats.invalidations += 1
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Cache invalidation failed for {self._key(key)}: {e}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Process-wide backend; Redis when configured and reachable."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if settings.cache_backend == "redis":
+                try:
+                    redis.Redis.from_url(settings.redis_url, socket_connect_timeout=1.0).ping()
+                    _backend = RedisBackend(settings.redis_url)
+                except Exception as e:
+                    logger.warning(f"Redis unavailable, using in-memory cache: {e}")
+            if _backend is None:
+                _backend = MemoryBackend(settings.cache_max_entries)
+            logger.info(f"Cache backend: {_backend.name}")
+        return _backend
+
+
+# Files still being processed change under workers; a read racing an
+# invalidation can re-cache an old status, so keep those entries short-lived
+TRANSIENT_TTL = 5
+FINAL_FILE_STATUSES = {"processed", "error"}
+
+# File details served by GET /files/{file_id}
+file_details_cache = ReadThroughCache(
+    "file",
+    settings.cache_file_ttl,
+    ttl_for=lambda details: settings.cache_file_ttl if details["status"] in FINAL_FILE_STATUSES else TRANSIENT_TTL,
+)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters per namespace for monitoring."""
+    return {
+        "backend": get_backend().name,
+        file_details_cache.namespace: asdict(file_details_cache.stats),
+    }
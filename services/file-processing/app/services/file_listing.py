@@ -0,0 +1,147 @@
+"""
+Keyset pagination and cached totals for GET /files.
+
+Pages are addressed by an opaque cursor holding the (uploaded_at, id) of the
+last row returned, so every page is an index range scan of `limit` rows no
+matter how deep it is. Totals come from counters per (status, file_type): new
+rows and status changes made by this process adjust them in place, and one
+GROUP BY re-reads them every few seconds to pick up other processes' writes
+and correct any drift, instead of a COUNT on every request.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..models.database import UploadedFile
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that were not produced by encode_cursor."""
+
+
+def encode_cursor(file: UploadedFile) -> str:
+    raw = json.dumps([file.uploaded_at.isoformat(), file.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        uploaded_at, file_id = json.loads(raw)
+        return datetime.fromisoformat(uploaded_at), int(file_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+class FileCountCache:
+    """
+    File counts per (status, file_type), maintained on insert and status change
+    and re-read from the database at most every ttl seconds.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        # Status changes come from worker threads
+        self._counts_lock = threading.Lock()
+
+    def added(self, status: str, file_type: str, count: int = 1) -> None:
+        """Count newly inserted rows."""
+        with self._counts_lock:
+            self._counts[(status, file_type)] = self._counts.get((status, file_type), 0) + count
+
+    def moved(self, file_type: str, old_status: str, new_status: str) -> None:
+        """Move a row between statuses."""
+        if old_status == new_status:
+            return
+        with self._counts_lock:
+            self._counts[(old_status, file_type)] = max(0, self._counts.get((old_status, file_type), 0) - 1)
+            self._counts[(new_status, file_type)] = self._counts.get((new_status, file_type), 0) + 1
+
+    async def total(self, db: AsyncSession, status: Optional[str] = None, file_type: Optional[str] = None) -> int:
+        if time.monotonic() - self._refreshed_at > self.ttl:
+            async with self._lock:
+                # Another request may have refreshed while we waited
+                if time.monotonic() - self._refreshed_at > self.ttl:
+                    await self._refresh(db)
+        with self._counts_lock:
+            return sum(
+                count for (row_status, row_type), count in self._counts.items()
+                if (status is None or row_status == status) and (file_type is None or row_type == file_type)
+            )
+
+    async def _refresh(self, db: AsyncSession) -> None:
+        result = await db.execute(
+            select(UploadedFile.status, UploadedFile.file_type, func.count())
+            .where(UploadedFile.is_deleted == False)
+            .group_by(UploadedFile.status, UploadedFile.file_type)
+        )
+        counts = {(status, file_type): count for status, file_type, count in result.all()}
+        with self._counts_lock:
+            self._counts = counts
+        self._refreshed_at = time.monotonic()
+
+
+file_counts = FileCountCache(settings.file_count_cache_ttl)
+
+
+async def list_page(
+    db: AsyncSession,
+    limit: int,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    file_type: Optional[str] = None,
+    offset: int = 0,
+) -> Tuple[List[UploadedFile], Optional[str]]:
+    """
+    One page of live files, newest first, and the cursor of the next page
+    (None on the last page). offset is only honoured without a cursor.
+    """
+    query = select(UploadedFile).where(UploadedFile.is_deleted == False)
+    if status:
+        query = query.where(UploadedFile.status == status)
+    if file_type:
+        query = query.where(UploadedFile.file_type == file_type)
+    if cursor:
+        uploaded_at, file_id = decode_cursor(cursor)
+        # Bound with the column's type, so it renders in the stored format (see models.database.Timestamp)
+        position = tuple_(literal(uploaded_at, UploadedFile.uploaded_at.type), file_id)
+        query = query.where(tuple_(UploadedFile.uploaded_at, UploadedFile.id) < position)
+    elif offset:
+        query = query.offset(offset)
+
+    # One extra row tells whether another page follows
+    result = await db.execute(
+        query.order_by(UploadedFile.uploaded_at.desc(), UploadedFile.id.desc()).limit(limit + 1)
+    )
+    files = list(result.scalars().all())
+    next_cursor = encode_cursor(files[limit - 1]) if len(files) > limit else None
+    return files[:limit], next_cursor
+
+
+def summarize(file: UploadedFile) -> Dict[str, Any]:
+    """List entry for a file."""
+    return {
+        "id": file.id,
+        "filename": file.filename,
+        "original_filename": file.original_filename,
+        "file_size": file.file_size,
+        "file_type": file.file_type,
+        "status": file.status,
+        "uploaded_at": file.uploaded_at.isoformat() if file.uploaded_at else None,
+        "updated_at": file.updated_at.isoformat() if file.updated_at else None
+    }
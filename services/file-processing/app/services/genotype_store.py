@@ -0,0 +1,470 @@
+"""
+Columnar on-disk genotype store.
+
+A VCF is converted once into a directory of .npy arrays that analyses open
+with numpy.memmap (np.load(..., mmap_mode="r")) without copying. Conversion
+runs over the same ranges as the counting pass, one process each:
+
+    meta.json          samples, chromosomes, per-chromosome row ranges, ploidy
+    genotypes.npy      int8 (variants, samples, ploidy); allele index, -1 = missing
+    pos.npy            int32 (variants,) 1-based positions
+    chrom.npy          int16 (variants,) index into meta["chromosomes"]
+    ref_data.npy       uint8 concatenated REF strings, sliced by ref_offsets.npy
+    alt_data.npy       uint8 concatenated ALT strings, sliced by alt_offsets.npy
+    record_offsets.npy int64 (variants + 1,) uncompressed offset of each record
+                       line in the source file; the last entry ends the records
+    bgzf_blocks.npy    int64 (2, blocks + 1) BGZF block offsets of the source,
+                       compressed and uncompressed (BGZF sources only)
+
+record_offsets and meta["record_index"] let region queries read matching
+records straight from the source file; stores written before they existed
+lack them and are rebuilt when the file is reprocessed.
+
+The format is shared with backend/genomics-service, which only reads it.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..core.config import settings
+from ..utils.compression import BGZFError, GZIP
+from .vcf_parser import (
+    LINE_SCAN_SIZE,
+    ParsePlan,
+    VCFParseError,
+    VCFSummary,
+    iter_range,
+    parse_workers,
+    run_ranges,
+    summarize_vcf,
+)
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+META_NAME = "meta.json"
+MISSING = -1
+
+# First colon-separated field of every sample column
+_FIRST_FIELD = re.compile(rb"(?:^|\t)([^:\t]*)")
+_ALLELE_SPLIT = re.compile(rb"[/|]")
+
+
+def store_dir_for(content_hash: str) -> Path:
+    """Store location for a file's content hash, so duplicate uploads share one store."""
+    return Path(settings.processed_dir) / content_hash
+
+
+@dataclass
+class GenotypeStore:
+    """Read-only, memory-mapped view of a converted file."""
+
+    path: Path
+    meta: Dict[str, Any]
+    genotypes: np.ndarray
+    pos: np.ndarray
+    chrom: np.ndarray
+    ref_offsets: np.ndarray
+    ref_data: np.ndarray
+    alt_offsets: np.ndarray
+    alt_data: np.ndarray
+    record_offsets: Optional[np.ndarray] = None
+    bgzf_blocks: Optional[np.ndarray] = None
+
+    @property
+    def samples(self) -> List[str]:
+        return self.meta["samples"]
+
+    @property
+    def chromosomes(self) -> List[str]:
+        return self.meta["chromosomes"]
+
+    @property
+    def n_variants(self) -> int:
+        return self.meta["n_variants"]
+
+    def chrom_range(self, chrom: str) -> slice:
+        """Row range of a chromosome."""
+        start, end = self.meta["chrom_offsets"].get(chrom, (0, 0))
+        return slice(start, end)
+
+    def ref(self, row: int) -> str:
+        return bytes(self.ref_data[self.ref_offsets[row]:self.ref_offsets[row + 1]]).decode()
+
+    def alt(self, row: int) -> str:
+        return bytes(self.alt_data[self.alt_offsets[row]:self.alt_offsets[row + 1]]).decode()
+
+
+def open_store(path: Union[str, Path]) -> GenotypeStore:
+    """Open a converted store without reading the arrays into memory."""
+    path = Path(path)
+    meta = json.loads((path / META_NAME).read_text())
+
+    def load(name: str) -> np.ndarray:
+        return np.load(path / f"{name}.npy", mmap_mode="r")
+
+    return GenotypeStore(
+        path=path,
+        meta=meta,
+        genotypes=load("genotypes"),
+        pos=load("pos"),
+        chrom=load("chrom"),
+        ref_offsets=load("ref_offsets"),
+        ref_data=load("ref_data"),
+        alt_offsets=load("alt_offsets"),
+        alt_data=load("alt_data"),
+        record_offsets=load("record_offsets") if (path / "record_offsets.npy").exists() else None,
+        bgzf_blocks=load("bgzf_blocks") if (path / "bgzf_blocks.npy").exists() else None,
+    )
+
+
+def store_is_current(path: Union[str, Path]) -> bool:
+    """Whether a converted store exists and has everything this version writes."""
+    meta_path = Path(path) / META_NAME
+    if not meta_path.exists():
+        return False
+    return "record_index" in json.loads(meta_path.read_text())
+
+
+def _parse_genotypes(sample_columns: bytes, gt_index: int, n_samples: int, ploidy: int) -> np.ndarray:
+    """Decode the GT calls of one record into an int8 (samples, ploidy) array."""
+    if gt_index == 0:
+        tokens = _FIRST_FIELD.findall(sample_columns)
+    else:
+        tokens = [
+            (fields[gt_index] if len(fields) > gt_index else b".")
+            for fields in (column.split(b":") for column in sample_columns.split(b"\t"))
+        ]
+    if len(tokens) != n_samples:
+        raise VCFParseError(f"Expected {n_samples} sample columns, found {len(tokens)}")
+
+    joined = b"".join(tokens)
+    if ploidy == 2 and len(joined) == 3 * n_samples:
+        # Fast path: every call is "a/b" or "a|b" with single-character alleles. The total
+        # length alone is not enough: "." next to "10/11" is 6 bytes too
+        chars = np.frombuffer(joined, dtype=np.uint8).reshape(n_samples, 3)
+        raw = chars[:, ::2]
+        separators = chars[:, 1]
+        missing = raw == ord(".")
+        if (np.all((separators == ord("/")) | (separators == ord("|")))
+                and np.all(((raw >= ord("0")) & (raw <= ord("9"))) | missing)):
+            calls = raw.astype(np.int8) - ord("0")
+            calls[missing] = MISSING
+            return calls
+
+    calls = np.full((n_samples, ploidy), MISSING, dtype=np.int8)
+    for i, token in enumerate(tokens):
+        for j, allele in enumerate(_ALLELE_SPLIT.split(token)[:ploidy]):
+            if allele and allele != b".":
+                calls[i, j] = min(int(allele), 127)
+    return calls
+
+
+def _detect_ploidy(first_line: bytes) -> int:
+    fields = first_line.rstrip(b"\r\n").split(b"\t", 10)
+    if len(fields) < 10:
+        return 2
+    gt = fields[9].split(b":", 1)[0]
+    return len(_ALLELE_SPLIT.split(gt))
+
+
+def convert_vcf(
+    vcf_path: Union[str, Path],
+    destination: Union[str, Path],
+    summary: Optional[VCFSummary] = None,
+) -> Path:
+    """
+    Convert a VCF into a columnar store at destination.
+
+    summary (from summarize_vcf) sizes the output arrays and divides the
+    records between worker processes; when missing it is obtained with a
+    counting pass. Output is written to a temporary sibling directory and
+    renamed into place, so readers never see a partial store.
+    """
+    destination = Path(destination)
+    if summary is None or summary.plan is None:
+        summary = summarize_vcf(vcf_path)
+
+    tmp_dir = destination.parent / f".{destination.name}.{uuid.uuid4().hex}.tmp"
+    tmp_dir.mkdir(parents=True)
+    try:
+        meta = _write_arrays(vcf_path, tmp_dir, summary)
+        (tmp_dir / META_NAME).write_text(json.dumps(meta))
+        try:
+            os.replace(tmp_dir, destination)
+        except OSError:
+            if store_is_current(destination):
+                # Another worker converted the same content first
+                logger.info(f"Genotype store {destination} already exists")
+            elif (destination / META_NAME).exists():
+                # Written by an older version; open memmaps of it stay valid after the swap
+                stale = destination.parent / f".{destination.name}.{uuid.uuid4().hex}.stale"
+                os.replace(destination, stale)
+                os.replace(tmp_dir, destination)
+                shutil.rmtree(stale, ignore_errors=True)
+                logger.info(f"Rebuilt genotype store {destination}")
+            else:
+                raise
+    finally:
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return destination
+
+
+def _first_line(plan: ParsePlan) -> bytes:
+    first = plan.ranges[0]
+    parts = []
+    for chunk in iter_range(plan.path, plan.compression, first.start, first.length, LINE_SCAN_SIZE):
+        newline = chunk.find(b"\n")
+        if newline >= 0:
+            parts.append(chunk[:newline])
+            break
+        parts.append(chunk)
+    return b"".join(parts)
+
+
+def _flush(array: np.ndarray) -> None:
+    # numpy cannot map empty data, so zero-size columns (no samples or no records) are plain arrays
+    if isinstance(array, np.memmap):
+        array.flush()
+
+
+def _convert_range(
+    path: str,
+    compression: str,
+    start: int,
+    length: Optional[int],
+    offset: int,
+    block_size: int,
+    out_dir: str,
+    row_start: int,
+    n_rows: int,
+    n_samples: int,
+    ploidy: int,
+) -> Tuple[List[Tuple[str, int, int]], bytes, np.ndarray, bytes, np.ndarray, int]:
+    """
+    Process pool task: convert one range of records.
+
+    Genotypes, positions and record offsets are written straight into the
+    shared output arrays at rows [row_start, row_start + n_rows). Returns the
+    chromosome runs as (name, first row, end row), REF/ALT bytes and lengths,
+    and the uncompressed offset where the range ends.
+    """
+    rows = slice(row_start, row_start + n_rows)
+    genotypes = np.load(Path(out_dir) / "genotypes.npy", mmap_mode="r+")[rows]
+    pos = np.load(Path(out_dir) / "pos.npy", mmap_mode="r+")[rows]
+    record_offsets = np.load(Path(out_dir) / "record_offsets.npy", mmap_mode="r+")[rows]
+
+    runs: List[List[Any]] = []
+    seen = set()
+    ref_buffer = bytearray()
+    alt_buffer = bytearray()
+    ref_lengths: List[int] = []
+    alt_lengths: List[int] = []
+    format_cache = (None, 0)
+    row = 0
+
+    def convert_line(line: bytes, line_offset: int) -> None:
+        nonlocal row, format_cache
+        if row >= n_rows:
+            raise VCFParseError("File has more records than counted")
+        record_offsets[row] = line_offset
+        fields = line.rstrip(b"\r").split(b"\t", 9)
+        if len(fields) < 8:
+            raise VCFParseError(f"Record {row_start + row + 1} has fewer than 8 columns")
+
+        chrom = fields[0]
+        if not runs or chrom != runs[-1][0]:
+            if chrom in seen:
+                raise VCFParseError(f"Records for {chrom.decode()} are not contiguous; sort the file first")
+            seen.add(chrom)
+            runs.append([chrom, row_start + row, row_start + row])
+        runs[-1][2] = row_start + row + 1
+        pos[row] = int(fields[1])
+
+        ref_buffer.extend(fields[3])
+        alt_buffer.extend(fields[4])
+        ref_lengths.append(len(fields[3]))
+        alt_lengths.append(len(fields[4]))
+
+        if n_samples:
+            fmt = fields[8]
+            if fmt != format_cache[0]:
+                keys = fmt.split(b":")
+                format_cache = (fmt, keys.index(b"GT") if b"GT" in keys else -1)
+            if format_cache[1] < 0:
+                genotypes[row] = MISSING
+            else:
+                genotypes[row] = _parse_genotypes(fields[9], format_cache[1], n_samples, ploidy)
+        row += 1
+
+    tail = b""
+    # Uncompressed offset of the first line in tail + block
+    position = offset
+    for block in iter_range(path, compression, start, length, block_size):
+        lines = (tail + block).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            if line:
+                convert_line(line, position)
+            position += len(line) + 1
+    if tail.strip():
+        convert_line(tail, position)
+    position += len(tail)
+
+    if row != n_rows:
+        raise VCFParseError(f"Counted {n_rows} records but converted {row}")
+    for array in (genotypes, pos, record_offsets):
+        _flush(array)
+
+    return (
+        [(chrom.decode(), first, end) for chrom, first, end in runs],
+        bytes(ref_buffer),
+        np.array(ref_lengths, dtype=np.int64),
+        bytes(alt_buffer),
+        np.array(alt_lengths, dtype=np.int64),
+        position,
+    )
+
+
+def _write_arrays(vcf_path: Union[str, Path], out_dir: Path, summary: VCFSummary) -> Dict[str, Any]:
+    plan = summary.plan
+    samples = summary.header.samples
+    n_samples = len(samples)
+    n_variants = summary.variant_count
+    ploidy = _detect_ploidy(_first_line(plan)) if n_variants else 2
+
+    def create(name: str, dtype, shape) -> np.ndarray:
+        return np.lib.format.open_memmap(out_dir / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
+
+    # Workers reopen these by name and fill their own rows
+    for name, dtype, shape in (("genotypes", np.int8, (n_variants, n_samples, ploidy)),
+                               ("pos", np.int32, (n_variants,)),
+                               ("record_offsets", np.int64, (n_variants + 1,))):
+        _flush(create(name, dtype, shape))
+
+    tasks = []
+    row_start = 0
+    for parse_range in plan.ranges:
+        tasks.append((plan.path, plan.compression, parse_range.start, parse_range.length, parse_range.offset,
+                      settings.parse_block_size, str(out_dir), row_start, parse_range.variant_count,
+                      n_samples, ploidy))
+        row_start += parse_range.variant_count
+    try:
+        results = run_ranges(_convert_range, tasks, parse_workers())
+    except (OSError, EOFError, BGZFError) as e:
+        raise VCFParseError(f"Could not read VCF: {e}") from e
+
+    # Stitch the ranges together; a chromosome may continue across a range boundary
+    chrom_idx = create("chrom", np.int16, (n_variants,))
+    chromosomes: List[str] = []
+    chrom_offsets: Dict[str, List[int]] = {}
+    for runs, *_ in results:
+        for chrom, first, end in runs:
+            if chromosomes and chromosomes[-1] == chrom and chrom_offsets[chrom][1] == first:
+                chrom_offsets[chrom][1] = end
+            elif chrom in chrom_offsets:
+                raise VCFParseError(f"Records for {chrom} are not contiguous; sort the file first")
+            else:
+                chromosomes.append(chrom)
+                chrom_offsets[chrom] = [first, end]
+            chrom_idx[first:end] = len(chromosomes) - 1
+    _flush(chrom_idx)
+
+    for name, data_index in (("ref", 1), ("alt", 3)):
+        offsets = create(f"{name}_offsets", np.int64, (n_variants + 1,))
+        offsets[0] = 0
+        if n_variants:
+            np.cumsum(np.concatenate([result[data_index + 1] for result in results]), out=offsets[1:])
+        _flush(offsets)
+        data = b"".join(result[data_index] for result in results)
+        np.save(out_dir / f"{name}_data.npy", np.frombuffer(data, dtype=np.uint8))
+
+    record_offsets = np.load(out_dir / "record_offsets.npy", mmap_mode="r+")
+    record_offsets[n_variants] = results[-1][5] if results else plan.data_offset
+    _flush(record_offsets)
+    if plan.blocks is not None:
+        np.save(out_dir / "bgzf_blocks.npy", np.stack(plan.blocks))
+
+    # Binary search in region queries needs positions sorted within each chromosome
+    pos = np.load(out_dir / "pos.npy", mmap_mode="r")
+    positions_sorted = all(
+        bool(np.all(np.diff(pos[first:end]) >= 0)) for first, end in chrom_offsets.values()
+    )
+
+    return {
+        "format_version": FORMAT_VERSION,
+        "samples": samples,
+        "chromosomes": chromosomes,
+        "chrom_offsets": chrom_offsets,
+        "ploidy": ploidy,
+        "n_variants": n_variants,
+        "n_samples": n_samples,
+        "source": str(vcf_path),
+        "positions_sorted": positions_sorted,
+        "record_index": {"compression": plan.compression, "data_offset": plan.data_offset},
+    }
+
+
+def supports_region_queries(store: GenotypeStore) -> bool:
+    """Records can be read by offset: the store is indexed and the source is not plain gzip."""
+    index = store.meta.get("record_index")
+    return store.record_offsets is not None and index is not None and index["compression"] != GZIP
+
+
+def region_rows(store: GenotypeStore, chrom: str, start: int, end: int) -> Union[slice, np.ndarray]:
+    """
+    Rows of the records on chrom with start <= POS <= end (1-based, inclusive).
+    A binary search over the chromosome's positions when they are sorted.
+    """
+    rows = store.chrom_range(chrom)
+    pos = store.pos[rows]
+    if store.meta.get("positions_sorted"):
+        first = rows.start + int(np.searchsorted(pos, start, side="left"))
+        last = rows.start + int(np.searchsorted(pos, end, side="right"))
+        return slice(first, max(first, last))
+    return rows.start + np.flatnonzero((pos >= start) & (pos <= end))
+
+
+def iter_records(
+    store: GenotypeStore,
+    source: Union[str, Path],
+    rows: Union[slice, np.ndarray],
+    include_header: bool = True,
+) -> Iterator[bytes]:
+    """
+    Yield the source lines of the given rows, optionally preceded by the VCF
+    header. Consecutive rows are read as one span, so a sorted region costs
+    one seek (one BGZF block lookup) plus the bytes returned.
+    """
+    index = store.meta["record_index"]
+    blocks = tuple(store.bgzf_blocks) if store.bgzf_blocks is not None else None
+    plan = ParsePlan(str(source), index["compression"], [], index["data_offset"], blocks)
+    offsets = store.record_offsets
+
+    if isinstance(rows, slice):
+        spans = [(int(offsets[rows.start]), int(offsets[rows.stop]))] if rows.stop > rows.start else []
+    else:
+        runs = np.split(rows, np.flatnonzero(np.diff(rows) != 1) + 1)
+        spans = [(int(offsets[run[0]]), int(offsets[run[-1] + 1])) for run in runs if len(run)]
+    if include_header:
+        spans.insert(0, (0, plan.data_offset))
+
+    last = b"\n"
+    for span_start, span_end in spans:
+        for chunk in iter_range(plan.path, plan.compression, plan.locate(span_start), span_end - span_start,
+                                settings.parse_block_size):
+            last = chunk
+            yield chunk
+    if not last.endswith(b"\n"):
+        # The last record of a file without a trailing newline
+        yield b"\n"
@@ -0,0 +1,273 @@
+"""
+Shared ingest step for files that have landed on disk.
+Used by the single-shot upload endpoint and the resumable upload sessions.
+
+Plain and gzip VCF/BED uploads are transcoded to BGZF before they enter the
+blob store (settings.store_bgzf), so every stored copy can be split across
+parse workers and queried by region. The blob keeps the SHA-256 of the bytes
+as uploaded, so deduplication is unaffected.
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.metrics import PARSE_SECONDS
+from ..models.database import UploadedFile
+from ..utils.compression import BGZF, GZIP
+from ..utils.file_validator import FormatReport, file_validator
+from . import bgzf, blob_store
+from .file_listing import file_counts
+from .upload_stream import StreamedUpload
+from .vcf_parser import detect_compression
+
+logger = logging.getLogger(__name__)
+
+# Text formats stored as BGZF
+BGZF_FILE_TYPES = {"vcf", "bed"}
+
+async def find_by_content_hash(db: AsyncSession, sha256: str) -> Optional[UploadedFile]:
+    """Most recent live file with this content whose blob is still on disk."""
+    existing = await db.scalar(select(UploadedFile).where(
+        UploadedFile.content_hash == sha256,
+        UploadedFile.is_deleted == False,
+        UploadedFile.status != "error"
+    ).order_by(UploadedFile.id.desc()).limit(1))
+    if existing and blob_store.blob_exists(sha256):
+        return existing
+    return None
+
+
+def upload_response(db_file: UploadedFile, deduplicated: bool) -> Dict[str, Any]:
+    validation = db_file.validation_result or {}
+    return {
+        "message": "File uploaded successfully",
+        "file_id": db_file.id,
+        "filename": db_file.filename,
+        "original_filename": db_file.original_filename,
+        "file_size": db_file.file_size,
+        "original_size": db_file.original_size,
+        "stored_size": db_file.stored_size,
+        "file_type": db_file.file_type,
+        "content_hash": db_file.content_hash,
+        "status": db_file.status,
+        "sample_count": db_file.sample_count,
+        "variant_count": db_file.variant_count,
+        "deduplicated": deduplicated,
+        "validation": {
+            "is_valid": validation.get("is_valid", True),
+            "file_type": db_file.file_type,
+            "errors": validation.get("errors", []),
+            "warnings": validation.get("warnings", [])
+        }
+    }
+
+
+def duplicate_values(existing: UploadedFile, safe_filename: str, original_filename: str) -> Dict[str, Any]:
+    """Columns of a new row pointing at an existing blob, reusing its validation and parse results."""
+    return {
+        "filename": safe_filename,
+        "original_filename": original_filename,
+        "file_size": existing.file_size,
+        "original_size": existing.original_size,
+        "stored_size": existing.stored_size,
+        "file_type": existing.file_type,
+        "content_hash": existing.content_hash,
+        # Processed results are shared; anything else is re-queued and
+        # finds the shared store if the original finishes first
+        "status": "processed" if existing.status == "processed" else "uploaded",
+        "file_path": existing.file_path,
+        "processed_path": existing.processed_path if existing.status == "processed" else None,
+        "validation_result": existing.validation_result,
+        "analysis_results": existing.analysis_results,
+        "sample_count": existing.sample_count,
+        "variant_count": existing.variant_count,
+    }
+
+
+def validate_staged(streamed: StreamedUpload, original_filename: str) -> FormatReport:
+    """
+    Format check of a staged upload from its sniffed prefix. Removes the
+    staged file and raises HTTPException(400) when it is rejected.
+    """
+    report = file_validator.validate(original_filename, streamed.sniff, streamed.size)
+    if report.is_valid:
+        return report
+
+    # Remove invalid file
+    if streamed.path.exists():
+        streamed.path.unlink()
+    if report.file_type is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type: {report.extension}"
+        )
+    raise HTTPException(
+        status_code=400,
+        detail=f"Invalid {report.file_type} file: {'; '.join(report.errors)}"
+    )
+
+
+def transcode_to_bgzf(streamed: StreamedUpload, file_type: str) -> None:
+    """
+    Rewrite a staged plain or gzip upload in place as BGZF, compressing
+    blocks on settings.bgzf_threads threads. Blocking. Corrupt gzip content
+    (only its prefix was validated) removes the staged file and raises
+    HTTPException(400).
+    """
+    started = time.perf_counter()
+    transcoded = streamed.path.with_name(f"{streamed.path.name}.bgzf")
+    opener = gzip.open if streamed.sniff.compression == GZIP else open
+    try:
+        with opener(streamed.path, "rb") as source, open(transcoded, "wb") as out:
+            text_size = bgzf.write_bgzf(source, out, settings.bgzf_threads or os.cpu_count() or 1,
+                                        settings.bgzf_level)
+    except BaseException as e:
+        transcoded.unlink(missing_ok=True)
+        if isinstance(e, (gzip.BadGzipFile, EOFError, zlib.error)):
+            streamed.path.unlink(missing_ok=True)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid {file_type} file: could not decompress: {e}"
+            )
+        raise
+    os.replace(transcoded, streamed.path)
+
+    elapsed = time.perf_counter() - started
+    PARSE_SECONDS.labels(file_type, "transcode").observe(elapsed)
+    logger.info(f"Transcoded {streamed.path.name} to BGZF: {streamed.size} bytes uploaded, "
+                f"{text_size} uncompressed, {streamed.path.stat().st_size} stored ({elapsed:.1f}s)")
+
+
+def store_staged(streamed: StreamedUpload, report: FormatReport) -> Tuple[Path, bool]:
+    """
+    Move a validated staged upload into the blob store, transcoding it to
+    BGZF first when its type is stored that way. Blocking.
+    Returns (blob path, created) as blob_store.store.
+    """
+    if (settings.store_bgzf and report.file_type in BGZF_FILE_TYPES
+            and streamed.sniff.compression != BGZF and not blob_store.blob_exists(streamed.sha256)):
+        transcode_to_bgzf(streamed, report.file_type)
+    return blob_store.store(streamed.path, streamed.sha256)
+
+
+def new_file_values(
+    streamed: StreamedUpload,
+    file_path: Path,
+    safe_filename: str,
+    original_filename: str,
+    report: FormatReport,
+) -> Dict[str, Any]:
+    """Columns of the row for a newly stored blob."""
+    metadata = {
+        "file_extension": report.extension,
+        "file_size_mb": round(streamed.size / (1024*1024), 2),
+        "sha256": streamed.sha256,
+        "compressed": streamed.is_gzip,
+        "compression": report.compression,
+        "stored_compression": detect_compression(file_path)
+    }
+    return {
+        "filename": safe_filename,
+        "original_filename": original_filename,
+        "file_size": streamed.size,
+        "original_size": streamed.size,
+        "stored_size": file_path.stat().st_size,
+        "file_type": report.file_type,
+        "content_hash": streamed.sha256,
+        "status": "uploaded",
+        "file_path": str(file_path),
+        # Same keys as duplicate_values so rows can share one bulk INSERT
+        "processed_path": None,
+        "validation_result": {
+            "is_valid": True,
+            "file_type": report.file_type,
+            "errors": [],
+            "warnings": report.warnings,
+            "metadata": metadata
+        },
+        "analysis_results": None,
+        "sample_count": None,
+        "variant_count": None,
+    }
+
+
+async def _register_duplicate(
+    db: AsyncSession,
+    existing: UploadedFile,
+    streamed: StreamedUpload,
+    safe_filename: str,
+    original_filename: str,
+) -> Dict[str, Any]:
+    """Point a new row at an existing blob."""
+    if streamed.path.exists():
+        streamed.path.unlink()
+
+    try:
+        db_file = UploadedFile(**duplicate_values(existing, safe_filename, original_filename))
+        db.add(db_file)
+        await db.commit()
+        await db.refresh(db_file)
+        file_counts.added(db_file.status, db_file.file_type)
+    except Exception as e:
+        logger.error(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    logger.info(f"Duplicate upload of {existing.content_hash} registered as ID {db_file.id} "
+                f"(reusing file {existing.id})")
+    return upload_response(db_file, deduplicated=True)
+
+
+async def finalize_upload(
+    db: AsyncSession,
+    streamed: StreamedUpload,
+    safe_filename: str,
+    original_filename: str,
+) -> Dict[str, Any]:
+    """
+    Validate a staged upload, move it into the blob store (as BGZF where
+    applicable) and persist its metadata.
+
+    Content already in the store short-circuits validation: the new row
+    reuses the existing blob and results. On failure the staged file (and a
+    newly created blob) is removed and HTTPException is raised.
+    """
+    existing = await find_by_content_hash(db, streamed.sha256)
+    if existing is not None:
+        return await _register_duplicate(db, existing, streamed, safe_filename, original_filename)
+
+    report = validate_staged(streamed, original_filename)
+    # Transcoding a large upload takes seconds; keep it off the event loop
+    file_path, created = await asyncio.to_thread(store_staged, streamed, report)
+
+    # Save file metadata to database
+    try:
+        db_file = UploadedFile(**new_file_values(
+            streamed, file_path, safe_filename, original_filename, report
+        ))
+
+        db.add(db_file)
+        await db.commit()
+        await db.refresh(db_file)
+        file_counts.added(db_file.status, db_file.file_type)
+
+        logger.info(f"File metadata saved to database: ID {db_file.id}")
+
+        return upload_response(db_file, deduplicated=False)
+
+    except Exception as e:
+        logger.error(f"Database error: {e}")
+        # Remove the blob if this upload created it and the database save failed
+        if created and file_path.exists():
+            file_path.unlink()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -0,0 +1,249 @@
+"""
+Background job queue for file processing.
+
+Jobs are FileProcessingJob records. The Redis backend lets API replicas
+enqueue and any number of worker processes (python -m app.worker) consume;
+the in-memory backend runs everything inside one process for development
+and tests.
+
+Redis delivery is at least once. A worker claims a job by moving it into
+its own processing list (BLMOVE) and keeps a liveness key alive while it
+works. Once that key expires (settings.job_visibility_timeout), any worker's
+requeue_stale puts the dead worker's claimed jobs back on the queue.
+"""
+
+import logging
+import os
+import queue
+import socket
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import redis
+
+from ..core.config import settings
+from ..models.file_models import FileProcessingJob, ProcessingStatus
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue(ABC):
+    """Interface shared by the queue backends."""
+
+    @abstractmethod
+    def enqueue(self, job: FileProcessingJob) -> None:
+        """Store a new job and put it on the queue."""
+
+    @abstractmethod
+    def dequeue(self, timeout: float) -> Optional[str]:
+        """Block up to timeout seconds for the next job id, claiming it for this worker."""
+
+    @abstractmethod
+    def ack(self, job_id: str) -> None:
+        """Release the claim on a job that has finished (either way)."""
+
+    @abstractmethod
+    def heartbeat(self) -> None:
+        """Keep this worker's claimed jobs from being requeued as abandoned."""
+
+    @abstractmethod
+    def requeue_stale(self) -> List[str]:
+        """Put jobs claimed by workers that stopped heartbeating back on the queue. Returns their ids."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[FileProcessingJob]:
+        """The job's current state, or None if it is unknown."""
+
+    @abstractmethod
+    def save(self, job: FileProcessingJob) -> None:
+        """Store a job's state."""
+
+    @abstractmethod
+    def depth(self) -> int:
+        """Number of jobs waiting to be picked up."""
+
+    def enqueue_many(self, jobs: List[FileProcessingJob]) -> None:
+        """Store and queue several jobs, in order; backends override this to batch round trips."""
+        for job in jobs:
+            self.enqueue(job)
+
+    def update(self, job_id: str, **fields: Any) -> Optional[FileProcessingJob]:
+        """Apply field changes to a job and store it."""
+        job = self.get(job_id)
+        if job is None:
+            logger.warning(f"Update for unknown job {job_id}")
+            return None
+        job = job.model_copy(update=fields)
+        self.save(job)
+        return job
+
+
+class MemoryJobQueue(JobQueue):
+    """Process-local queue; a stand-in for Redis in development and tests."""
+
+    def __init__(self):
+        self._pending: "queue.Queue[str]" = queue.Queue()
+        self._jobs: Dict[str, FileProcessingJob] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, job: FileProcessingJob) -> None:
+        self.save(job)
+        self._pending.put(job.job_id)
+
+    def dequeue(self, timeout: float) -> Optional[str]:
+        try:
+            return self._pending.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    # Claims die with the process that holds them, so there is nothing to track
+    def ack(self, job_id: str) -> None:
+        pass
+
+    def heartbeat(self) -> None:
+        pass
+
+    def requeue_stale(self) -> List[str]:
+        return []
+
+    def get(self, job_id: str) -> Optional[FileProcessingJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def save(self, job: FileProcessingJob) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+
+    def depth(self) -> int:
+        return self._pending.qsize()
+
+
+# Move every job of a processing list back to the consuming end of the queue
+# when its worker's liveness key is gone. KEYS: processing list, liveness key, queue
+_REQUEUE_STALE = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return {}
+end
+local jobs = redis.call('LRANGE', KEYS[1], 0, -1)
+-- The oldest claim is last in the list and goes back to the far right, next to be taken
+for i = 1, #jobs do
+    redis.call('RPUSH', KEYS[3], jobs[i])
+end
+redis.call('DEL', KEYS[1])
+return jobs
+"""
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Redis list as the queue, one JSON string per job for its state, and a
+    processing list plus liveness key per worker (see the module docstring).
+    """
+
+    def __init__(self, url: str, name: str):
+        self._redis = redis.Redis.from_url(url)
+        self._queue_key = f"{name}:queue"
+        self._job_prefix = f"{name}:job:"
+        self._processing_prefix = f"{name}:processing:"
+        self._alive_prefix = f"{name}:alive:"
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._requeue_stale = self._redis.register_script(_REQUEUE_STALE)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self._job_prefix}{job_id}"
+
+    @property
+    def _processing_key(self) -> str:
+        return f"{self._processing_prefix}{self.worker_id}"
+
+    def enqueue(self, job: FileProcessingJob) -> None:
+        self.save(job)
+        self._redis.lpush(self._queue_key, job.job_id)
+
+    def enqueue_many(self, jobs: List[FileProcessingJob]) -> None:
+        if not jobs:
+            return
+        # One round trip; the first job is pushed first, so it is also taken first
+        pipe = self._redis.pipeline(transaction=False)
+        for job in jobs:
+            pipe.set(self._job_key(job.job_id), job.model_dump_json(), ex=settings.job_ttl_seconds)
+        pipe.lpush(self._queue_key, *(job.job_id for job in jobs))
+        pipe.execute()
+
+    def dequeue(self, timeout: float) -> Optional[str]:
+        # Alive before claiming, so a claimed job is never without a live owner
+        self.heartbeat()
+        item = self._redis.blmove(self._queue_key, self._processing_key, max(1, int(timeout)), "RIGHT", "LEFT")
+        return item.decode() if item else None
+
+    def ack(self, job_id: str) -> None:
+        self._redis.lrem(self._processing_key, 1, job_id)
+
+    def heartbeat(self) -> None:
+        self._redis.set(f"{self._alive_prefix}{self.worker_id}", 1, ex=settings.job_visibility_timeout)
+
+    def requeue_stale(self) -> List[str]:
+        requeued = []
+        # Redis drops empty lists, so only workers holding claims show up
+        for key in self._redis.scan_iter(match=f"{self._processing_prefix}*"):
+            worker_id = key.decode()[len(self._processing_prefix):]
+            jobs = self._requeue_stale(keys=[key, f"{self._alive_prefix}{worker_id}", self._queue_key])
+            if jobs:
+                logger.warning(f"Requeued {len(jobs)} job(s) abandoned by worker {worker_id}")
+            requeued.extend(job_id.decode() for job_id in jobs)
+        for job_id in requeued:
+            self.update(job_id, status=ProcessingStatus.PENDING, started_at=None)
+        return requeued
+
+    def get(self, job_id: str) -> Optional[FileProcessingJob]:
+        raw = self._redis.get(self._job_key(job_id))
+        return FileProcessingJob.model_validate_json(raw) if raw else None
+
+    def save(self, job: FileProcessingJob) -> None:
+        self._redis.set(self._job_key(job.job_id), job.model_dump_json(), ex=settings.job_ttl_seconds)
+
+    def depth(self) -> int:
+        return int(self._redis.llen(self._queue_key))
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide queue for the configured backend."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            if settings.job_queue_backend == "memory":
+                _job_queue = MemoryJobQueue()
+            else:
+                _job_queue = RedisJobQueue(settings.redis_url, settings.job_queue_name)
+            logger.info(f"Job queue backend: {settings.job_queue_backend}")
+        return _job_queue
+
+
+def new_job(**fields: Any) -> FileProcessingJob:
+    """A pending job with a fresh id."""
+    return FileProcessingJob(job_id=uuid.uuid4().hex, status=ProcessingStatus.PENDING, **fields)
+
+
+def mark_started(job_queue: JobQueue, job: FileProcessingJob) -> Optional[FileProcessingJob]:
+    return job_queue.update(job.job_id, status=ProcessingStatus.PROCESSING, started_at=datetime.utcnow(),
+                            attempts=job.attempts + 1)
+
+
+def mark_finished(job_queue: JobQueue, job_id: str, error: Optional[str] = None,
+                  results: Optional[Dict[str, Any]] = None) -> Optional[FileProcessingJob]:
+    fields: Dict[str, Any] = {
+        "status": ProcessingStatus.FAILED if error else ProcessingStatus.COMPLETED,
+        "completed_at": datetime.utcnow(),
+        "error_message": error,
+        "results": results,
+    }
+    if not error:
+        fields["progress"] = 1.0
+    return job_queue.update(job_id, **fields)
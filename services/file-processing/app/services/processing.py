@@ -0,0 +1,174 @@
+"""
+Post-upload processing pipeline.
+Parses uploaded VCFs, converts them into the columnar genotype store and
+tracks the UploadedFile status lifecycle: uploaded -> processing -> processed
+(or error). Runs inside background workers, never in the request.
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ..core.config import settings
+from ..core.database import get_db_session
+from ..core.metrics import PARSE_SECONDS
+from ..models.database import UploadedFile
+from ..models.file_models import FileProcessingJob, FileType
+from . import genotype_store
+from .cache import file_details_cache
+from .file_listing import file_counts
+from .jobs import get_job_queue, new_job
+from .vcf_parser import VCFParseError, summarize_vcf
+
+logger = logging.getLogger(__name__)
+
+# File types with a processing stage
+PROCESSABLE_TYPES = {"vcf"}
+
+# Upload file types -> job file type categories
+JOB_FILE_TYPES = {
+    "vcf": FileType.VARIANT_CALL,
+    "bed": FileType.GENOMIC_INTERVALS,
+    "bam": FileType.ALIGNMENT,
+    "sam": FileType.ALIGNMENT,
+    "fasta": FileType.SEQUENCE,
+    "fastq": FileType.RAW_READS,
+}
+
+ProgressCallback = Callable[[float], None]
+
+
+def _update_file(file_id: int, **fields: Any) -> None:
+    with get_db_session() as db:
+        db_file = db.get(UploadedFile, file_id)
+        if db_file is None:
+            raise LookupError(f"File {file_id} not found")
+        file_type, old_status = db_file.file_type, db_file.status
+        for name, value in fields.items():
+            setattr(db_file, name, value)
+    file_details_cache.invalidate(file_id)
+    if "status" in fields:
+        file_counts.moved(file_type, old_status, fields["status"])
+
+
+def process_file(file_id: int, progress: Optional[ProgressCallback] = None,
+                 deep_validation: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Parse and convert one uploaded file. Blocking.
+    Returns a short results dict; raises after recording the error on the file.
+
+    With deep_validation (default settings.vcf_deep_validation) every record
+    is checked during the counting pass, and a file with errors stops there.
+    """
+    report = progress or (lambda fraction: None)
+    if deep_validation is None:
+        deep_validation = settings.vcf_deep_validation
+
+    with get_db_session() as db:
+        db_file = db.get(UploadedFile, file_id)
+        if db_file is None or db_file.is_deleted:
+            raise LookupError(f"File {file_id} not found")
+        source = Path(db_file.file_path)
+        content_hash = db_file.content_hash
+        file_type = db_file.file_type
+        validation_result = dict(db_file.validation_result or {})
+        old_status = db_file.status
+        db_file.status = "processing"
+    file_details_cache.invalidate(file_id)
+    file_counts.moved(file_type, old_status, "processing")
+
+    try:
+        # Stage 1: header and record counts (and deep validation, in the same pass)
+        started = time.perf_counter()
+        summary = summarize_vcf(source, validate=deep_validation)
+        PARSE_SECONDS.labels(file_type, "deep_validate" if deep_validation else "summarize").observe(
+            time.perf_counter() - started
+        )
+        metadata = dict(validation_result.get("metadata") or {})
+        metadata["vcf"] = summary.to_metadata()
+        validation_result["metadata"] = metadata
+        if summary.validation is not None:
+            validation_result["deep_validation"] = summary.validation.to_metadata()
+            if not summary.validation.is_valid:
+                validation_result["is_valid"] = False
+                validation_result["errors"] = summary.validation.messages()
+                _update_file(file_id, validation_result=validation_result)
+                raise VCFParseError(
+                    f"Deep validation found {summary.validation.error_count} error(s)"
+                    f"{' (stopped early)' if summary.validation.truncated else ''}; "
+                    f"first: {summary.validation.messages()[0]}"
+                )
+        _update_file(
+            file_id,
+            sample_count=summary.sample_count,
+            variant_count=summary.variant_count,
+            validation_result=validation_result,
+        )
+        report(0.3)
+
+        # Stage 2: columnar genotype store and region index, shared by files with the same content
+        destination = genotype_store.store_dir_for(content_hash)
+        if not genotype_store.store_is_current(destination):
+            logger.info(f"Converting file {file_id} into genotype store {destination}")
+            started = time.perf_counter()
+            genotype_store.convert_vcf(source, destination, summary)
+            PARSE_SECONDS.labels(file_type, "convert").observe(time.perf_counter() - started)
+        else:
+            logger.info(f"Reusing genotype store {destination} for file {file_id}")
+        report(1.0)
+    except Exception as e:
+        logger.error(f"Processing failed for file {file_id}: {e}")
+        _update_file(file_id, status="error", error_message=f"Processing failed: {e}")
+        raise
+
+    _update_file(file_id, status="processed", processed_path=str(destination), error_message=None)
+    logger.info(f"File {file_id} processed")
+    return {
+        "sample_count": summary.sample_count,
+        "variant_count": summary.variant_count,
+        "processed_path": str(destination),
+    }
+
+
+def mark_file_failed(file_id: int, error: str) -> None:
+    """Record a processing failure that happened outside process_file (e.g. an abandoned job)."""
+    _update_file(file_id, status="error", error_message=f"Processing failed: {error}")
+
+
+def _processing_job(upload_result: Dict[str, Any], deep_validation: Optional[bool]) -> Optional[FileProcessingJob]:
+    if upload_result["file_type"] not in PROCESSABLE_TYPES or upload_result["status"] != "uploaded":
+        return None
+    return new_job(
+        file_id=str(upload_result["file_id"]),
+        filename=upload_result["filename"],
+        file_type=JOB_FILE_TYPES[upload_result["file_type"]],
+        deep_validation=deep_validation,
+    )
+
+
+def enqueue_processing(upload_result: Dict[str, Any], deep_validation: Optional[bool] = None) -> Optional[str]:
+    """Queue processing for a freshly registered upload if its type needs it. Returns the job id."""
+    return enqueue_processing_many([upload_result], deep_validation)[0]
+
+
+def enqueue_processing_many(upload_results: List[Dict[str, Any]],
+                            deep_validation: Optional[bool] = None) -> List[Optional[str]]:
+    """
+    Queue processing for several freshly registered uploads in one queue round
+    trip. Returns a job id (or None) per upload, in order. Blocking.
+    """
+    jobs = [_processing_job(result, deep_validation) for result in upload_results]
+    queued = [job for job in jobs if job is not None]
+    if not queued:
+        return [None] * len(jobs)
+    try:
+        get_job_queue().enqueue_many(queued)
+    except Exception as e:
+        # The files are stored either way; POST /files/{id}/process can queue them later
+        file_ids = ", ".join(job.file_id for job in queued)
+        logger.error(f"Could not queue processing for file(s) {file_ids}: {e}")
+        return [None] * len(jobs)
+    for job in queued:
+        logger.info(f"Queued processing job {job.job_id} for file {job.file_id}")
+    return [job.job_id if job is not None else None for job in jobs]
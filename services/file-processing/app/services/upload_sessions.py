@@ -0,0 +1,231 @@
+"""
+Resumable multi-part upload sessions.
+
+Session state lives entirely on disk under settings.upload_session_dir so
+chunks of one session can be received by any API replica sharing the volume:
+a manifest written once at creation, plus one file per received chunk that
+is atomically renamed into place when fully written.
+"""
+
+import errno
+import hashlib
+import logging
+import math
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Tuple
+
+import aiofiles
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..core.metrics import record_upload
+from ..models.file_models import UploadSessionManifest, UploadSessionStatus
+from .upload_stream import ChunkInspector, StreamedUpload
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+CHUNK_SUFFIX = ".part"
+
+# Errors that mean "this kernel/filesystem can't do copy_file_range here"
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP}
+
+
+def _session_dir(session_id: str) -> Path:
+    try:
+        session_id = uuid.UUID(hex=session_id).hex
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return Path(settings.upload_session_dir) / session_id
+
+
+def _chunk_path(directory: Path, index: int) -> Path:
+    return directory / f"{index:08d}{CHUNK_SUFFIX}"
+
+
+def create_session(filename: str, total_size: int, chunk_size: int = None) -> UploadSessionManifest:
+    """Create a new upload session and write its manifest."""
+    chunk_size = chunk_size or settings.upload_session_chunk_size
+    if chunk_size > settings.max_upload_session_chunk_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chunk size too large. Maximum: {settings.max_upload_session_chunk_size} bytes"
+        )
+    if total_size > settings.max_upload_session_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size: {settings.max_upload_session_size / (1024*1024):.0f}MB"
+        )
+
+    manifest = UploadSessionManifest(
+        session_id=uuid.uuid4().hex,
+        filename=Path(filename).name,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        total_chunks=math.ceil(total_size / chunk_size),
+        created_at=datetime.utcnow(),
+    )
+    directory = _session_dir(manifest.session_id)
+    directory.mkdir(parents=True, exist_ok=False)
+    (directory / MANIFEST_NAME).write_text(manifest.model_dump_json())
+    logger.info(f"Upload session {manifest.session_id} created for {manifest.filename} "
+                f"({manifest.total_chunks} chunks)")
+    return manifest
+
+
+def load_manifest(session_id: str) -> UploadSessionManifest:
+    """Load a session manifest, raising 404 for unknown sessions."""
+    manifest_path = _session_dir(session_id) / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return UploadSessionManifest.model_validate_json(manifest_path.read_text())
+
+
+def expected_chunk_size(manifest: UploadSessionManifest, index: int) -> int:
+    if index == manifest.total_chunks - 1:
+        return manifest.total_size - manifest.chunk_size * (manifest.total_chunks - 1)
+    return manifest.chunk_size
+
+
+def received_chunks(session_id: str) -> List[int]:
+    """Indices of chunks fully written for a session."""
+    directory = _session_dir(session_id)
+    return sorted(
+        int(entry.name[:-len(CHUNK_SUFFIX)])
+        for entry in os.scandir(directory)
+        if entry.name.endswith(CHUNK_SUFFIX)
+    )
+
+
+def session_status(session_id: str) -> UploadSessionStatus:
+    manifest = load_manifest(session_id)
+    received = received_chunks(session_id)
+    received_set = set(received)
+    missing = [i for i in range(manifest.total_chunks) if i not in received_set]
+    return UploadSessionStatus(
+        session_id=manifest.session_id,
+        filename=manifest.filename,
+        total_size=manifest.total_size,
+        chunk_size=manifest.chunk_size,
+        total_chunks=manifest.total_chunks,
+        received_chunks=received,
+        missing_chunks=missing,
+        is_complete=not missing,
+    )
+
+
+async def write_chunk(session_id: str, index: int, body: AsyncIterator[bytes]) -> Tuple[int, str]:
+    """
+    Stream one chunk body to disk. The chunk only becomes visible once it is
+    complete and has the expected size, so concurrent and retried PUTs of the
+    same index are safe. Returns (size, sha256).
+    """
+    manifest = load_manifest(session_id)
+    if index < 0 or index >= manifest.total_chunks:
+        raise HTTPException(status_code=400, detail=f"Chunk index out of range: {index}")
+
+    expected = expected_chunk_size(manifest, index)
+    directory = _session_dir(session_id)
+    final_path = _chunk_path(directory, index)
+    tmp_path = directory / f"{final_path.name}.{uuid.uuid4().hex}.tmp"
+
+    hasher = hashlib.sha256()
+    size = 0
+    started = time.perf_counter()
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            async for piece in body:
+                size += len(piece)
+                if size > expected:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Chunk {index} exceeds expected size of {expected} bytes"
+                    )
+                hasher.update(piece)
+                await out.write(piece)
+        if size != expected:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Chunk {index} has {size} bytes, expected {expected}"
+            )
+        os.replace(tmp_path, final_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    record_upload("session_chunk", size, started)
+    return size, hasher.hexdigest()
+
+
+def _copy_fd(src_fd: int, dst_fd: int, count: int) -> None:
+    """Copy count bytes between file descriptors without going through Python buffers."""
+    remaining = count
+    try:
+        while remaining > 0:
+            copied = os.copy_file_range(src_fd, dst_fd, remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    except (AttributeError, OSError) as e:
+        if isinstance(e, OSError) and e.errno not in _FALLBACK_ERRNOS:
+            raise
+        while remaining > 0:
+            sent = os.sendfile(dst_fd, src_fd, None, remaining)
+            if sent == 0:
+                break
+            remaining -= sent
+    if remaining:
+        raise IOError(f"Short copy: {remaining} bytes missing")
+
+
+def assemble(session_id: str, destination: Path) -> StreamedUpload:
+    """
+    Concatenate all chunks of a complete session into destination.
+
+    Chunk data is moved with copy_file_range (falling back to sendfile), so
+    the kernel does the copy; only the hash and format sniff read the data
+    back through Python. Blocking - run it in a worker thread.
+    """
+    status = session_status(session_id)
+    if not status.is_complete:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload session incomplete: {len(status.missing_chunks)} chunks missing"
+        )
+
+    directory = _session_dir(session_id)
+    try:
+        with open(destination, "wb") as out:
+            for index in range(status.total_chunks):
+                chunk_path = _chunk_path(directory, index)
+                with open(chunk_path, "rb") as src:
+                    _copy_fd(src.fileno(), out.fileno(), os.fstat(src.fileno()).st_size)
+
+        inspector = ChunkInspector()
+        with open(destination, "rb") as assembled:
+            for block in iter(lambda: assembled.read(settings.upload_chunk_size), b""):
+                inspector.update(block)
+    except BaseException:
+        if destination.exists():
+            destination.unlink()
+        raise
+
+    return StreamedUpload(
+        path=destination,
+        size=inspector.size,
+        sha256=inspector.sha256,
+        sniff=inspector.sniff,
+    )
+
+
+def delete_session(session_id: str) -> None:
+    """Remove a session and all of its chunks."""
+    directory = _session_dir(session_id)
+    if not directory.exists():
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    shutil.rmtree(directory, ignore_errors=True)
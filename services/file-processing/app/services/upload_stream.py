@@ -0,0 +1,108 @@
+"""
+Streaming upload ingestion for the file processing service.
+Copies an UploadFile to disk in bounded chunks while hashing and sniffing it.
+"""
+
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+from ..core.config import settings
+from ..core.metrics import record_upload
+from ..utils.compression import PLAIN
+from ..utils.file_validator import PrefixSniffer, Sniff
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamedUpload:
+    """Result of streaming an upload to disk."""
+
+    path: Path
+    size: int
+    sha256: str
+    sniff: Sniff
+
+    @property
+    def is_gzip(self) -> bool:
+        return self.sniff.compression != PLAIN
+
+
+class ChunkInspector:
+    """
+    Inspect an upload chunk by chunk: SHA-256 plus the bounded prefix used
+    by the format checks. Memory use is bounded by settings.sniff_bytes
+    regardless of the file size.
+    """
+
+    def __init__(self, max_lines: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.sniffer = PrefixSniffer(max_lines, max_bytes)
+
+    def update(self, chunk: bytes) -> None:
+        """Feed the next chunk of the upload."""
+        self.hasher.update(chunk)
+        self.size += len(chunk)
+        self.sniffer.update(chunk)
+
+    @property
+    def sha256(self) -> str:
+        return self.hasher.hexdigest()
+
+    @property
+    def sniff(self) -> Sniff:
+        """Prefix of the whole upload; only valid once every chunk was fed."""
+        return self.sniffer.sniff(complete=True)
+
+
+async def stream_upload_to_disk(
+    upload: UploadFile,
+    destination: Path,
+    max_size: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> StreamedUpload:
+    """
+    Copy an upload to disk in fixed-size chunks.
+
+    The size limit is enforced while streaming, so an oversized upload is
+    rejected with 413 as soon as it crosses the limit and the partial file
+    is removed. The file is read exactly once.
+    """
+    max_size = max_size or settings.max_file_size
+    chunk_size = chunk_size or settings.upload_chunk_size
+    inspector = ChunkInspector()
+    started = time.perf_counter()
+
+    try:
+        async with aiofiles.open(destination, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                if inspector.size + len(chunk) > max_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size: {max_size / (1024*1024):.0f}MB"
+                    )
+                inspector.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        if destination.exists():
+            destination.unlink()
+        raise
+
+    record_upload("stream", inspector.size, started)
+    return StreamedUpload(
+        path=destination,
+        size=inspector.size,
+        sha256=inspector.sha256,
+        sniff=inspector.sniff,
+    )
@@ -0,0 +1,395 @@
+"""
+Streaming VCF parser for the file processing service.
+Summarizes plain, gzip and BGZF VCF files in constant memory using large block reads.
+
+Plain and BGZF files are split into ranges of whole lines that are parsed in
+a process pool; plain gzip can only be read front to back.
+"""
+
+import gzip
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..core.config import settings
+from ..utils.compression import BGZF, GZIP, GZIP_MAGIC, PLAIN
+from . import bgzf
+from .vcf_validation import RangeValidation, RecordValidator, ValidationReport, merge_validations
+
+logger = logging.getLogger(__name__)
+
+# Number of sample names kept in the stored summary
+SAMPLE_PREVIEW = 20
+
+# Ranges per worker process, so uneven ranges still balance out
+RANGES_PER_WORKER = 4
+# Read size when looking for the end of a line at a range boundary
+LINE_SCAN_SIZE = 64 * 1024
+
+
+class VCFParseError(ValueError):
+    """Raised when a file cannot be parsed as VCF."""
+
+
+@dataclass
+class VCFHeader:
+    """Parsed VCF meta-information and column header."""
+
+    file_format: Optional[str] = None
+    samples: List[str] = field(default_factory=list)
+    contigs: List[str] = field(default_factory=list)
+    line_count: int = 0
+    # Columns of the #CHROM line (0 when it is missing)
+    column_count: int = 0
+
+
+@dataclass
+class ParseRange:
+    """
+    A run of whole data lines.
+
+    start is a byte offset (uncompressed for gzip) or, for BGZF, a virtual
+    offset; length is in uncompressed bytes, None meaning to the end of the file.
+    offset is the uncompressed byte offset of the first line.
+    """
+
+    start: int
+    length: Optional[int]
+    offset: int
+    variant_count: int = 0
+
+
+@dataclass
+class ParsePlan:
+    """How a file's records are divided between parse workers."""
+
+    path: str
+    compression: str
+    ranges: List[ParseRange]
+    # Uncompressed offset of the first record
+    data_offset: int = 0
+    # BGZF only: scan_blocks output (compressed, uncompressed block offsets)
+    blocks: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def locate(self, offset: int) -> int:
+        """Range start for an uncompressed offset (a virtual offset for BGZF)."""
+        if self.blocks is None:
+            return offset
+        return bgzf.to_virtual_offset(self.blocks[0], self.blocks[1], offset)
+
+
+@dataclass
+class VCFSummary:
+    """Constant-size summary of a VCF file."""
+
+    header: VCFHeader
+    variant_count: int = 0
+    chromosomes: Dict[str, int] = field(default_factory=dict)
+    bytes_read: int = 0
+    # Ranges with their record counts, reused by the conversion pass
+    plan: Optional[ParsePlan] = None
+    # Deep validation report, when requested
+    validation: Optional[ValidationReport] = None
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.header.samples)
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """JSON-serializable summary for validation_result."""
+        return {
+            "file_format": self.header.file_format,
+            "sample_count": self.sample_count,
+            "samples_preview": self.header.samples[:SAMPLE_PREVIEW],
+            "variant_count": self.variant_count,
+            "chromosomes": self.chromosomes,
+            "declared_contigs": len(self.header.contigs),
+            "header_lines": self.header.line_count,
+            "record_bytes": self.bytes_read,
+        }
+
+
+def parse_workers() -> int:
+    """Number of processes to parse one file with."""
+    return settings.parse_workers or os.cpu_count() or 1
+
+
+def detect_compression(path: Union[str, Path]) -> str:
+    with open(path, "rb") as probe:
+        magic = probe.read(2)
+    if magic != GZIP_MAGIC:
+        return PLAIN
+    return BGZF if bgzf.is_bgzf(path) else GZIP
+
+
+def open_vcf(path: Union[str, Path]) -> IO[bytes]:
+    """Open a VCF for binary reading, transparently decompressing gzip/BGZF."""
+    with open(path, "rb") as probe:
+        magic = probe.read(2)
+    if magic == GZIP_MAGIC:
+        # gzip reads concatenated members, which is exactly what BGZF is
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_header(stream: IO[bytes]) -> Tuple[VCFHeader, bytes]:
+    """
+    Consume the header lines of a VCF.
+    Returns the header and the first data line (b"" if the file has no records).
+    """
+    header = VCFHeader()
+    while True:
+        line = stream.readline()
+        if not line:
+            return header, b""
+        if not line.startswith(b"#"):
+            return header, line
+
+        header.line_count += 1
+        text = line.rstrip(b"\r\n").decode("utf-8", errors="replace")
+        if text.startswith("##fileformat="):
+            header.file_format = text.split("=", 1)[1]
+        elif text.startswith("##contig=<"):
+            for item in text[len("##contig=<"):].rstrip(">").split(","):
+                if item.startswith("ID="):
+                    header.contigs.append(item[3:])
+                    break
+        elif text.startswith("#CHROM"):
+            columns = text.split("\t")
+            if len(columns) < 8:
+                raise VCFParseError("#CHROM header line has fewer than 8 columns")
+            header.samples = columns[9:]
+            header.column_count = len(columns)
+
+
+class RecordCounter:
+    """
+    Count records per chromosome over arbitrary byte blocks.
+
+    Blocks whose lines all share one chromosome - the common case for sorted
+    files - are counted with bytes.count; only blocks spanning a chromosome
+    change fall back to looking at each line. An optional RecordValidator
+    sees the same whole-line blocks.
+    """
+
+    def __init__(self, validator: Optional[RecordValidator] = None):
+        self.chromosomes: Dict[str, int] = {}
+        self.variant_count = 0
+        self.bytes_read = 0
+        self.validator = validator
+        self._tail = b""
+
+    def feed(self, block: bytes) -> None:
+        self.bytes_read += len(block)
+        data = self._tail + block if self._tail else block
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            self._tail = data
+            return
+        self._tail = data[cut + 1:]
+        self._count(data[:cut + 1])
+
+    def finish(self) -> None:
+        if self._tail.strip():
+            self._count(self._tail + b"\n")
+        self._tail = b""
+
+    def _add(self, chrom: bytes, count: int) -> None:
+        name = chrom.decode("utf-8", errors="replace")
+        self.chromosomes[name] = self.chromosomes.get(name, 0) + count
+        self.variant_count += count
+
+    def _count(self, lines: bytes) -> None:
+        if self.validator is not None:
+            self.validator.check(lines)
+        n_lines = lines.count(b"\n")
+        tab = lines.find(b"\t")
+        if tab < 0:
+            raise VCFParseError("Data line without tab-separated columns")
+        first_chrom = lines[:tab]
+        if lines.count(b"\n" + first_chrom + b"\t") == n_lines - 1:
+            self._add(first_chrom, n_lines)
+            return
+
+        counts: Dict[bytes, int] = {}
+        for line in lines.split(b"\n"):
+            if line:
+                chrom = line[:line.find(b"\t")]
+                counts[chrom] = counts.get(chrom, 0) + 1
+        for chrom, count in counts.items():
+            self._add(chrom, count)
+
+
+def iter_range(path: Union[str, Path], compression: str, start: int, length: Optional[int],
+               block_size: int) -> Iterator[bytes]:
+    """Yield the decompressed bytes of a range in blocks of about block_size."""
+    if compression == BGZF:
+        # BGZF blocks are at most 64KB; batch them so callers see large blocks
+        pending: List[bytes] = []
+        pending_size = 0
+        for data in bgzf.iter_virtual(path, start, length):
+            pending.append(data)
+            pending_size += len(data)
+            if pending_size >= block_size:
+                yield b"".join(pending)
+                pending, pending_size = [], 0
+        if pending:
+            yield b"".join(pending)
+        return
+
+    opener = gzip.open if compression == GZIP else open
+    remaining = length
+    with opener(path, "rb") as stream:
+        # Seeking in gzip decompresses up to the offset; only ever done for the single range
+        stream.seek(start)
+        while remaining is None or remaining > 0:
+            block = stream.read(block_size if remaining is None else min(block_size, remaining))
+            if not block:
+                break
+            if remaining is not None:
+                remaining -= len(block)
+            yield block
+
+
+def _next_line_start(path: Union[str, Path], compression: str, locate: Callable[[int], int],
+                     position: int) -> int:
+    """Uncompressed offset of the first line starting at or after position (> 0)."""
+    offset = position - 1
+    for chunk in iter_range(path, compression, locate(offset), None, LINE_SCAN_SIZE):
+        newline = chunk.find(b"\n")
+        if newline >= 0:
+            return offset + newline + 1
+        offset += len(chunk)
+    return offset
+
+
+def plan_ranges(path: Union[str, Path], data_start: int, workers: int) -> ParsePlan:
+    """
+    Divide the records after data_start (an uncompressed offset) into ranges
+    of whole lines, about RANGES_PER_WORKER per worker and no smaller than
+    parse_split_size.
+    """
+    compression = detect_compression(path)
+    if compression == GZIP:
+        # Plain gzip cannot be entered mid-stream
+        return ParsePlan(str(path), compression, [ParseRange(data_start, None, data_start)], data_start)
+
+    plan = ParsePlan(str(path), compression, [], data_start)
+    if compression == BGZF:
+        plan.blocks = bgzf.scan_blocks(path)
+        data_end = int(plan.blocks[1][-1])
+    else:
+        data_end = os.path.getsize(path)
+
+    n_ranges = 1
+    if workers > 1:
+        n_ranges = max(1, min(workers * RANGES_PER_WORKER, (data_end - data_start) // settings.parse_split_size))
+
+    cuts = [data_start]
+    for i in range(1, n_ranges):
+        target = data_start + (data_end - data_start) * i // n_ranges
+        cut = _next_line_start(path, compression, plan.locate, max(target, cuts[-1]))
+        if cut >= data_end:
+            break
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    cuts.append(data_end)
+
+    plan.ranges = [ParseRange(plan.locate(start), end - start, start) for start, end in zip(cuts, cuts[1:])]
+    return plan
+
+
+def run_ranges(function: Callable[..., Any], tasks: Sequence[Tuple], workers: int) -> List[Any]:
+    """Call function(*task) for every task, in a process pool when there is more than one."""
+    if len(tasks) <= 1 or workers <= 1:
+        return [function(*task) for task in tasks]
+    # spawn rather than fork: the caller may be a worker thread inside the API process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as pool:
+        return list(pool.map(function, *zip(*tasks)))
+
+
+def _count_range(path: str, compression: str, start: int, length: Optional[int], block_size: int,
+                 validate: Optional[Tuple[List[str], int, int, int]] = None
+                 ) -> Tuple[Dict[str, int], int, int, Optional[RangeValidation]]:
+    """
+    Process pool task: record counts of one range, and its validation result
+    when validate holds RecordValidator arguments. A range whose error budget
+    is spent stops early with partial counts.
+    """
+    validator = RecordValidator(*validate) if validate else None
+    counter = RecordCounter(validator)
+    for block in iter_range(path, compression, start, length, block_size):
+        counter.feed(block)
+        if validator is not None and validator.exhausted:
+            break
+    else:
+        counter.finish()
+    return (counter.chromosomes, counter.variant_count, counter.bytes_read,
+            validator.result if validator else None)
+
+
+def summarize_vcf(path: Union[str, Path], block_size: Optional[int] = None,
+                  workers: Optional[int] = None, validate: bool = False) -> VCFSummary:
+    """
+    Parse the header and count samples, records and records per chromosome.
+    Records are never materialized as Python objects; memory stays bounded by
+    block_size per worker.
+
+    With validate, every record is also checked (see vcf_validation) in the
+    same pass and the report is attached as summary.validation. Counts are
+    incomplete when validation stops early on its error budget.
+    """
+    block_size = block_size or settings.parse_block_size
+    workers = workers or parse_workers()
+    started = time.monotonic()
+    try:
+        with open_vcf(path) as stream:
+            header, first_line = read_header(stream)
+            data_start = stream.tell() - len(first_line)
+        if header.file_format is None:
+            raise VCFParseError("Missing '##fileformat=VCF' header line")
+
+        if validate and not header.column_count:
+            raise VCFParseError("Missing '#CHROM' header line")
+
+        plan = plan_ranges(path, data_start, workers)
+        checks = None
+        if validate:
+            checks = (header.samples, header.column_count,
+                      settings.vcf_validation_max_examples, settings.vcf_validation_error_budget)
+        tasks = [(plan.path, plan.compression, r.start, r.length, block_size, checks) for r in plan.ranges]
+        results = run_ranges(_count_range, tasks, workers)
+    except (OSError, EOFError, bgzf.BGZFError) as e:
+        # Truncated or corrupt gzip streams surface as OSError/EOFError
+        raise VCFParseError(f"Could not read VCF: {e}") from e
+
+    summary = VCFSummary(header=header, plan=plan)
+    for parse_range, (chromosomes, variant_count, bytes_read, _) in zip(plan.ranges, results):
+        parse_range.variant_count = variant_count
+        summary.variant_count += variant_count
+        summary.bytes_read += bytes_read
+        for chrom, count in chromosomes.items():
+            summary.chromosomes[chrom] = summary.chromosomes.get(chrom, 0) + count
+
+    if validate:
+        summary.validation = merge_validations(
+            [result[3] for result in results], header.line_count,
+            settings.vcf_validation_max_examples, settings.vcf_validation_error_budget,
+        )
+        summary.validation.bytes_read = summary.bytes_read
+        summary.validation.seconds = time.monotonic() - started
+        logger.info(f"Validated VCF {path}: {summary.validation.error_count} error(s) "
+                    f"in {summary.validation.records_checked} records")
+
+    logger.info(f"Parsed VCF {path}: {summary.sample_count} samples, "
+                f"{summary.variant_count} variants, {len(summary.chromosomes)} chromosomes "
+                f"({len(plan.ranges)} range(s), {plan.compression})")
+    return summary
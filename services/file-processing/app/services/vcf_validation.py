@@ -0,0 +1,237 @@
+"""
+Deep (whole-file) VCF validation.
+
+Runs inside the record counting pass of summarize_vcf, over the same blocks,
+so a validated file is still read once. Each parse range is checked by a
+RecordValidator in its worker; per-range results are merged afterwards into
+file line numbers, and the contig order checks that span range boundaries
+are done at merge time.
+
+Only the first few errors of each class are kept (with line numbers), and a
+range stops checking once the error budget is spent.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Error classes
+COLUMN_COUNT = "column_count"
+POS_INVALID = "pos_invalid"
+POS_UNSORTED = "pos_unsorted"
+CONTIG_NOT_CONTIGUOUS = "contig_not_contiguous"
+REF_INVALID = "ref_invalid"
+ALT_INVALID = "alt_invalid"
+GT_INVALID = "gt_invalid"
+
+REF_RE = re.compile(rb"[ACGTNacgtn]+")
+# Bases, spanning deletion, missing, symbolic (<DEL>), breakends (G]17:198982], .A)
+_ALLELE = rb"(?:[ACGTNacgtn*]+|\.|<[^<>,\t]+>|\.?[ACGTNacgtn]+\.|[ACGTNacgtn]*[\[\]][^,\t]+)"
+ALT_RE = re.compile(rb"%s(?:,%s)*" % (_ALLELE, _ALLELE))
+# A sample column whose first FORMAT key is GT: allele indices or '.', separated by / or |.
+# Possessive quantifiers (Python 3.11+) stop backtracking; this regex is the hot loop
+_GT = rb"(?:\d++|\.)(?:[/|](?:\d++|\.))*+"
+GT_RE = re.compile(_GT)
+_SAMPLE = rb"%s(?::[^\t]*+)?+" % _GT
+SAMPLES_RE = re.compile(rb"%s(?:\t%s)*+" % (_SAMPLE, _SAMPLE))
+
+
+@dataclass
+class ContigRun:
+    """Consecutive records of one contig within a range."""
+
+    chrom: str
+    first_pos: int
+    last_pos: int
+    line: int
+
+
+@dataclass
+class RangeValidation:
+    """Validation result of one parse range; line numbers are range-relative (0-based)."""
+
+    examples: Dict[str, List[Tuple[int, str]]] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+    # Contigs in order of first appearance, with the run that opened them
+    contigs: List[ContigRun] = field(default_factory=list)
+    last_run: Optional[ContigRun] = None
+    lines: int = 0
+    truncated: bool = False
+
+
+class RecordValidator:
+    """Check whole data lines of one range: columns, POS order, REF/ALT alphabet and GT syntax."""
+
+    def __init__(self, samples: Sequence[str], n_columns: int, max_examples: int, error_budget: int):
+        self.samples = list(samples)
+        self.n_columns = n_columns
+        self.max_examples = max_examples
+        self.error_budget = error_budget
+        self.result = RangeValidation()
+        self._errors = 0
+        self._run: Optional[ContigRun] = None
+        self._seen = set()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.result.truncated
+
+    def _error(self, kind: str, line: int, message: str) -> None:
+        result = self.result
+        result.counts[kind] = result.counts.get(kind, 0) + 1
+        examples = result.examples.setdefault(kind, [])
+        if len(examples) < self.max_examples:
+            examples.append((line, message))
+        self._errors += 1
+        if self._errors >= self.error_budget:
+            result.truncated = True
+
+    def check(self, lines: bytes) -> None:
+        """Check a block of whole lines (ending with a newline)."""
+        if self.result.truncated:
+            return
+        n_samples = len(self.samples)
+        for line in lines.split(b"\n")[:-1]:
+            index = self.result.lines
+            self.result.lines += 1
+            fields = line.rstrip(b"\r").split(b"\t", 9)
+
+            if n_samples:
+                sample_columns = fields[9].count(b"\t") + 1 if len(fields) == 10 else 0
+                n_columns = 9 + sample_columns
+            else:
+                n_columns = len(fields)
+            if n_columns != self.n_columns:
+                self._error(COLUMN_COUNT, index, f"Expected {self.n_columns} columns, found {n_columns}")
+                if len(fields) < 8:
+                    continue
+
+            chrom, pos = fields[0], fields[1]
+            if not pos.isdigit() or pos == b"0":
+                self._error(POS_INVALID, index, f"Invalid POS '{pos.decode(errors='replace')}'")
+            else:
+                self._track_position(chrom.decode("utf-8", errors="replace"), int(pos), index)
+
+            if not REF_RE.fullmatch(fields[3]):
+                self._error(REF_INVALID, index, f"Invalid REF '{fields[3][:50].decode(errors='replace')}'")
+            if not ALT_RE.fullmatch(fields[4]):
+                self._error(ALT_INVALID, index, f"Invalid ALT '{fields[4][:50].decode(errors='replace')}'")
+
+            if n_samples and n_columns == self.n_columns and fields[8].split(b":", 1)[0] == b"GT":
+                if not SAMPLES_RE.fullmatch(fields[9]):
+                    self._error(GT_INVALID, index, self._describe_bad_genotype(fields[9]))
+
+            if self.result.truncated:
+                return
+
+    def _describe_bad_genotype(self, sample_columns: bytes) -> str:
+        for name, value in zip(self.samples, sample_columns.split(b"\t")):
+            gt = value.split(b":", 1)[0]
+            if not GT_RE.fullmatch(gt):
+                return f"Sample {name}: invalid GT '{gt[:20].decode(errors='replace')}'"
+        return "Invalid GT"
+
+    def _track_position(self, chrom: str, pos: int, index: int) -> None:
+        run = self._run
+        if run is not None and run.chrom == chrom:
+            if pos < run.last_pos:
+                self._error(POS_UNSORTED, index, f"POS {pos} after {run.last_pos} on {chrom}")
+            else:
+                run.last_pos = pos
+            return
+
+        if chrom in self._seen:
+            self._error(CONTIG_NOT_CONTIGUOUS, index, f"Records of {chrom} resume after other contigs")
+        self._run = ContigRun(chrom, pos, pos, index)
+        self.result.last_run = self._run
+        if chrom not in self._seen:
+            self._seen.add(chrom)
+            self.result.contigs.append(ContigRun(chrom, pos, pos, index))
+
+
+@dataclass
+class ValidationReport:
+    """Merged deep validation result for a whole file."""
+
+    records_checked: int = 0
+    bytes_read: int = 0
+    seconds: float = 0.0
+    truncated: bool = False
+    counts: Dict[str, int] = field(default_factory=dict)
+    examples: Dict[str, List[Tuple[int, str]]] = field(default_factory=dict)
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def is_valid(self) -> bool:
+        return self.error_count == 0
+
+    def messages(self) -> List[str]:
+        """Sampled errors as 'line N: message', in file order."""
+        flat = [example for examples in self.examples.values() for example in examples]
+        return [f"line {line}: {message}" for line, message in sorted(flat)]
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """JSON-serializable report for validation_result."""
+        seconds = max(self.seconds, 1e-9)
+        return {
+            "is_valid": self.is_valid,
+            "error_count": self.error_count,
+            "truncated": self.truncated,
+            "errors": {
+                kind: {
+                    "count": count,
+                    "examples": [{"line": line, "message": message} for line, message in self.examples.get(kind, [])],
+                }
+                for kind, count in self.counts.items()
+            },
+            "records_checked": self.records_checked,
+            "seconds": round(self.seconds, 3),
+            "mb_per_second": round(self.bytes_read / seconds / (1024 * 1024), 1),
+            "records_per_second": int(self.records_checked / seconds),
+        }
+
+
+def merge_validations(results: Sequence[RangeValidation], header_lines: int, max_examples: int,
+                      error_budget: int) -> ValidationReport:
+    """
+    Combine range results in file order. Line numbers become 1-based file
+    lines. Ranges after the first truncated one are dropped, so the report
+    holds the earliest errors of the file.
+    """
+    report = ValidationReport()
+    candidates: Dict[str, List[Tuple[int, str]]] = {}
+
+    def add(kind: str, count: int, examples: List[Tuple[int, str]]) -> None:
+        report.counts[kind] = report.counts.get(kind, 0) + count
+        candidates.setdefault(kind, []).extend(examples)
+
+    first_line = header_lines + 1
+    seen = set()
+    previous: Optional[ContigRun] = None
+    for result in results:
+        for kind, count in result.counts.items():
+            add(kind, count, [(first_line + line, message) for line, message in result.examples.get(kind, [])])
+
+        # Contig order across the boundary with the previous range
+        for position, run in enumerate(result.contigs):
+            continues = position == 0 and previous is not None and previous.chrom == run.chrom
+            if continues and run.first_pos < previous.last_pos:
+                add(POS_UNSORTED, 1, [(first_line + run.line,
+                                       f"POS {run.first_pos} after {previous.last_pos} on {run.chrom}")])
+            elif not continues and run.chrom in seen:
+                add(CONTIG_NOT_CONTIGUOUS, 1, [(first_line + run.line,
+                                                f"Records of {run.chrom} resume after other contigs")])
+            seen.add(run.chrom)
+        previous = result.last_run or previous
+
+        report.records_checked += result.lines
+        first_line += result.lines
+        if result.truncated or report.error_count >= error_budget:
+            report.truncated = True
+            break
+
+    report.examples = {kind: sorted(examples)[:max_examples] for kind, examples in candidates.items()}
+    return report
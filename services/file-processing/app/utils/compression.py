@@ -0,0 +1,55 @@
+"""
+Compression kinds of genomic files and the magic bytes that identify them.
+
+Shared by upload validation (which only sees a prefix of a file) and the
+readers and writers in services, so a file is classified the same way
+everywhere.
+"""
+
+import io
+import struct
+from typing import IO, Optional, Tuple
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Compression kinds, as far as range reading is concerned
+PLAIN = "plain"
+GZIP = "gzip"
+BGZF = "bgzf"
+
+# gzip magic, deflate, FEXTRA set; then the BC extra subfield
+BGZF_HEADER = struct.Struct("<4sIBBHBBH")
+BGZF_MAGIC = b"\x1f\x8b\x08\x04"
+# Fixed gzip header up to and including XLEN; the extra field follows
+GZIP_HEADER_SIZE = 12
+
+
+class BGZFError(ValueError):
+    """Raised for files that are not valid BGZF."""
+
+
+def read_block_header(f: IO[bytes]) -> Optional[Tuple[int, int]]:
+    """
+    Read the header of the BGZF block at the current position.
+    Returns (total block size, header length), or None at end of file.
+    """
+    raw = f.read(BGZF_HEADER.size)
+    if not raw:
+        return None
+    if len(raw) < BGZF_HEADER.size:
+        raise BGZFError("Truncated BGZF block header")
+    magic, _mtime, _xfl, _os, xlen, si1, si2, slen = BGZF_HEADER.unpack(raw)
+    if magic != BGZF_MAGIC or si1 != 66 or si2 != 67 or slen != 2:
+        # BC is required to be the first subfield in practice (bgzip, htslib)
+        raise BGZFError("Not a BGZF block")
+    (bsize,) = struct.unpack("<H", f.read(2))
+    # XLEN may hold further subfields after BC
+    return bsize + 1, GZIP_HEADER_SIZE + xlen
+
+
+def is_bgzf_header(prefix: bytes) -> bool:
+    """Whether a byte prefix (at least the first 18 bytes of a file) is a BGZF block header."""
+    try:
+        return read_block_header(io.BytesIO(prefix)) is not None
+    except (BGZFError, struct.error):
+        return False
@@ -1,90 +1,374 @@
+"""
+Content-based file validation.
+
+The format of an upload is decided from its first bytes rather than its name:
+one bounded prefix is sniffed while the upload streams in (raw magic bytes
+plus up to settings.sniff_bytes of decompressed text) and every registered
+format check runs over that same prefix, so validation costs the same for a
+1KB and a 50GB file and never spawns libmagic.
+
+Format checks are pluggable: subclass FormatValidator and decorate it with
+@register. Registration order is detection order.
+"""
+
+import logging
 import os
-import magic
-from typing import Tuple, Optional
-from app.core.config import settings, FILE_TYPE_MAPPING
-from app.models.file_models import FileType, FileValidationResult
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Type, Union
+
+from ..core.config import FILE_TYPE_MAPPING, settings
+from ..core.metrics import VALIDATION_SECONDS
+from .compression import BGZF, GZIP, GZIP_MAGIC, PLAIN, is_bgzf_header
+
+logger = logging.getLogger(__name__)
+
+# Raw bytes kept for magic checks (a BGZF header is 18 bytes)
+MAGIC_SIZE = 64
+# sniff_file stops reading after this many raw bytes per sniffed byte
+RAW_READ_FACTOR = 4
+
+SAM_HEADER_TAGS = ("@HD\t", "@SQ\t", "@RG\t", "@PG\t", "@CO\t")
+
+
+@dataclass
+class Sniff:
+    """Bounded prefix of a file shared by all format checks."""
+
+    magic: bytes
+    compression: str
+    head: bytes
+    complete: bool
+    lines: List[str] = field(init=False)
+
+    def __post_init__(self):
+        lines = self.head.split(b"\n")
+        # Drop a trailing partial line unless the whole file fitted in the sniff window
+        if not self.complete and len(lines) > 1:
+            lines = lines[:-1]
+        self.lines = [
+            line.decode("utf-8", errors="replace").rstrip("\r")
+            for line in lines[:settings.sniff_lines]
+            if line
+        ]
+
+    def data_lines(self, comment_prefixes=("#",)) -> List[str]:
+        return [line for line in self.lines if not line.startswith(comment_prefixes)]
+
+
+class PrefixSniffer:
+    """
+    Collect a Sniff from a stream fed chunk by chunk. gzip and BGZF content
+    is decompressed, stopping at max_bytes of output or max_lines lines.
+    """
+
+    def __init__(self, max_lines: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_lines = max_lines or settings.sniff_lines
+        self.max_bytes = max_bytes or settings.sniff_bytes
+        self.done = False
+        self._magic = bytearray()
+        self._head = bytearray()
+        self._is_gzip: Optional[bool] = None
+        self._inflater = None
+
+    def update(self, chunk: bytes) -> None:
+        if len(self._magic) < MAGIC_SIZE:
+            self._magic += chunk[:MAGIC_SIZE - len(self._magic)]
+        if self.done or not chunk:
+            return
+
+        if self._is_gzip is None:
+            self._is_gzip = chunk[:2] == GZIP_MAGIC
+            if self._is_gzip:
+                self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+        if self._is_gzip:
+            data = chunk
+            try:
+                while data and len(self._head) < self.max_bytes:
+                    budget = self.max_bytes - len(self._head)
+                    self._head += self._inflater.decompress(data, budget)
+                    if self._inflater.eof:
+                        # BGZF and concatenated gzip: start the next member
+                        data = self._inflater.unused_data
+                        self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                    else:
+                        data = self._inflater.unconsumed_tail
+            except zlib.error as e:
+                logger.warning(f"Could not decompress upload prefix: {e}")
+                self.done = True
+                return
+        else:
+            self._head += chunk[:self.max_bytes - len(self._head)]
+
+        if len(self._head) >= self.max_bytes or self._head.count(b"\n") >= self.max_lines:
+            self.done = True
+
+    def sniff(self, complete: bool) -> Sniff:
+        """The prefix collected so far; complete means the whole file was fed in."""
+        if not self._is_gzip:
+            compression = PLAIN
+        else:
+            compression = BGZF if is_bgzf_header(bytes(self._magic)) else GZIP
+        return Sniff(
+            magic=bytes(self._magic),
+            compression=compression,
+            head=bytes(self._head),
+            complete=complete and not self.done,
+        )
+
+
+def sniff_file(path: Union[str, Path]) -> Sniff:
+    """Sniff a file on disk, reading a bounded prefix."""
+    sniffer = PrefixSniffer()
+    read = 0
+    with open(path, "rb") as f:
+        while not sniffer.done and read < sniffer.max_bytes * RAW_READ_FACTOR:
+            chunk = f.read(sniffer.max_bytes)
+            if not chunk:
+                return sniffer.sniff(complete=True)
+            sniffer.update(chunk)
+            read += len(chunk)
+    return sniffer.sniff(complete=False)
+
+
+class FormatValidator(ABC):
+    """Content checks for one upload file type."""
+
+    file_type: str = ""
+
+    @abstractmethod
+    def detect(self, sniff: Sniff) -> bool:
+        """Whether the content positively identifies this format."""
+
+    @abstractmethod
+    def check(self, sniff: Sniff) -> List[str]:
+        """Errors for content that claims to be this format."""
+
+    def warnings(self, sniff: Sniff) -> List[str]:
+        return []
+
+
+VALIDATORS: Dict[str, FormatValidator] = {}
+
+
+def register(validator_class: Type[FormatValidator]) -> Type[FormatValidator]:
+    """Class decorator adding a format to the registry."""
+    VALIDATORS[validator_class.file_type] = validator_class()
+    return validator_class
+
+
+def _is_int(value: str) -> bool:
+    return value.isdigit()
+
+
+@register
+class BAMValidator(FormatValidator):
+    file_type = "bam"
+
+    def detect(self, sniff: Sniff) -> bool:
+        return sniff.compression == BGZF and sniff.head.startswith(b"BAM\x01")
+
+    def check(self, sniff: Sniff) -> List[str]:
+        if sniff.compression != BGZF:
+            return ["BAM files must be BGZF-compressed"]
+        if not sniff.head.startswith(b"BAM\x01"):
+            return ["Missing BAM magic"]
+        return []
+
+
+@register
+class VCFValidator(FormatValidator):
+    file_type = "vcf"
+
+    def detect(self, sniff: Sniff) -> bool:
+        return bool(sniff.lines) and sniff.lines[0].startswith("##fileformat=VCF")
+
+    def check(self, sniff: Sniff) -> List[str]:
+        if not sniff.lines:
+            return ["File is empty"]
+        if not sniff.lines[0].startswith("##fileformat=VCF"):
+            return ["Missing '##fileformat=VCF' header line"]
+        header = [line for line in sniff.lines if line.startswith("#CHROM")]
+        if not header:
+            # Long meta-information sections can run past the sniff window
+            return ["Missing '#CHROM' header line"] if sniff.complete else []
+        columns = header[0].split("\t")
+        if len(columns) < 8:
+            return [f"'#CHROM' header line has {len(columns)} columns, expected at least 8"]
+        for line in sniff.data_lines():
+            if len(line.split("\t")) != len(columns):
+                return ["Record column count does not match the '#CHROM' header"]
+        return []
+
+    def warnings(self, sniff: Sniff) -> List[str]:
+        # Stored gzip is re-blocked into BGZF at ingest when store_bgzf is on
+        if sniff.compression == GZIP and not settings.store_bgzf:
+            return ["gzip-compressed but not BGZF: compress with bgzip to enable region queries"]
+        return []
+
+
+@register
+class SAMValidator(FormatValidator):
+    file_type = "sam"
+
+    def detect(self, sniff: Sniff) -> bool:
+        if not sniff.lines:
+            return False
+        return sniff.lines[0].startswith(SAM_HEADER_TAGS) or self._is_record(sniff.lines[0])
+
+    @staticmethod
+    def _is_record(line: str) -> bool:
+        fields = line.split("\t")
+        return len(fields) >= 11 and _is_int(fields[1]) and _is_int(fields[3])
+
+    def check(self, sniff: Sniff) -> List[str]:
+        if not sniff.lines:
+            return ["File is empty"]
+        records = sniff.data_lines(("@",))
+        if records and not self._is_record(records[0]):
+            return ["SAM records need 11 tab-separated columns with integer FLAG and POS"]
+        if not records and not sniff.lines[0].startswith(SAM_HEADER_TAGS):
+            return ["SAM header lines must start with a two-letter record type such as @HD"]
+        return []
+
+
+@register
+class FASTQValidator(FormatValidator):
+    file_type = "fastq"
+
+    def detect(self, sniff: Sniff) -> bool:
+        return not self.check(sniff) and len(sniff.lines) >= 3
+
+    def check(self, sniff: Sniff) -> List[str]:
+        lines = sniff.lines
+        if not lines:
+            return ["File is empty"]
+        if not lines[0].startswith("@"):
+            return ["FASTQ record must start with '@'"]
+        if len(lines) >= 3 and not lines[2].startswith("+"):
+            return ["FASTQ separator line must start with '+'"]
+        if len(lines) >= 4 and len(lines[1]) != len(lines[3]):
+            return ["FASTQ sequence and quality lines differ in length"]
+        return []
+
+
+@register
+class FASTAValidator(FormatValidator):
+    file_type = "fasta"
+
+    def detect(self, sniff: Sniff) -> bool:
+        return bool(sniff.lines) and sniff.lines[0].startswith(">")
+
+    def check(self, sniff: Sniff) -> List[str]:
+        if not sniff.lines:
+            return ["File is empty"]
+        if not sniff.lines[0].startswith(">"):
+            return ["FASTA file must start with a '>' header line"]
+        return []
+
+
+@register
+class BEDValidator(FormatValidator):
+    file_type = "bed"
+
+    def detect(self, sniff: Sniff) -> bool:
+        return bool(sniff.data_lines(("#", "track", "browser"))) and not self.check(sniff)
+
+    def check(self, sniff: Sniff) -> List[str]:
+        if not sniff.lines:
+            return ["File is empty"]
+        records = sniff.data_lines(("#", "track", "browser"))
+        if not records:
+            return []
+        fields = records[0].split("\t")
+        if len(fields) < 3 or not _is_int(fields[1]) or not _is_int(fields[2]):
+            return ["BED records need chrom, integer start and integer end columns"]
+        if int(fields[1]) > int(fields[2]):
+            return ["BED record start is after its end"]
+        return []
+
+
+@dataclass
+class FormatReport:
+    """Outcome of validating one file."""
+
+    extension: str
+    compression: str
+    file_type: Optional[str] = None
+    detected_type: Optional[str] = None
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def is_valid(self) -> bool:
+        return self.file_type is not None and not self.errors
+
 
 class FileValidator:
-    def __init__(self):
-        self.magic = magic.Magic(mime=True)
-    
     def get_file_extension(self, filename: str) -> str:
         """Extract file extension, handling compressed files."""
         filename_lower = filename.lower()
-        
+
         # Handle double extensions for compressed files
-        if filename_lower.endswith('.gz'):
-            base_name = filename_lower[:-3]  # Remove .gz
-            if '.' in base_name:
-                return '.' + base_name.split('.')[-1] + '.gz'
-            else:
-                return '.gz'
-        elif filename_lower.endswith('.bgz'):
-            base_name = filename_lower[:-4]  # Remove .bgz
-            if '.' in base_name:
-                return '.' + base_name.split('.')[-1] + '.bgz'
-            else:
-                return '.bgz'
-        else:
-            return os.path.splitext(filename_lower)[1]
-    
-    def validate_file_extension(self, filename: str) -> Tuple[bool, Optional[FileType]]:
-        """Validate if file extension is supported."""
+        for suffix in (".gz", ".bgz"):
+            if filename_lower.endswith(suffix):
+                base_name = filename_lower[:-len(suffix)]
+                if '.' in base_name:
+                    return '.' + base_name.split('.')[-1] + suffix
+                return suffix
+        return os.path.splitext(filename_lower)[1]
+
+    def detect(self, sniff: Sniff) -> Optional[str]:
+        """File type identified from content alone, if any."""
+        for file_type, validator in VALIDATORS.items():
+            if validator.detect(sniff):
+                return file_type
+        return None
+
+    def validate(self, filename: str, sniff: Sniff, file_size: int) -> FormatReport:
+        """
+        Check a file against the type its extension claims. Files with an
+        unknown extension are accepted when their content identifies a format.
+        """
+        started = time.perf_counter()
+        report = self._validate(filename, sniff, file_size)
+        VALIDATION_SECONDS.labels(report.file_type or "unknown").observe(time.perf_counter() - started)
+        return report
+
+    def _validate(self, filename: str, sniff: Sniff, file_size: int) -> FormatReport:
         extension = self.get_file_extension(filename)
-        
-        if extension in FILE_TYPE_MAPPING:
-            file_type = FileType(FILE_TYPE_MAPPING[extension])
-            return True, file_type
-        
-        return False, None
-    
-    def validate_file_size(self, file_size: int) -> bool:
-        """Validate file size against maximum allowed."""
-        return file_size <= settings.max_file_size
-    
-    def validate_mime_type(self, file_path: str) -> bool:
-        """Validate MIME type of the uploaded file."""
-        try:
-            mime_type = self.magic.from_file(file_path)
-            return mime_type in settings.allowed_file_types
-        except Exception:
-            return False
-    
-    def validate_file(self, filename: str, file_path: str, file_size: int) -> FileValidationResult:
-        """Comprehensive file validation."""
-        errors = []
-        warnings = []
-        metadata = {}
-        
-        # Validate file extension
-        extension_valid, file_type = self.validate_file_extension(filename)
-        if not extension_valid:
-            errors.append(f"Unsupported file extension: {self.get_file_extension(filename)}")
-        
-        # Validate file size
-        if not self.validate_file_size(file_size):
-            errors.append(f"File size {file_size} exceeds maximum allowed size {settings.max_file_size}")
-        
-        # Validate MIME type
-        if os.path.exists(file_path):
-            if not self.validate_mime_type(file_path):
-                warnings.append("MIME type validation failed - file may be corrupted")
-            
-            # Add basic file metadata
-            metadata.update({
-                "file_size": file_size,
-                "extension": self.get_file_extension(filename)
-            })
-        
-        is_valid = len(errors) == 0
-        
-        return FileValidationResult(
-            is_valid=is_valid,
-            file_type=file_type if extension_valid else None,
-            error_messages=errors,
-            warnings=warnings,
-            metadata=metadata
-        )
+        report = FormatReport(extension=extension, compression=sniff.compression)
+        claimed = FILE_TYPE_MAPPING.get(extension)
+
+        if file_size == 0:
+            report.file_type = claimed
+            report.errors.append("File is empty")
+            return report
+
+        report.detected_type = self.detect(sniff)
+        if claimed is None:
+            if report.detected_type is None:
+                report.errors.append(f"Unsupported file type: {extension or filename}")
+                return report
+            report.file_type = report.detected_type
+            report.warnings.append(
+                f"Unrecognised extension '{extension}'; detected {report.detected_type} from content"
+            )
+        else:
+            report.file_type = claimed
+            report.errors.extend(VALIDATORS[claimed].check(sniff))
+            if report.errors and report.detected_type not in (None, claimed):
+                report.errors.append(f"Content looks like {report.detected_type}")
+
+        report.warnings.extend(VALIDATORS[report.file_type].warnings(sniff))
+        if extension.endswith((".gz", ".bgz")) and sniff.compression == PLAIN:
+            report.warnings.append("File name says compressed but the content is not")
+        return report
+
 
 # Global validator instance
-file_validator = FileValidator()
\ No newline at end of file
+file_validator = FileValidator()
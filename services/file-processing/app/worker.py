@@ -0,0 +1,152 @@
+"""
+File processing worker.
+Pulls jobs from the queue and runs the processing pipeline. Run one process
+per core with `python -m app.worker`; scale independently of API replicas.
+"""
+
+import logging
+import signal
+import threading
+import time
+from typing import List
+
+from prometheus_client import start_http_server
+
+from .core.config import settings
+from .core.database import init_database, close_database
+from .core.metrics import JOB_SECONDS, watch_queue_depth
+from .services.jobs import JobQueue, get_job_queue, mark_finished, mark_started
+from .services.processing import mark_file_failed, process_file
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds a worker blocks on an empty queue before checking for shutdown
+POLL_TIMEOUT = 2.0
+# Heartbeats per visibility timeout while a job runs
+HEARTBEATS_PER_TIMEOUT = 4
+
+_inline_threads: List[threading.Thread] = []
+_inline_stop = threading.Event()
+
+
+def _heartbeat(job_queue: JobQueue, done: threading.Event) -> None:
+    interval = settings.job_visibility_timeout / HEARTBEATS_PER_TIMEOUT
+    while not done.wait(interval):
+        try:
+            job_queue.heartbeat()
+        except Exception as e:
+            logger.error(f"Job queue heartbeat failed: {e}")
+
+
+def run_job(job_queue: JobQueue, job_id: str) -> None:
+    """Execute a single claimed job, record its outcome and release the claim."""
+    job = job_queue.get(job_id)
+    if job is None:
+        job_queue.ack(job_id)
+        return
+    if job.attempts >= settings.job_max_attempts:
+        # Every earlier delivery died with its worker; the file may be what kills them
+        error = f"Abandoned after {job.attempts} attempt(s) by workers that stopped"
+        mark_file_failed(int(job.file_id), error)
+        mark_finished(job_queue, job_id, error=error)
+        job_queue.ack(job_id)
+        logger.error(f"Job {job_id} failed: {error}")
+        return
+    job = mark_started(job_queue, job)
+    logger.info(f"Job {job_id}: processing file {job.file_id} (attempt {job.attempts})")
+
+    def report(fraction: float) -> None:
+        job_queue.update(job_id, progress=round(fraction, 3))
+
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job_queue, done), name=f"heartbeat-{job_id}", daemon=True)
+    heartbeat.start()
+    started = time.perf_counter()
+    error, results = None, None
+    try:
+        results = process_file(int(job.file_id), progress=report, deep_validation=job.deep_validation)
+    except Exception as e:
+        error = str(e)
+    finally:
+        done.set()
+        heartbeat.join()
+
+    try:
+        JOB_SECONDS.labels(job.file_type.value, "failed" if error else "completed").observe(
+            time.perf_counter() - started
+        )
+        mark_finished(job_queue, job_id, error=error, results=results)
+    finally:
+        # Released only once the outcome is recorded
+        job_queue.ack(job_id)
+    if error:
+        logger.error(f"Job {job_id} failed: {error}")
+    else:
+        logger.info(f"Job {job_id} completed")
+
+
+def run_worker(stop: threading.Event, job_queue: JobQueue = None) -> None:
+    """Consume jobs until stop is set, requeueing jobs of dead workers along the way."""
+    job_queue = job_queue or get_job_queue()
+    last_reap = 0.0
+    while not stop.is_set():
+        try:
+            if time.monotonic() - last_reap > settings.job_visibility_timeout / 2:
+                last_reap = time.monotonic()
+                job_queue.requeue_stale()
+            job_id = job_queue.dequeue(timeout=POLL_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Job queue error: {e}")
+            stop.wait(POLL_TIMEOUT)
+            continue
+        if not job_id:
+            continue
+        try:
+            run_job(job_queue, job_id)
+        except Exception as e:
+            # A queue or database error must not end the worker (inline workers
+            # are never restarted); an unreleased claim is requeued once it stops
+            logger.error(f"Job {job_id} error: {e}")
+            stop.wait(POLL_TIMEOUT)
+
+
+def start_inline_workers() -> None:
+    """Run workers as threads inside the API process (memory backend only)."""
+    if settings.job_queue_backend != "memory":
+        return
+    _inline_stop.clear()
+    for i in range(settings.inline_workers):
+        thread = threading.Thread(target=run_worker, args=(_inline_stop,), name=f"inline-worker-{i}", daemon=True)
+        thread.start()
+        _inline_threads.append(thread)
+    logger.info(f"Started {settings.inline_workers} inline worker(s)")
+
+
+def stop_inline_workers() -> None:
+    _inline_stop.set()
+    for thread in _inline_threads:
+        thread.join(timeout=POLL_TIMEOUT * 2)
+    _inline_threads.clear()
+
+
+def main() -> None:
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    init_database()
+    if settings.worker_metrics_port:
+        # Each worker process has its own registry; scrape every worker
+        watch_queue_depth(lambda: get_job_queue().depth())
+        start_http_server(settings.worker_metrics_port)
+    logger.info(f"Worker started (queue backend: {settings.job_queue_backend})")
+    try:
+        run_worker(stop)
+    finally:
+        close_database()
+        logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
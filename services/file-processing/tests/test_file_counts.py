@@ -0,0 +1,45 @@
+"""Maintained totals of GET /files (app.services.file_listing.file_counts)."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core import database
+from app.core.config import settings
+from app.main import app
+from app.services.file_listing import file_counts
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    for name in ("upload_dir", "processed_dir", "upload_session_dir", "blob_dir"):
+        monkeypatch.setattr(settings, name, str(tmp_path / name))
+    monkeypatch.setattr(settings, "postgresql_url", f"sqlite:///{tmp_path / 'files.db'}")
+    monkeypatch.setattr(settings, "job_queue_backend", "memory")
+    monkeypatch.setattr(settings, "cache_backend", "memory")
+    monkeypatch.setattr(file_counts, "ttl", 3600)
+    monkeypatch.setattr(file_counts, "_refreshed_at", 0.0)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_listing_after_an_upload_does_not_recount(client):
+    recounts = []
+
+    def count_group_by(conn, cursor, statement, parameters, context, executemany):
+        if "GROUP BY" in statement:
+            recounts.append(statement)
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", count_group_by)
+
+    assert client.get("/files").json()["total"] == 0
+    assert len(recounts) == 1
+
+    # BED files are stored without a processing job, so their status stays put
+    response = client.post("/upload", files={"file": ("regions.bed", b"chr1\t10\t20\n")})
+    assert response.status_code == 200
+
+    listing = client.get("/files", params={"status": "uploaded", "file_type": "bed"}).json()
+    assert listing["total"] == 1
+    assert client.get("/files").json()["total"] == 1
+    assert len(recounts) == 1
@@ -0,0 +1,40 @@
+"""Keyset pagination of GET /files (app.services.file_listing)."""
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.models.database import UploadedFile
+from app.services.file_listing import list_page
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'files.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+async def test_cursor_pages_through_rows_sharing_a_timestamp(db):
+    await db.execute(insert(UploadedFile), [
+        {"filename": f"f{i}.vcf", "original_filename": f"f{i}.vcf", "file_path": f"/blobs/{i}",
+         "file_size": i, "file_type": "vcf", "status": "uploaded"}
+        for i in range(5)
+    ])
+    # The format SQLite's CURRENT_TIMESTAMP (the server default) stores
+    await db.execute(text("UPDATE uploaded_files SET uploaded_at = '2024-01-01 12:00:00'"))
+    await db.commit()
+
+    pages = []
+    cursor = None
+    while True:
+        files, cursor = await list_page(db, limit=2, cursor=cursor)
+        pages.append([f.id for f in files])
+        if cursor is None or len(pages) > 5:
+            break
+
+    assert pages == [[5, 4], [3, 2], [1]]
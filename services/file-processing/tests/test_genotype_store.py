@@ -0,0 +1,18 @@
+"""GT decoding of the genotype store conversion (app.services.genotype_store)."""
+
+import numpy as np
+
+from app.services.genotype_store import MISSING, _parse_genotypes
+
+
+def test_single_character_calls_use_the_fast_path_layout():
+    calls = _parse_genotypes(b"0/1\t1|1\t./.", 0, 3, 2)
+    assert calls.tolist() == [[0, 1], [1, 1], [MISSING, MISSING]]
+    assert calls.dtype == np.int8
+
+
+def test_mixed_width_calls_are_not_misread_as_single_character_calls():
+    # 6 bytes for 2 samples, the length of two "a/b" calls
+    assert _parse_genotypes(b".\t10/11", 0, 2, 2).tolist() == [[MISSING, MISSING], [10, 11]]
+    assert _parse_genotypes(b"10/1\t0/", 0, 2, 2).tolist() == [[10, 1], [0, MISSING]]
+    assert _parse_genotypes(b"0/1:35\t.:20\t12/3:9", 0, 3, 2).tolist() == [[0, 1], [MISSING, MISSING], [12, 3]]